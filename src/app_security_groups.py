@@ -0,0 +1,291 @@
+import jsonpickle
+from azure.core.exceptions import HttpResponseError
+from cloudshell.cp.core.request_actions.models import SetAppSecurityGroupActionResult
+from retrying import retry
+
+from concurrency import run_concurrently
+
+from cloudshell.cp.azure.actions.network_security_group import (
+    NetworkSecurityGroupActions,
+)
+from cloudshell.cp.azure.azure_client import AzureAPIClient
+from cloudshell.cp.azure.flows.app_security_groups import AzureAppSecurityGroupsFlow
+from cloudshell.cp.azure.utils.nsg_rules_priority_generator import (
+    NSGRulesPriorityGenerator,
+)
+from cloudshell.cp.azure.utils.retrying import (
+    ANOTHER_OPERATION_IN_PROGRESS_MAX_ATTEMPT_NUMBER,
+    retry_on_another_operation_in_progress_error,
+    retry_on_connection_error,
+)
+
+RULE_FIELDS = (
+    "access",
+    "direction",
+    "source_address_prefix",
+    "source_port_range",
+    "destination_address_prefix",
+    "destination_port_range",
+    "protocol",
+)
+
+
+class _RuleCollector:
+    """Azure client for NetworkSecurityGroupActions that only collects the rules."""
+
+    def __init__(self):
+        self.rules = {}
+
+    def create_nsg_rule(self, resource_group_name, nsg_name, rule):
+        self.rules[rule.name] = rule
+
+
+def _get_free_priorities(used_priorities, count):
+    """Get priorities for the new rules the same way as NSGRulesPriorityGenerator.
+
+    :param set[int] used_priorities:
+    :param int count:
+    :rtype: list[int]
+    """
+    priorities = []
+    priority = NSGRulesPriorityGenerator.RULE_DEFAULT_PRIORITY
+    while len(priorities) < count:
+        if priority not in used_priorities:
+            priorities.append(priority)
+        priority += NSGRulesPriorityGenerator.RULE_PRIORITY_INCREASE_STEP
+
+    return priorities
+
+
+def _normalize(value):
+    value = getattr(value, "value", value)
+    return None if value is None else str(value).lower()
+
+
+def is_same_rule(rule, other_rule):
+    """Check that rules have the same properties except the priority.
+
+    :param azure.mgmt.network.models.SecurityRule rule:
+    :param azure.mgmt.network.models.SecurityRule other_rule:
+    :rtype: bool
+    """
+    return all(
+        _normalize(getattr(rule, field)) == _normalize(getattr(other_rule, field))
+        for field in RULE_FIELDS
+    )
+
+
+def merge_custom_rules(existing_rules, desired_rules):
+    """Replace custom rules of the NSG keeping priorities of the unchanged ones.
+
+    :param list existing_rules: all security rules of the NSG
+    :param list desired_rules: custom rules without the priority
+    :return: tuple with the new list of the NSG rules and the changed flag
+    :rtype: tuple[list, bool]
+    """
+    prefix = NetworkSecurityGroupActions.CUSTOM_NSG_RULE_PREFIX
+    rules = [rule for rule in existing_rules if not rule.name.startswith(prefix)]
+    existing_custom_rules = {
+        rule.name: rule for rule in existing_rules if rule.name.startswith(prefix)
+    }
+
+    new_rules = []
+    for rule in desired_rules:
+        existing_rule = existing_custom_rules.pop(rule.name, None)
+        if existing_rule is not None and is_same_rule(existing_rule, rule):
+            rules.append(existing_rule)
+        else:
+            new_rules.append(rule)
+
+    priorities = _get_free_priorities(
+        used_priorities={rule.priority for rule in rules},
+        count=len(new_rules),
+    )
+    for rule, priority in zip(new_rules, priorities):
+        rule.priority = priority
+        rules.append(rule)
+
+    return rules, bool(new_rules or existing_custom_rules)
+
+
+class BatchedAppSecurityGroupsFlow(AzureAppSecurityGroupsFlow):
+    """Set App Security Groups with one NSG update per VM.
+
+    Requested custom rules of the VM are compared with the rules of the VM NSG,
+    new rules get free priorities and the whole NSG is updated with one request
+    only when they differ. NSGs of the different VMs are updated concurrently.
+    The update is sent with the etag of the read NSG, so rules added to the NSG
+    after it was read aren't overwritten, the NSG is read and merged again.
+    """
+
+    # precondition failed, NSG was changed after it was read
+    STATUS_PRECONDITION_FAILED = 412
+    NSG_UPDATE_ATTEMPTS = 3
+
+    def __init__(self, *args, max_workers, **kwargs):
+        """Init command.
+
+        :param int max_workers: max number of the concurrent NSG updates
+        """
+        super().__init__(*args, **kwargs)
+        self._max_workers = max_workers
+
+    def _get_desired_rules(self, security_group, vm_name, resource_group_name):
+        """Prepare custom NSG rules of the security group.
+
+        :param security_group:
+        :param str vm_name:
+        :param str resource_group_name:
+        :rtype: list[azure.mgmt.network.models.SecurityRule]
+        """
+        private_ips_map = self._get_private_ip_by_subnet_map(
+            vm_name=vm_name, vm_resource_group_name=resource_group_name
+        )
+        collector = _RuleCollector()
+        nsg_actions = NetworkSecurityGroupActions(
+            azure_client=collector, logger=self._logger
+        )
+
+        for security_group_config in security_group.security_group_configs:
+            subnet_name = self._get_sandbox_subnet_name(
+                subnet_id=security_group_config.subnet_id,
+                sandbox_resource_group_name=resource_group_name,
+            )
+
+            for rule in security_group_config.rules:
+                nsg_actions.create_custom_nsg_rule(
+                    vm_name=vm_name,
+                    resource_group_name=resource_group_name,
+                    nsg_name=None,
+                    src_address=rule.source,
+                    dst_address=private_ips_map.get(subnet_name),
+                    dst_port_from=rule.from_port,
+                    dst_port_to=rule.to_port,
+                    protocol=rule.protocol,
+                    rule_priority=None,
+                )
+
+        return list(collector.rules.values())
+
+    @retry(
+        stop_max_attempt_number=AzureAPIClient.RETRYING_STOP_MAX_ATTEMPT_NUMBER,
+        wait_fixed=AzureAPIClient.RETRYING_WAIT_FIXED,
+        retry_on_exception=retry_on_connection_error,
+    )
+    @retry(
+        stop_max_attempt_number=ANOTHER_OPERATION_IN_PROGRESS_MAX_ATTEMPT_NUMBER,
+        wait_fixed=AzureAPIClient.RETRYING_WAIT_FIXED,
+        retry_on_exception=retry_on_another_operation_in_progress_error,
+    )
+    def _update_nsg(self, nsg, nsg_name, resource_group_name):
+        """Update NSG if it wasn't changed after it was read.
+
+        The update is sent by the Azure API client wrappers, so it is scheduled
+        as an ARM write and evicts the cached reads of the NSG, with the same
+        retries as the Azure API client NSG operations.
+        :param azure.mgmt.network.models.NetworkSecurityGroup nsg:
+        :param str nsg_name:
+        :param str resource_group_name:
+        :return:
+        """
+        self._azure_client.update_network_security_group(
+            network_security_group_name=nsg_name,
+            resource_group_name=resource_group_name,
+            nsg=nsg,
+            etag=nsg.etag,
+        )
+
+    def _set_app_security_group(self, security_group):
+        """Set Application Security Group.
+
+        :param security_group:
+        :return
+        """
+        resource_group_name = self._reservation_info.get_resource_group_name()
+        vm_name = security_group.deployed_app.name
+        nsg_name = NetworkSecurityGroupActions.VM_NSG_NAME_TPL.format(vm_name=vm_name)
+
+        desired_rules = self._get_desired_rules(
+            security_group=security_group,
+            vm_name=vm_name,
+            resource_group_name=resource_group_name,
+        )
+
+        with self._lock_manager.get_lock(nsg_name):
+            for attempt in range(1, self.NSG_UPDATE_ATTEMPTS + 1):
+                nsg = self._azure_client.get_network_security_group(
+                    network_security_group_name=nsg_name,
+                    resource_group_name=resource_group_name,
+                )
+                rules, changed = merge_custom_rules(
+                    existing_rules=nsg.security_rules or [],
+                    desired_rules=desired_rules,
+                )
+                if not changed:
+                    self._logger.info(
+                        f"Security rules of NSG {nsg_name} are up to date"
+                    )
+                    return
+
+                self._logger.info(f"Updating security rules of NSG {nsg_name}...")
+                nsg.security_rules = rules
+                try:
+                    self._update_nsg(
+                        nsg=nsg,
+                        nsg_name=nsg_name,
+                        resource_group_name=resource_group_name,
+                    )
+                    return
+                except HttpResponseError as e:
+                    if (
+                        e.status_code != self.STATUS_PRECONDITION_FAILED
+                        or attempt == self.NSG_UPDATE_ATTEMPTS
+                    ):
+                        raise
+                    self._logger.info(
+                        f"NSG {nsg_name} was changed, merging rules again"
+                    )
+
+    def set_app_security_groups(self, request_actions):
+        """Set App Security Groups.
+
+        Every request replaces custom rules of the VM, so only the last
+        security group of the VM is applied.
+        :param cloudshell.cp.core.request_actions.SetAppSecurityGroupsRequestActions request_actions:  # noqa: E501
+        :rtype: str
+        """
+        security_groups = {
+            security_group.deployed_app.name: security_group
+            for security_group in request_actions.security_groups
+        }
+        task_results = run_concurrently(
+            func=lambda security_group: self._set_app_security_group(
+                security_group=security_group
+            ),
+            items=security_groups.values(),
+            max_workers=self._max_workers,
+        )
+        errors = {
+            task_result.item.deployed_app.name: task_result.error
+            for task_result in task_results
+        }
+
+        results = []
+        for security_group in request_actions.security_groups:
+            vm_name = security_group.deployed_app.name
+            set_group_result = SetAppSecurityGroupActionResult(appName=vm_name)
+            error = errors[vm_name]
+
+            if error is not None:
+                message = (
+                    f"Setting custom App Security rules failed for the VM '{vm_name}'"
+                )
+                self._logger.warning(message, exc_info=error)
+                set_group_result.errorMessage = f"{message}. See logs for the details"
+                set_group_result.success = False
+
+            results.append(set_group_result)
+
+        json_data = jsonpickle.encode(results)
+        self._logger.debug(f"Set App Security Group details: {json_data}")
+        return json_data
@@ -0,0 +1,192 @@
+from dataclasses import dataclass
+from functools import partial
+from typing import Callable, Optional
+
+from cloudshell.shell.core.driver_context import AutoLoadDetails
+
+from azure_client_cache import get_credentials_key
+from concurrency import run_concurrently
+from warm_context import ARM_TOKEN_SCOPE
+
+from cloudshell.cp.azure.actions.validation import ValidationActions
+from cloudshell.cp.azure.flows.autoload import AzureAutoloadFlow
+
+# resource providers registered by ValidationActions.register_azure_providers
+AZURE_PROVIDERS = (
+    "Microsoft.Authorization",
+    "Microsoft.Storage",
+    "Microsoft.Network",
+    "Microsoft.Compute",
+)
+
+
+@dataclass
+class Validation:
+    name: str
+    func: Callable
+    # key of the validated Azure resources, None - validate on every autoload
+    key: Optional[tuple] = None
+
+
+class ParallelAutoloadFlow(AzureAutoloadFlow):
+    """Autoload that runs independent validations concurrently.
+
+    Credentials are validated on every autoload. Validations of the Azure
+    resources that were validated by the previous successful autoload are
+    skipped, region and VM size are checked against the cached region catalogs.
+    Error of the first failed validation in the autoload order is raised.
+    """
+
+    def __init__(self, *args, validation_cache, max_workers, **kwargs):
+        """Init command.
+
+        :param validation_cache.AutoloadValidationCache validation_cache:
+        :param int max_workers: max number of the concurrent validations
+        """
+        super().__init__(*args, **kwargs)
+        self._validation_cache = validation_cache
+        self._max_workers = max_workers
+
+    def _get_validations(self, validation_actions):
+        """Get validations in the autoload order.
+
+        :param ValidationActions validation_actions:
+        :rtype: list[Validation]
+        """
+        credentials_key = get_credentials_key(self._resource_config)
+        mgmt_group_name = self._resource_config.management_group_name
+
+        validations = [
+            Validation(
+                name="credentials",
+                func=partial(
+                    self._azure_client._credentials.get_token, ARM_TOKEN_SCOPE
+                ),
+            ),
+            *(
+                Validation(
+                    name=f"{provider} provider registration",
+                    func=partial(self._azure_client.register_provider, provider),
+                    key=(credentials_key, "provider", provider),
+                )
+                for provider in AZURE_PROVIDERS
+            ),
+            Validation(
+                name="region",
+                func=partial(
+                    validation_actions.validate_azure_region,
+                    region=self._resource_config.region,
+                ),
+            ),
+            Validation(
+                name="management resource group",
+                func=partial(
+                    validation_actions.validate_azure_mgmt_resource_group,
+                    mgmt_resource_group_name=mgmt_group_name,
+                ),
+                key=(credentials_key, "mgmt resource group", mgmt_group_name),
+            ),
+            Validation(
+                name="sandbox network",
+                func=partial(
+                    validation_actions.validate_azure_sandbox_network,
+                    mgmt_resource_group_name=mgmt_group_name,
+                    sandbox_vnet_name=self._resource_config.sandbox_vnet_name,
+                ),
+                key=(
+                    credentials_key,
+                    "sandbox network",
+                    mgmt_group_name,
+                    self._resource_config.sandbox_vnet_name,
+                ),
+            ),
+        ]
+
+        if self._resource_config.management_vnet_name:
+            validations.append(
+                Validation(
+                    name="management network",
+                    func=partial(
+                        validation_actions.validate_azure_mgmt_network,
+                        mgmt_resource_group_name=mgmt_group_name,
+                        mgmt_vnet_name=self._resource_config.management_vnet_name,
+                    ),
+                    key=(
+                        credentials_key,
+                        "mgmt network",
+                        mgmt_group_name,
+                        self._resource_config.management_vnet_name,
+                    ),
+                )
+            )
+
+        validations.extend(
+            [
+                Validation(
+                    name="VM size",
+                    func=partial(
+                        validation_actions.validate_azure_vm_size,
+                        vm_size=self._resource_config.vm_size,
+                        region=self._resource_config.region,
+                    ),
+                ),
+                Validation(
+                    name="additional management networks",
+                    func=partial(
+                        validation_actions.validate_azure_additional_networks,
+                        mgmt_networks=self._resource_config.additional_mgmt_networks,
+                    ),
+                ),
+                Validation(
+                    name="custom tags",
+                    func=partial(
+                        validation_actions.validate_custom_tags,
+                        custom_tags=self._resource_config.custom_tags,
+                    ),
+                ),
+            ]
+        )
+
+        if self._resource_config.key_vault:
+            validations.append(
+                Validation(
+                    name="key vault",
+                    func=partial(
+                        validation_actions.validate_key_vault,
+                        key_vault_name=self._resource_config.key_vault,
+                    ),
+                    key=(credentials_key, "key vault", self._resource_config.key_vault),
+                )
+            )
+
+        return validations
+
+    def discover(self):
+        validation_actions = ValidationActions(
+            azure_client=self._azure_client, logger=self._logger
+        )
+        validations = []
+        for validation in self._get_validations(validation_actions):
+            if validation.key is not None and self._validation_cache.is_validated(
+                validation.key
+            ):
+                self._logger.info(
+                    f"Skipping validation of the {validation.name}, it is unchanged"
+                )
+            else:
+                validations.append(validation)
+
+        task_results = run_concurrently(
+            func=lambda validation: validation.func(),
+            items=validations,
+            max_workers=self._max_workers,
+        )
+
+        for task_result in task_results:
+            if not task_result.success:
+                raise task_result.error
+
+        self._validation_cache.save(
+            [validation.key for validation in validations if validation.key]
+        )
+        return AutoLoadDetails([], [])
@@ -0,0 +1,150 @@
+import contextvars
+import hashlib
+import logging
+import threading
+
+from cache import TTLCache
+from throttling import hand_over_throttling
+
+_fallback_logger = logging.getLogger(__name__)
+
+# logger of the command that runs in the current context
+_command_logger = contextvars.ContextVar("command_logger", default=None)
+
+
+def get_credentials_key(resource_config):
+    """Get key of the Azure credentials from the resource config.
+
+    :param cloudshell.cp.azure.resource_config.AzureResourceConfig resource_config:
+    :rtype: tuple
+    """
+    key_hash = hashlib.sha256(
+        resource_config.azure_application_key.encode()
+    ).hexdigest()
+
+    return (
+        resource_config.azure_subscription_id,
+        resource_config.azure_tenant_id,
+        resource_config.azure_application_id,
+        key_hash,
+    )
+
+
+class CommandLogger:
+    """Logger proxy that forwards records to the logger of the running command.
+
+    Cached Azure API client outlives the command that created it, so it gets
+    this proxy instead of the command logger. Every command binds its own logger
+    to the current context, which is propagated to the thread pools of the
+    driver. Records from the threads without the command context go to the
+    module logger, never to the log of another command.
+    """
+
+    @staticmethod
+    def bind(logger):
+        """Bind command logger to the current context.
+
+        :param logging.Logger logger:
+        :return:
+        """
+        _command_logger.set(logger)
+
+    def __getattr__(self, name):
+        return getattr(_command_logger.get() or _fallback_logger, name)
+
+
+class AzureClientCache:
+    """Process-wide cache of the Azure API clients per credentials set.
+
+    Creating AzureAPIClient means a new AAD token exchange and new HTTP connection
+    pools, so the client is reused between the commands while the credentials
+    remain the same and the resource is used by a driver instance.
+    """
+
+    # ClientSecretCredential requests a new AAD access token itself before
+    # the cached one expires, so the client is rebuilt only to renew its
+    # long-lived HTTP connection pools
+    CLIENT_TTL = 8 * 60 * 60
+    MAX_CLIENTS = 32
+
+    def __init__(self, ttl=CLIENT_TTL, max_size=MAX_CLIENTS, scheduler=None):
+        """Init command.
+
+        :param float ttl:
+        :param int max_size:
+        :param throttling.ArmRequestScheduler scheduler: scheduler that handles
+            throttling of the created clients
+        """
+        self._clients = TTLCache(max_size=max_size, ttl=ttl)
+        self._scheduler = scheduler
+        self._resource_keys = {}
+        self._lock = threading.Lock()
+
+    def _track_resource(self, resource_name, key):
+        """Remember credentials of the resource and evict the outdated client.
+
+        :param str resource_name:
+        :param tuple key:
+        :return:
+        """
+        old_key = self._resource_keys.get(resource_name)
+        self._resource_keys[resource_name] = key
+
+        if old_key is not None and old_key != key:
+            if old_key not in self._resource_keys.values():
+                self._clients.pop(old_key)
+
+    def get_client(self, resource_config, logger):
+        """Get cached Azure API client or create a new one.
+
+        :param cloudshell.cp.azure.resource_config.AzureResourceConfig resource_config:
+        :param logging.Logger logger:
+        :rtype: cloudshell.cp.azure.azure_client.AzureAPIClient
+        """
+        key = get_credentials_key(resource_config)
+
+        with self._lock:
+            self._track_resource(resource_name=resource_config.name, key=key)
+            cached = self._clients.get(key)
+
+            if cached is None:
+                # the Azure SDK clients are imported on the first use
+                from cloudshell.cp.azure.azure_client import AzureAPIClient
+
+                logger.info("Creating Azure API client...")
+                client_logger = CommandLogger()
+                azure_client = AzureAPIClient(
+                    azure_subscription_id=resource_config.azure_subscription_id,
+                    azure_tenant_id=resource_config.azure_tenant_id,
+                    azure_application_id=resource_config.azure_application_id,
+                    azure_application_key=resource_config.azure_application_key,
+                    logger=client_logger,
+                )
+                if self._scheduler is not None:
+                    hand_over_throttling(
+                        azure_client=azure_client,
+                        scheduler=self._scheduler,
+                        subscription_id=resource_config.azure_subscription_id,
+                    )
+                cached = (azure_client, client_logger)
+                self._clients.set(key, cached)
+
+        azure_client, client_logger = cached
+        client_logger.bind(logger)
+        return azure_client
+
+    def invalidate(self, resource_name):
+        """Evict the client used by the given resource.
+
+        :param str resource_name:
+        :return:
+        """
+        with self._lock:
+            key = self._resource_keys.pop(resource_name, None)
+            if key is not None:
+                self._clients.pop(key)
+
+    def clear(self):
+        with self._lock:
+            self._resource_keys.clear()
+            self._clients.clear()
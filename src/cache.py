@@ -0,0 +1,110 @@
+import threading
+import time
+from collections import OrderedDict
+
+
+class TTLCache:
+    """Thread-safe LRU cache with the per-entry expiration time."""
+
+    def __init__(self, max_size=128, ttl=None, timer=time.monotonic):
+        """Init command.
+
+        :param int max_size: max number of the entries, least recently used
+            entries are evicted first
+        :param float ttl: default entry time to live in seconds, None - no expiration
+        :param timer: monotonic clock function
+        """
+        self._max_size = max_size
+        self._ttl = ttl
+        self._timer = timer
+        self._entries = OrderedDict()
+        self._lock = threading.RLock()
+
+    def _is_expired(self, expires_at):
+        return expires_at is not None and expires_at <= self._timer()
+
+    def get(self, key, default=None):
+        """Get not expired value by the key and mark it as recently used.
+
+        :param key:
+        :param default:
+        :return:
+        """
+        with self._lock:
+            try:
+                value, expires_at = self._entries[key]
+            except KeyError:
+                return default
+
+            if self._is_expired(expires_at):
+                del self._entries[key]
+                return default
+
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key, value, ttl=None):  # noqa: A003
+        """Set value for the key.
+
+        :param key:
+        :param value:
+        :param float ttl: time to live in seconds, overrides the default one
+        :return:
+        """
+        ttl = self._ttl if ttl is None else ttl
+        expires_at = None if ttl is None else self._timer() + ttl
+
+        with self._lock:
+            self._entries[key] = (value, expires_at)
+            self._entries.move_to_end(key)
+
+            while len(self._entries) > self._max_size:
+                self._entries.popitem(last=False)
+
+    def pop(self, key, default=None):
+        """Remove the key and return its value (even if it is already expired).
+
+        :param key:
+        :param default:
+        :return:
+        """
+        with self._lock:
+            value, _ = self._entries.pop(key, (default, None))
+            return value
+
+    def pop_if(self, predicate):
+        """Remove all entries which keys match the predicate.
+
+        :param predicate: function that receives the entry key
+        :return: list of the removed values
+        """
+        with self._lock:
+            keys = [key for key in self._entries if predicate(key)]
+            return [self._entries.pop(key)[0] for key in keys]
+
+    def clear(self):
+        """Remove all entries.
+
+        :return: list of the removed values
+        """
+        return self.pop_if(lambda key: True)
+
+    def items(self):
+        """Get not expired entries without marking them as recently used.
+
+        :rtype: list[tuple]
+        """
+        with self._lock:
+            return [
+                (key, value)
+                for key, (value, expires_at) in self._entries.items()
+                if not self._is_expired(expires_at)
+            ]
+
+    def __contains__(self, key):
+        sentinel = object()
+        return self.get(key, sentinel) is not sentinel
+
+    def __len__(self):
+        with self._lock:
+            return len(self._entries)
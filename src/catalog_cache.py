@@ -0,0 +1,117 @@
+import functools
+from collections.abc import Iterator
+
+from cache import TTLCache
+from client_proxy import AzureClientProxy
+from single_flight import SingleFlight
+
+# Azure API client methods that list the catalogs of the subscription regions
+CATALOG_METHODS = frozenset(
+    {
+        "get_available_regions",
+        "get_virtual_machine_sizes_by_region",
+    }
+)
+
+
+class RegionCatalogCache:
+    """Process-wide cache of the region catalogs: locations and VM sizes.
+
+    Catalogs are the same for all cloud provider resources of the subscription,
+    so autoload of the resources for different regions and the commands that
+    check VM sizes list them once per TTL.
+    """
+
+    # new regions and VM sizes are rolled out rarely
+    CATALOG_TTL = 60 * 60
+    MAX_CATALOGS = 256
+
+    def __init__(self, ttl=CATALOG_TTL, max_size=MAX_CATALOGS):
+        """Init command.
+
+        :param float ttl: time to live of the catalog in seconds
+        :param int max_size:
+        """
+        self._catalogs = TTLCache(max_size=max_size, ttl=ttl)
+        self._single_flight = SingleFlight()
+
+    @staticmethod
+    def get_key(subscription_id, method_name, args, kwargs):
+        """Get catalog key from the subscription and the region of the call.
+
+        :param str subscription_id:
+        :param str method_name:
+        :param tuple args:
+        :param dict kwargs:
+        :rtype: tuple
+        """
+        # region names are case-insensitive in Azure
+        region = [*args, *kwargs.values()]
+        return (
+            subscription_id,
+            method_name,
+            tuple(arg.lower() if isinstance(arg, str) else arg for arg in region),
+        )
+
+    def get_or_read(self, key, read):
+        """Get cached catalog or list it once for all concurrent calls.
+
+        Failed calls are not cached.
+        :param tuple key:
+        :param read: function that lists the catalog
+        :return: catalog, paged results are read into the list
+        """
+        catalog = self._catalogs.get(key)
+        if catalog is not None:
+            return catalog
+
+        def read_and_cache():
+            catalog = self._catalogs.get(key)
+            if catalog is None:
+                catalog = read()
+                if isinstance(catalog, Iterator):
+                    catalog = list(catalog)
+                self._catalogs.set(key, catalog)
+            return catalog
+
+        return self._single_flight.do(key, read_and_cache)
+
+    def clear(self):
+        self._catalogs.clear()
+
+
+class CatalogCachingAzureClient(AzureClientProxy):
+    """Azure API client that lists region catalogs via the catalog cache."""
+
+    def __init__(self, azure_client, catalog_cache, subscription_id):
+        """Init command.
+
+        :param cloudshell.cp.azure.azure_client.AzureAPIClient azure_client:
+        :param RegionCatalogCache catalog_cache:
+        :param str subscription_id: subscription of the Azure API client
+        """
+        super().__init__(azure_client)
+        self._catalog_cache = catalog_cache
+        self._subscription_id = subscription_id
+
+    def __getattr__(self, name):
+        attr = super().__getattr__(name)
+        if name not in CATALOG_METHODS:
+            return attr
+
+        @functools.wraps(attr)
+        def get_catalog(*args, **kwargs):
+            key = self._catalog_cache.get_key(
+                subscription_id=self._subscription_id,
+                method_name=name,
+                args=args,
+                kwargs=kwargs,
+            )
+            # callers get their own list, the catalog items are only read
+            return list(
+                self._catalog_cache.get_or_read(
+                    key=key, read=lambda: attr(*args, **kwargs)
+                )
+            )
+
+        return get_catalog
@@ -0,0 +1,52 @@
+class AzureClientProxy:
+    """Base wrapper of the Azure API client.
+
+    Attributes that are not overridden by the wrapper are taken from the wrapped
+    client, so wrappers can be stacked and passed to the flows instead of
+    the AzureAPIClient.
+    """
+
+    def __init__(self, azure_client):
+        """Init command.
+
+        :param cloudshell.cp.azure.azure_client.AzureAPIClient azure_client:
+        """
+        self._azure_client = azure_client
+
+    def __getattr__(self, name):
+        return getattr(self._azure_client, name)
+
+
+def get_sdk_client(azure_client, name):
+    """Get Azure SDK management client used by the Azure API client.
+
+    :param cloudshell.cp.azure.azure_client.AzureAPIClient azure_client:
+    :param str name: client name, i.e. "compute", "network"
+    :return: Azure SDK management client
+    """
+    return getattr(azure_client, f"_{name}_client")
+
+
+def get_resource_name_and_group(args, kwargs):
+    """Get resource name and resource group name from the getter call arguments.
+
+    Getters of the Azure API client receive the resource name and
+    the resource group name, i.e. get_vm(vm_name, resource_group_name).
+    :param tuple args:
+    :param dict kwargs:
+    :return: tuple with resource name and resource group name or None
+        if arguments don't match the getter signature
+    :rtype: tuple[str, str] | None
+    """
+    kwargs = dict(kwargs)
+    resource_group_name = kwargs.pop("resource_group_name", None)
+    args = list(args)
+
+    if resource_group_name is None and len(args) == 2:
+        resource_group_name = args.pop()
+
+    names = [*args, *kwargs.values()]
+    if resource_group_name is None or len(names) != 1:
+        return None
+
+    return names[0], resource_group_name
@@ -0,0 +1,98 @@
+import contextvars
+import time
+from concurrent.futures import (
+    FIRST_COMPLETED,
+    CancelledError,
+    ThreadPoolExecutor,
+    wait,
+)
+from dataclasses import dataclass
+from typing import Any
+
+
+@dataclass
+class TaskResult:
+    item: Any
+    result: Any = None
+    error: Exception = None
+
+    @property
+    def success(self):
+        return self.error is None
+
+
+def run_concurrently(
+    func, items, max_workers, timeout=None, is_cancelled=None, poll_interval=1
+):
+    """Call the function for every item in the bounded thread pool.
+
+    Errors are not raised but returned in the corresponding task result.
+    Tasks that run longer than the timeout are reported as failed without waiting
+    for them. When the cancellation is requested not started tasks are cancelled
+    and the running ones are not awaited.
+    :param func: function that receives one item
+    :param list items:
+    :param int max_workers:
+    :param float timeout: max execution time of one task in seconds
+    :param is_cancelled: function that returns True when execution is cancelled
+    :param float poll_interval: how often to check timeouts and cancellation
+    :rtype: list[TaskResult]
+    """
+    items = list(items)
+    if not items:
+        return []
+
+    results = [None] * len(items)
+    started_at = {}
+
+    def run(index):
+        started_at[index] = time.monotonic()
+        return func(items[index])
+
+    executor = ThreadPoolExecutor(max_workers=min(max_workers, len(items)))
+    # tasks keep context variables of the caller, i.e. the current command
+    futures = {
+        executor.submit(contextvars.copy_context().run, run, index): index
+        for index in range(len(items))
+    }
+    pending = set(futures)
+
+    try:
+        while pending:
+            done, pending = wait(
+                pending, timeout=poll_interval, return_when=FIRST_COMPLETED
+            )
+            for future in done:
+                index = futures[future]
+                try:
+                    results[index] = TaskResult(
+                        item=items[index], result=future.result()
+                    )
+                except Exception as e:
+                    results[index] = TaskResult(item=items[index], error=e)
+
+            if is_cancelled is not None and is_cancelled():
+                for future in pending:
+                    future.cancel()
+                    index = futures[future]
+                    results[index] = TaskResult(
+                        item=items[index], error=CancelledError("Task was cancelled")
+                    )
+                pending = set()
+
+            if timeout is not None:
+                now = time.monotonic()
+                for future in list(pending):
+                    index = futures[future]
+                    if now - started_at.get(index, now) > timeout:
+                        pending.discard(future)
+                        results[index] = TaskResult(
+                            item=items[index],
+                            error=TimeoutError(
+                                f"Task didn't finish in {timeout} seconds"
+                            ),
+                        )
+    finally:
+        executor.shutdown(wait=False)
+
+    return results
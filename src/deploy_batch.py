@@ -0,0 +1,64 @@
+import json
+
+from cloudshell.cp.core.request_actions import DriverResponse
+from cloudshell.cp.core.request_actions.models import (
+    ConnectToSubnetActionResult,
+    DeployAppResult,
+)
+
+
+class NotCancelledContext:
+    """Cancellation context of the command that is called without one."""
+
+    is_cancelled = False
+
+
+def split_deploy_requests(request):
+    """Split batch deploy request into the separate Deploy requests.
+
+    Batch request is a JSON list of the regular Deploy requests, each of them
+    contains one DeployApp action and its ConnectSubnet actions.
+    :param str request:
+    :rtype: list[str]
+    """
+    return [json.dumps(deploy_request) for deploy_request in json.loads(request)]
+
+
+def prepare_failed_deploy_response(request_actions, error):
+    """Prepare Deploy driver response with the failed action results.
+
+    :param cloudshell.cp.core.request_actions.DeployVMRequestActions request_actions:
+    :param Exception error:
+    :rtype: str
+    """
+    error_message = f"Failed to deploy App: {error}"
+    action_results = [
+        DeployAppResult(
+            actionId=request_actions.deploy_app.actionId,
+            success=False,
+            errorMessage=error_message,
+        ),
+        *[
+            ConnectToSubnetActionResult(
+                actionId=action.actionId,
+                success=False,
+                errorMessage=error_message,
+            )
+            for action in request_actions.connect_subnets
+        ],
+    ]
+
+    return DriverResponse(action_results).to_driver_response_json()
+
+
+def merge_driver_responses(responses):
+    """Merge action results of the driver responses into one driver response.
+
+    :param list[str] responses:
+    :rtype: str
+    """
+    action_results = []
+    for response in responses:
+        action_results.extend(json.loads(response)["driverResponse"]["actionResults"])
+
+    return json.dumps({"driverResponse": {"actionResults": action_results}})
@@ -0,0 +1,54 @@
+import threading
+
+from cloudshell.cp.core.request_actions import (
+    DeployedVMActions,
+    DeployVMRequestActions,
+    GetVMDetailsRequestActions,
+)
+
+_lock = threading.Lock()
+_registered = False
+
+
+def register_deployment_paths():
+    """Register models of the Azure deployment paths for the request actions.
+
+    Registered models are kept in the class attributes of the request actions,
+    so it's done once per process, on the first command that parses Apps.
+    :return:
+    """
+    global _registered
+    if _registered:
+        return
+
+    with _lock:
+        if _registered:
+            return
+
+        from cloudshell.cp.azure.models.deploy_app import (
+            AzureVMFromCustomImageDeployApp,
+            AzureVMFromMarketplaceDeployApp,
+            AzureVMFromSharedGalleryImageDeployApp,
+        )
+        from cloudshell.cp.azure.models.deployed_app import (
+            AzureVMFromCustomImageDeployedApp,
+            AzureVMFromMarketplaceDeployedApp,
+            AzureVMFromSharedGalleryImageDeployedApp,
+        )
+
+        for deploy_app_cls in (
+            AzureVMFromMarketplaceDeployApp,
+            AzureVMFromCustomImageDeployApp,
+            AzureVMFromSharedGalleryImageDeployApp,
+        ):
+            DeployVMRequestActions.register_deployment_path(deploy_app_cls)
+
+        for deployed_app_cls in (
+            AzureVMFromMarketplaceDeployedApp,
+            AzureVMFromCustomImageDeployedApp,
+            AzureVMFromSharedGalleryImageDeployedApp,
+        ):
+            DeployedVMActions.register_deployment_path(deployed_app_cls)
+            GetVMDetailsRequestActions.register_deployment_path(deployed_app_cls)
+
+        _registered = True
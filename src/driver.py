@@ -1,3 +1,8 @@
+import functools
+import json
+import os
+from contextlib import contextmanager, nullcontext
+
 from cloudshell.cp.core.cancellation_manager import CancellationContextManager
 from cloudshell.cp.core.request_actions import (
     CleanupSandboxInfraRequestActions,
@@ -7,58 +12,205 @@ from cloudshell.cp.core.request_actions import (
     PrepareSandboxInfraRequestActions,
     SetAppSecurityGroupsRequestActions,
 )
+from cloudshell.logging.qs_logger import get_qs_logger
 from cloudshell.shell.core.resource_driver_interface import ResourceDriverInterface
 from cloudshell.shell.core.session.cloudshell_session import CloudShellSessionContext
-from cloudshell.shell.core.session.logging_session import LoggingSessionContext
-
-from cloudshell.cp.azure import constants
-from cloudshell.cp.azure.azure_client import AzureAPIClient
-from cloudshell.cp.azure.flows.access_key import AzureGetAccessKeyFlow
-from cloudshell.cp.azure.flows.app_security_groups import AzureAppSecurityGroupsFlow
-from cloudshell.cp.azure.flows.application_ports import AzureGetApplicationPortsFlow
-from cloudshell.cp.azure.flows.autoload import AzureAutoloadFlow
-from cloudshell.cp.azure.flows.available_ip import AzureGetAvailablePrivateIPFlow
-from cloudshell.cp.azure.flows.cleanup import AzureCleanupSandboxInfraFlow
-from cloudshell.cp.azure.flows.create_route_tables import CreateRouteTablesFlow
-from cloudshell.cp.azure.flows.delete_instance import AzureDeleteInstanceFlow
-from cloudshell.cp.azure.flows.deploy_vm.deploy_custom_vm import AzureDeployCustomVMFlow
-from cloudshell.cp.azure.flows.deploy_vm.deploy_marketplace_vm import (
-    AzureDeployMarketplaceVMFlow,
-)
-from cloudshell.cp.azure.flows.deploy_vm.deploy_shared_gallery_vm import (
-    AzureDeployGalleryImageVMFlow,
+from cloudshell.shell.core.session.logging_session import (
+    INVENTORY,
+    LoggingSessionContext,
 )
-from cloudshell.cp.azure.flows.power_mgmt import AzurePowerManagementFlow
-from cloudshell.cp.azure.flows.prepare_sandbox_infra import AzurePrepareSandboxInfraFlow
-from cloudshell.cp.azure.flows.reconfigure_vm import AzureReconfigureVMFlow
-from cloudshell.cp.azure.flows.refresh_ip import AzureRefreshIPFlow
-from cloudshell.cp.azure.flows.vm_details import AzureGetVMDetailsFlow
-from cloudshell.cp.azure.models.deploy_app import (
-    AzureVMFromCustomImageDeployApp,
-    AzureVMFromMarketplaceDeployApp,
-    AzureVMFromSharedGalleryImageDeployApp,
+
+from azure_client_cache import AzureClientCache
+from catalog_cache import CatalogCachingAzureClient, RegionCatalogCache
+from concurrency import run_concurrently
+from deploy_batch import (
+    NotCancelledContext,
+    merge_driver_responses,
+    prepare_failed_deploy_response,
+    split_deploy_requests,
 )
-from cloudshell.cp.azure.models.deployed_app import (
-    AzureVMFromCustomImageDeployedApp,
-    AzureVMFromMarketplaceDeployedApp,
-    AzureVMFromSharedGalleryImageDeployedApp,
+from deployment_paths import register_deployment_paths
+from image_cache import ImageCachingAzureClient, ImageMetadataCache
+from instrumentation import (
+    Instrumentation,
+    InstrumentedAzureClient,
+    get_lock_metrics_collector,
+    get_reservation_id,
 )
+from lock_manager import KeyedLockManager
+from lro_poller import SharedLROPoller
+from read_cache import AzureReadCache, CachingAzureClient
+from resource_config_cache import ResourceConfigCache
+from resource_group_snapshot import ResourceGroupSnapshot, SnapshotAzureClient
+from sandbox_prepare import PreparedSandboxCache
+from sdk_operations import SdkAzureClient
+from single_flight import SingleFlight, SingleFlightAzureClient
+from throttling import ArmRequestScheduler, ThrottledAzureClient
+from validation_cache import AutoloadValidationCache
+from vm_capacity import AdmittedAzureClient, VMAdmission, VMCapacityIndex
+from vm_details_batch import get_vm_details_concurrently
+from vm_power import VMPowerOperations
+from warm_context import WarmAzureClient, WarmContextManager, WarmResourceContext
+
+from cloudshell.cp.azure import constants
 from cloudshell.cp.azure.request_actions import CreateRouteTablesRequestActions
 from cloudshell.cp.azure.reservation_info import AzureReservationInfo
-from cloudshell.cp.azure.resource_config import AzureResourceConfig
+from cloudshell.cp.azure.utils.availability_zones import AzureZonesManager
 from cloudshell.cp.azure.utils.cs_ip_pool_manager import CSIPPoolManager
-from cloudshell.cp.azure.utils.lock_manager import ThreadLockManager
 
 
+# flows and the Azure API client load the Azure SDK models, so they are imported
+# in the commands that use them to keep loading of the driver fast
 class AzureDriver(ResourceDriverInterface):
     SHELL_NAME = constants.SHELL_NAME
+    DEPLOY_CONCURRENCY = 5
+    POWER_MGMT_CONCURRENCY = 10
+    # seconds to wait for the power state of all Apps
+    POWER_MGMT_TIMEOUT = 20 * 60
+    VM_DETAILS_CONCURRENCY = 10
+    # seconds to get VM Details for one App
+    VM_DETAILS_TIMEOUT = 60
+    # read the whole sandbox resource group with list calls for many Apps
+    VM_DETAILS_SNAPSHOT_MIN_APPS = 5
+    # seconds to reuse Azure reads of the reservation in read-only commands
+    AZURE_READ_CACHE_TTL = 10
+    CLEANUP_CONCURRENCY = 4
+    SECURITY_GROUPS_CONCURRENCY = 10
+    ROUTE_TABLES_CONCURRENCY = 5
+    AUTOLOAD_CONCURRENCY = 8
+    RECONFIGURE_DISKS_CONCURRENCY = 8
+
+    # file for the OpenMetrics dump of the driver timings, i.e. for the node
+    # exporter textfile collector
+    METRICS_TEXTFILE_PATH = os.environ.get("AZURE_SHELL_METRICS_TEXTFILE")
+
+    # shared between all driver instances in the process
+    _instrumentation = Instrumentation(textfile_path=METRICS_TEXTFILE_PATH)
+    _arm_scheduler = ArmRequestScheduler(instrumentation=_instrumentation)
+    _azure_client_cache = AzureClientCache(scheduler=_arm_scheduler)
+    _resource_config_cache = ResourceConfigCache()
+    _azure_read_cache = AzureReadCache(ttl=AZURE_READ_CACHE_TTL)
+    _image_cache = ImageMetadataCache()
+    _catalog_cache = RegionCatalogCache()
+    _vm_capacity_index = VMCapacityIndex(catalog_cache=_catalog_cache)
+    _autoload_validation_cache = AutoloadValidationCache()
+    _azure_single_flight = SingleFlight()
+    _lro_poller = SharedLROPoller(instrumentation=_instrumentation)
+    _prepared_sandbox_cache = PreparedSandboxCache()
+    _lock_manager = KeyedLockManager()
+    _warm_contexts = WarmContextManager()
+    _instrumentation.add_collector(get_lock_metrics_collector(_lock_manager))
 
     def __init__(self):
         """Init function.
 
         ctor must be without arguments, it is created with reflection at run time
         """
-        self.lock_manager = ThreadLockManager()
+        self.lock_manager = self._lock_manager
+        # cloud provider resource of the driver instance, set on initialize
+        self._resource_name = None
+
+    @contextmanager
+    def _command_session(self, context, command):
+        """Open logging session of the command and measure its timings.
+
+        :param context: command context
+        :param str command: driver command name
+        :rtype: logging.Logger
+        """
+        with LoggingSessionContext(context) as logger:
+            with self._instrumentation.command(
+                command=command,
+                reservation_id=get_reservation_id(context),
+                logger=logger,
+            ):
+                yield logger
+
+    def _get_resource_config(self, context, api):
+        """Get resource config for the cloud provider resource from the context.
+
+        :param context: command context with the cloud provider resource
+        :param cloudshell.api.cloudshell_api.CloudShellAPISession api:
+        :rtype: cloudshell.cp.azure.resource_config.AzureResourceConfig
+        """
+        return self._resource_config_cache.get_config(
+            shell_name=self.SHELL_NAME, context=context, api=api
+        )
+
+    def _get_azure_client(
+        self,
+        resource_config,
+        logger,
+        reservation_info=None,
+        cache_reads=False,
+        priority=ArmRequestScheduler.PRIORITY_NORMAL,
+        use_warm_context=True,
+    ):
+        """Get Azure API client for the resource credentials.
+
+        All client calls, including the Azure SDK operations of SdkAzureClient, go
+        through the process-wide ARM request scheduler, identical reads that are
+        in flight in other commands are shared and VM images are resolved once for
+        all deploys via the image metadata cache, regions and VM sizes are listed
+        via the region catalog cache and the management resources are taken from
+        the warm resource context.
+        Client for the reservation evicts the cached Azure reads of the reservation
+        on every write, read-only commands also reuse the cached reads.
+        :param cloudshell.cp.azure.resource_config.AzureResourceConfig resource_config:
+        :param logging.Logger logger:
+        :param AzureReservationInfo reservation_info:
+        :param bool cache_reads:
+        :param int priority: ARM request scheduler priority of the command calls
+        :param bool use_warm_context: False - read the management resources
+        :rtype: cloudshell.cp.azure.azure_client.AzureAPIClient
+        """
+        azure_client = self._azure_client_cache.get_client(
+            resource_config=resource_config, logger=logger
+        )
+        azure_client = SdkAzureClient(azure_client)
+        azure_client = InstrumentedAzureClient(
+            azure_client=azure_client, instrumentation=self._instrumentation
+        )
+        azure_client = ThrottledAzureClient(
+            azure_client=azure_client,
+            scheduler=self._arm_scheduler,
+            subscription_id=resource_config.azure_subscription_id,
+            priority=priority,
+        )
+        azure_client = SingleFlightAzureClient(
+            azure_client=azure_client,
+            single_flight=self._azure_single_flight,
+            subscription_id=resource_config.azure_subscription_id,
+        )
+        azure_client = ImageCachingAzureClient(
+            azure_client=azure_client,
+            image_cache=self._image_cache,
+            subscription_id=resource_config.azure_subscription_id,
+        )
+        azure_client = CatalogCachingAzureClient(
+            azure_client=azure_client,
+            catalog_cache=self._catalog_cache,
+            subscription_id=resource_config.azure_subscription_id,
+        )
+
+        warm_context = None
+        if use_warm_context:
+            warm_context = self._warm_contexts.get(resource_config)
+        if warm_context is not None:
+            azure_client = WarmAzureClient(
+                azure_client=azure_client, warm_context=warm_context
+            )
+
+        if reservation_info is not None:
+            azure_client = CachingAzureClient(
+                azure_client=azure_client,
+                read_cache=self._azure_read_cache,
+                reservation_id=reservation_info.reservation_id,
+                cache_reads=cache_reads,
+                subscription_id=resource_config.azure_subscription_id,
+            )
+
+        return azure_client
 
     def initialize(self, context):
         """Called every time a new instance of the driver is created.
@@ -68,7 +220,43 @@ class AzureDriver(ResourceDriverInterface):
         Whatever you choose, do not remove it.
         :param InitCommandContext context: the context the command runs on
         """
-        pass
+        self._resource_name = context.resource.name
+        self._resource_config_cache.invalidate(resource_name=context.resource.name)
+        # the first commands of the sandboxes don't wait for the credentials
+        # validation and reads of the management resources
+        self._warm_contexts.start(
+            resource_name=context.resource.name,
+            warm=functools.partial(self._warm_resource_context, context),
+        )
+
+    def _warm_resource_context(self, context):
+        """Read warm context of the cloud provider resource.
+
+        :param InitCommandContext context:
+        :rtype: WarmResourceContext
+        """
+        logger = get_qs_logger(
+            log_group=INVENTORY,
+            log_category="QS",
+            log_file_prefix=context.resource.name,
+        )
+        try:
+            api = CloudShellSessionContext(context).get_api()
+            resource_config = self._get_resource_config(context=context, api=api)
+            azure_client = self._get_azure_client(
+                resource_config=resource_config,
+                logger=logger,
+                priority=ArmRequestScheduler.PRIORITY_LOW,
+                use_warm_context=False,
+            )
+            return WarmResourceContext.read(
+                resource_config=resource_config,
+                azure_client=azure_client,
+                logger=logger,
+            )
+        except Exception:
+            logger.warning("Unable to warm context of the resource", exc_info=True)
+            raise
 
     def get_inventory(self, context):
         """Called when the cloud provider resource is created in the inventory.
@@ -83,24 +271,27 @@ class AzureDriver(ResourceDriverInterface):
         you can return an AutoLoadDetails object
         :rtype: AutoLoadDetails
         """
-        with LoggingSessionContext(context) as logger:
+        from autoload import ParallelAutoloadFlow
+
+        with self._command_session(context, command="get_inventory") as logger:
             logger.info("Starting Autoload command...")
             api = CloudShellSessionContext(context).get_api()
-            resource_config = AzureResourceConfig.from_context(
-                shell_name=self.SHELL_NAME, context=context, api=api
-            )
+            resource_config = self._get_resource_config(context=context, api=api)
 
-            azure_client = AzureAPIClient(
-                azure_subscription_id=resource_config.azure_subscription_id,
-                azure_tenant_id=resource_config.azure_tenant_id,
-                azure_application_id=resource_config.azure_application_id,
-                azure_application_key=resource_config.azure_application_key,
+            # autoload validates the credentials, don't reuse the cached client
+            self._azure_client_cache.invalidate(resource_name=resource_config.name)
+            # autoload validates the current management resources in Azure
+            azure_client = self._get_azure_client(
+                resource_config=resource_config,
                 logger=logger,
+                use_warm_context=False,
             )
 
-            autoload_flow = AzureAutoloadFlow(
+            autoload_flow = ParallelAutoloadFlow(
                 resource_config=resource_config,
                 azure_client=azure_client,
+                validation_cache=self._autoload_validation_cache,
+                max_workers=self.AUTOLOAD_CONCURRENCY,
                 logger=logger,
             )
 
@@ -131,25 +322,39 @@ class AzureDriver(ResourceDriverInterface):
         :return:
         :rtype: str
         """
-        with LoggingSessionContext(context) as logger:
+        from cloudshell.cp.azure.flows.prepare_sandbox_infra import (
+            AzurePrepareSandboxInfraFlow,
+        )
+
+        with self._command_session(context, command="PrepareSandboxInfra") as logger:
             logger.info("Starting Prepare Sandbox Infra command...")
             logger.debug(f"Request: {request}")
             api = CloudShellSessionContext(context).get_api()
-            resource_config = AzureResourceConfig.from_context(
-                shell_name=self.SHELL_NAME, context=context, api=api
-            )
+            resource_config = self._get_resource_config(context=context, api=api)
 
             request_actions = PrepareSandboxInfraRequestActions.from_request(request)
             reservation_info = AzureReservationInfo.from_resource_context(context)
             cancellation_manager = CancellationContextManager(cancellation_context)
 
-            azure_client = AzureAPIClient(
-                azure_subscription_id=resource_config.azure_subscription_id,
-                azure_tenant_id=resource_config.azure_tenant_id,
-                azure_application_id=resource_config.azure_application_id,
-                azure_application_key=resource_config.azure_application_key,
+            azure_client = self._get_azure_client(
+                resource_config=resource_config,
+                reservation_info=reservation_info,
+                logger=logger,
+            )
+
+            # sandbox infrastructure can't be taken from a pre-provisioned pool,
+            # all flows find the sandbox resource group, storage account and key
+            # vault by the reservation id and subnets are created for the CIDRs
+            # requested by the reservation
+            response = self._prepared_sandbox_cache.get_response(
+                reservation_id=reservation_info.reservation_id,
+                request=request,
+                azure_client=azure_client,
+                resource_config=resource_config,
                 logger=logger,
             )
+            if response is not None:
+                return response
 
             prepare_sandbox_flow = AzurePrepareSandboxInfraFlow(
                 resource_config=resource_config,
@@ -159,7 +364,17 @@ class AzureDriver(ResourceDriverInterface):
                 logger=logger,
             )
 
-            return prepare_sandbox_flow.prepare(request_actions=request_actions)
+            response = prepare_sandbox_flow.prepare(request_actions=request_actions)
+            self._prepared_sandbox_cache.save(
+                reservation_id=reservation_info.reservation_id,
+                request=request,
+                response=response,
+                azure_client=azure_client,
+                resource_config=resource_config,
+                logger=logger,
+            )
+
+            return response
 
     def Deploy(self, context, request, cancellation_context=None):
         """Called when reserving a sandbox during setup.
@@ -174,58 +389,247 @@ class AzureDriver(ResourceDriverInterface):
         :return:
         :rtype: str
         """
-        with LoggingSessionContext(context) as logger:
+        with self._command_session(context, command="Deploy") as logger:
             logger.info("Starting Deploy command...")
             logger.debug(f"Request: {request}")
             api = CloudShellSessionContext(context).get_api()
-            resource_config = AzureResourceConfig.from_context(
-                shell_name=self.SHELL_NAME, context=context, api=api
-            )
+            resource_config = self._get_resource_config(context=context, api=api)
 
             cancellation_manager = CancellationContextManager(cancellation_context)
             reservation_info = AzureReservationInfo.from_resource_context(context)
-            cs_ip_pool_manager = CSIPPoolManager(cs_api=api, logger=logger)
 
-            azure_client = AzureAPIClient(
-                azure_subscription_id=resource_config.azure_subscription_id,
-                azure_tenant_id=resource_config.azure_tenant_id,
-                azure_application_id=resource_config.azure_application_id,
-                azure_application_key=resource_config.azure_application_key,
+            azure_client = self._get_azure_client(
+                resource_config=resource_config,
+                reservation_info=reservation_info,
                 logger=logger,
             )
 
-            for deploy_app_cls in (
-                AzureVMFromMarketplaceDeployApp,
-                AzureVMFromCustomImageDeployApp,
-                AzureVMFromSharedGalleryImageDeployApp,
-            ):
-                DeployVMRequestActions.register_deployment_path(deploy_app_cls)
+            cs_ip_pool_manager = CSIPPoolManager(cs_api=api, logger=logger)
+
+            register_deployment_paths()
 
             request_actions = DeployVMRequestActions.from_request(
                 request=request, cs_api=api
             )
 
-            if isinstance(request_actions.deploy_app, AzureVMFromMarketplaceDeployApp):
-                deploy_flow_class = AzureDeployMarketplaceVMFlow
-            elif isinstance(
-                request_actions.deploy_app, AzureVMFromCustomImageDeployApp
-            ):
-                deploy_flow_class = AzureDeployCustomVMFlow
-            else:
-                deploy_flow_class = AzureDeployGalleryImageVMFlow
+            deploy_flow_class = self._get_deploy_flow_class(request_actions.deploy_app)
+            with self._admit_vm(
+                deploy_app=request_actions.deploy_app,
+                azure_client=azure_client,
+                resource_config=resource_config,
+                logger=logger,
+            ) as admission:
+                deploy_flow = deploy_flow_class(
+                    resource_config=resource_config,
+                    azure_client=AdmittedAzureClient(azure_client, admission),
+                    cs_api=api,
+                    reservation_info=reservation_info,
+                    cancellation_manager=cancellation_manager,
+                    cs_ip_pool_manager=cs_ip_pool_manager,
+                    lock_manager=self.lock_manager,
+                    logger=logger,
+                )
+                return deploy_flow.deploy(request_actions=request_actions)
+
+    def DeployApps(self, context, request, cancellation_context=None):
+        """Deploy several Apps in one command.
+
+        Resource config, Azure client and request parsing are shared between
+        all Apps and VMs are created concurrently. If App deployment fails,
+        "success false" action results are returned for its actions. When the
+        command is cancelled, Apps that weren't started fail and the results of
+        the deployed Apps are still returned.
+        :param ResourceCommandContext context:
+        :param str request: A JSON list of the Deploy requests
+        :param CancellationContext cancellation_context:
+        :return:
+        :rtype: str
+        """
+        with self._command_session(context, command="DeployApps") as logger:
+            logger.info("Starting Deploy Apps command...")
+            logger.debug(f"Request: {request}")
+            api = CloudShellSessionContext(context).get_api()
+            resource_config = self._get_resource_config(context=context, api=api)
 
-            deploy_flow = deploy_flow_class(
+            cancellation_manager = CancellationContextManager(
+                cancellation_context or NotCancelledContext()
+            )
+            reservation_info = AzureReservationInfo.from_resource_context(context)
+
+            azure_client = self._get_azure_client(
                 resource_config=resource_config,
-                azure_client=azure_client,
-                cs_api=api,
                 reservation_info=reservation_info,
-                cancellation_manager=cancellation_manager,
-                cs_ip_pool_manager=cs_ip_pool_manager,
-                lock_manager=self.lock_manager,
                 logger=logger,
             )
 
-            return deploy_flow.deploy(request_actions=request_actions)
+            cs_ip_pool_manager = CSIPPoolManager(cs_api=api, logger=logger)
+
+            register_deployment_paths()
+
+            all_request_actions = [
+                DeployVMRequestActions.from_request(request=deploy_request, cs_api=api)
+                for deploy_request in split_deploy_requests(request)
+            ]
+
+            def deploy(request_actions):
+                # Apps aren't started after the cancellation, the started ones
+                # are finished or rolled back by their deploy flows
+                with cancellation_manager:
+                    pass
+
+                deploy_flow_class = self._get_deploy_flow_class(
+                    request_actions.deploy_app
+                )
+                with self._admit_vm(
+                    deploy_app=request_actions.deploy_app,
+                    azure_client=azure_client,
+                    resource_config=resource_config,
+                    logger=logger,
+                ) as admission:
+                    deploy_flow = deploy_flow_class(
+                        resource_config=resource_config,
+                        azure_client=AdmittedAzureClient(azure_client, admission),
+                        cs_api=api,
+                        reservation_info=reservation_info,
+                        cancellation_manager=cancellation_manager,
+                        cs_ip_pool_manager=cs_ip_pool_manager,
+                        lock_manager=self.lock_manager,
+                        logger=logger,
+                    )
+                    return deploy_flow.deploy(request_actions=request_actions)
+
+            task_results = run_concurrently(
+                func=deploy,
+                items=all_request_actions,
+                max_workers=self.DEPLOY_CONCURRENCY,
+            )
+
+            responses = []
+            for task_result in task_results:
+                if task_result.success:
+                    responses.append(task_result.result)
+                else:
+                    app_name = task_result.item.deploy_app.app_name
+                    logger.error(
+                        f"Failed to deploy App '{app_name}'", exc_info=task_result.error
+                    )
+                    responses.append(
+                        prepare_failed_deploy_response(
+                            request_actions=task_result.item, error=task_result.error
+                        )
+                    )
+
+            return merge_driver_responses(responses)
+
+    def _admit_vm(self, deploy_app, azure_client, resource_config, logger):
+        """Check VM size of the App and reserve its vCPUs while it is deployed.
+
+        :param cloudshell.cp.core.request_actions.models.DeployApp deploy_app:
+        :param cloudshell.cp.azure.azure_client.AzureAPIClient azure_client:
+        :param cloudshell.cp.azure.resource_config.AzureResourceConfig resource_config:
+        :param logging.Logger logger:
+        :return: context manager of the VM admission
+        """
+        # zones are resolved the same way the deploy flow does it
+        if deploy_app.availability_zones:
+            zones = [
+                zone.strip().capitalize()
+                for zone in deploy_app.availability_zones.split(",")
+            ]
+        else:
+            zones = []
+
+        return self._vm_capacity_index.admit(
+            azure_client=azure_client,
+            subscription_id=resource_config.azure_subscription_id,
+            region=resource_config.region,
+            vm_size_name=deploy_app.vm_size or resource_config.vm_size,
+            zones=AzureZonesManager(resource_config).get_availability_zones(zones),
+            data_disks=len(deploy_app.data_disks),
+            logger=logger,
+        )
+
+    def _admit_vm_reconfigure(
+        self,
+        deployed_app,
+        vm_size,
+        data_disks,
+        azure_client,
+        resource_config,
+        reservation_info,
+        logger,
+    ):
+        """Check new VM size and data disks and reserve vCPUs of the resize.
+
+        :param cloudshell.cp.core.request_actions.models.DeployedApp deployed_app:
+        :param str vm_size: new VM size
+        :param str data_disks: data disks input of the reconfigure command
+        :param cloudshell.cp.azure.azure_client.AzureAPIClient azure_client:
+        :param cloudshell.cp.azure.resource_config.AzureResourceConfig resource_config:
+        :param AzureReservationInfo reservation_info:
+        :param logging.Logger logger:
+        :return: context manager of the VM admission
+        """
+        if not vm_size and not data_disks:
+            return nullcontext(VMAdmission())
+
+        from cloudshell.cp.azure.utils.disks import (
+            parse_data_disks_input,
+            prepare_full_data_disk_name,
+        )
+
+        vm = azure_client.get_vm(
+            vm_name=deployed_app.name,
+            resource_group_name=deployed_app.resource_group_name
+            or reservation_info.get_resource_group_name(),
+        )
+        # existing data disks have the full names, new ones are created with them
+        disk_names = {disk.name for disk in vm.storage_profile.data_disks or []}
+        if data_disks:
+            disk_names.update(
+                prepare_full_data_disk_name(disk_name=disk.name, vm_name=vm.name)
+                for disk in parse_data_disks_input(data_disks)
+            )
+
+        return self._vm_capacity_index.admit(
+            azure_client=azure_client,
+            subscription_id=resource_config.azure_subscription_id,
+            region=resource_config.region,
+            vm_size_name=vm_size or vm.hardware_profile.vm_size,
+            zones=vm.zones or [],
+            data_disks=len(disk_names),
+            current_vm_size_name=vm.hardware_profile.vm_size,
+            logger=logger,
+        )
+
+    @staticmethod
+    def _get_deploy_flow_class(deploy_app):
+        """Get deploy flow class for the App deployment path.
+
+        Only the flow of the deployment path is imported.
+
+        :param cloudshell.cp.core.request_actions.models.DeployApp deploy_app:
+        :return: deploy flow class
+        """
+        deployment_path = deploy_app.DEPLOYMENT_PATH
+        if deployment_path == constants.AZURE_VM_FROM_MARKETPLACE_DEPLOYMENT_PATH:
+            from cloudshell.cp.azure.flows.deploy_vm.deploy_marketplace_vm import (
+                AzureDeployMarketplaceVMFlow,
+            )
+
+            return AzureDeployMarketplaceVMFlow
+        elif deployment_path == constants.AZURE_VM_FROM_CUSTOM_IMAGE_DEPLOYMENT_PATH:
+            from cloudshell.cp.azure.flows.deploy_vm.deploy_custom_vm import (
+                AzureDeployCustomVMFlow,
+            )
+
+            return AzureDeployCustomVMFlow
+
+        from cloudshell.cp.azure.flows.deploy_vm.deploy_shared_gallery_vm import (
+            AzureDeployGalleryImageVMFlow,
+        )
+
+        return AzureDeployGalleryImageVMFlow
 
     def PowerOnHidden(self, context, ports):
         self.PowerOn(context, ports)
@@ -243,47 +647,9 @@ class AzureDriver(ResourceDriverInterface):
         :param ResourceRemoteCommandContext context:
         :param ports:
         """
-        with LoggingSessionContext(context) as logger:
+        with self._command_session(context, command="PowerOn") as logger:
             logger.info("Starting Power On command...")
-            api = CloudShellSessionContext(context).get_api()
-            resource_config = AzureResourceConfig.from_context(
-                shell_name=self.SHELL_NAME, context=context, api=api
-            )
-
-            reservation_info = AzureReservationInfo.from_remote_resource_context(
-                context
-            )
-
-            azure_client = AzureAPIClient(
-                azure_subscription_id=resource_config.azure_subscription_id,
-                azure_tenant_id=resource_config.azure_tenant_id,
-                azure_application_id=resource_config.azure_application_id,
-                azure_application_key=resource_config.azure_application_key,
-                logger=logger,
-            )
-
-            for deploy_app_cls in (
-                AzureVMFromMarketplaceDeployedApp,
-                AzureVMFromCustomImageDeployedApp,
-                AzureVMFromSharedGalleryImageDeployedApp,
-            ):
-                DeployedVMActions.register_deployment_path(deploy_app_cls)
-
-            resource = context.remote_endpoints[0]
-            deployed_vm_actions = DeployedVMActions.from_remote_resource(
-                resource=resource, cs_api=api
-            )
-
-            power_mgmt_flow = AzurePowerManagementFlow(
-                resource_config=resource_config,
-                azure_client=azure_client,
-                reservation_info=reservation_info,
-                logger=logger,
-            )
-
-            return power_mgmt_flow.power_on(
-                deployed_app=deployed_vm_actions.deployed_app
-            )
+            self._change_app_power_state(context=context, power_on=True, logger=logger)
 
     def PowerOff(self, context, ports):
         """Called during sandbox's teardown.
@@ -294,47 +660,188 @@ class AzureDriver(ResourceDriverInterface):
         :param ResourceRemoteCommandContext context:
         :param ports:
         """
-        with LoggingSessionContext(context) as logger:
+        with self._command_session(context, command="PowerOff") as logger:
             logger.info("Starting Power Off command...")
-            api = CloudShellSessionContext(context).get_api()
-            resource_config = AzureResourceConfig.from_context(
-                shell_name=self.SHELL_NAME, context=context, api=api
-            )
+            self._change_app_power_state(context=context, power_on=False, logger=logger)
 
-            reservation_info = AzureReservationInfo.from_remote_resource_context(
-                context
-            )
+    def _change_app_power_state(self, context, power_on, logger):
+        """Power On/Off the deployed App via the shared long-running operation poller.
+
+        :param ResourceRemoteCommandContext context:
+        :param bool power_on:
+        :param logging.Logger logger:
+        """
+        api = CloudShellSessionContext(context).get_api()
+        resource_config = self._get_resource_config(context=context, api=api)
+        reservation_info = AzureReservationInfo.from_remote_resource_context(context)
+
+        register_deployment_paths()
+
+        resource = context.remote_endpoints[0]
+        deployed_app = DeployedVMActions.from_remote_resource(
+            resource=resource, cs_api=api
+        ).deployed_app
+
+        [task_result] = self._change_vms_power_state(
+            vms=[
+                (
+                    deployed_app.name,
+                    deployed_app.resource_group_name
+                    or reservation_info.get_resource_group_name(),
+                )
+            ],
+            power_on=power_on,
+            resource_config=resource_config,
+            reservation_info=reservation_info,
+            logger=logger,
+        )
+        if not task_result.success:
+            raise task_result.error
+
+    def _change_vms_power_state(
+        self,
+        vms,
+        power_on,
+        resource_config,
+        reservation_info,
+        logger,
+        is_cancelled=None,
+    ):
+        """Start/deallocate VMs and wait for them via the shared poller.
+
+        :param list[tuple[str, str]] vms: VM names and their resource group names
+        :param bool power_on:
+        :param cloudshell.cp.azure.resource_config.AzureResourceConfig resource_config:
+        :param AzureReservationInfo reservation_info:
+        :param logging.Logger logger:
+        :param is_cancelled: function that returns True when command is cancelled
+        :rtype: list[concurrency.TaskResult]
+        """
+        azure_client = self._get_azure_client(
+            resource_config=resource_config,
+            reservation_info=reservation_info,
+            priority=ArmRequestScheduler.PRIORITY_HIGH,
+            logger=logger,
+        )
+        vm_power_operations = VMPowerOperations(
+            azure_client=azure_client, poller=self._lro_poller, logger=logger
+        )
+        try:
+            return vm_power_operations.change_power_state(
+                vms=vms,
+                power_on=power_on,
+                max_workers=self.POWER_MGMT_CONCURRENCY,
+                timeout=self.POWER_MGMT_TIMEOUT,
+                is_cancelled=is_cancelled,
+            )
+        finally:
+            # VMs were changing after the submitted operations evicted them
+            for vm_name, resource_group_name in vms:
+                self._azure_read_cache.invalidate(
+                    reservation_id=reservation_info.reservation_id,
+                    subscription_id=resource_config.azure_subscription_id,
+                    resource_group_name=resource_group_name,
+                    resource_names=frozenset({vm_name.lower()}),
+                )
+
+    def PowerOnApps(self, context, requests, cancellation_context):
+        """Power On all given deployed Apps of the sandbox.
 
-            azure_client = AzureAPIClient(
-                azure_subscription_id=resource_config.azure_subscription_id,
-                azure_tenant_id=resource_config.azure_tenant_id,
-                azure_application_id=resource_config.azure_application_id,
-                azure_application_key=resource_config.azure_application_key,
+        :param ResourceCommandContext context:
+        :param str requests: deployed Apps in the same format as for GetVmDetails
+        :param CancellationContext cancellation_context:
+        :return: json with the power on result for each App
+        :rtype: str
+        """
+        with self._command_session(context, command="PowerOnApps") as logger:
+            logger.info("Starting Power On Apps command...")
+            logger.debug(f"Requests: {requests}")
+            return self._change_apps_power_state(
+                context=context,
+                requests=requests,
+                cancellation_context=cancellation_context,
+                power_on=True,
                 logger=logger,
             )
 
-            for deploy_app_cls in (
-                AzureVMFromMarketplaceDeployedApp,
-                AzureVMFromCustomImageDeployedApp,
-                AzureVMFromSharedGalleryImageDeployedApp,
-            ):
-                DeployedVMActions.register_deployment_path(deploy_app_cls)
+    def PowerOffApps(self, context, requests, cancellation_context):
+        """Power Off all given deployed Apps of the sandbox.
 
-            resource = context.remote_endpoints[0]
-            deployed_vm_actions = DeployedVMActions.from_remote_resource(
-                resource=resource, cs_api=api
+        :param ResourceCommandContext context:
+        :param str requests: deployed Apps in the same format as for GetVmDetails
+        :param CancellationContext cancellation_context:
+        :return: json with the power off result for each App
+        :rtype: str
+        """
+        with self._command_session(context, command="PowerOffApps") as logger:
+            logger.info("Starting Power Off Apps command...")
+            logger.debug(f"Requests: {requests}")
+            return self._change_apps_power_state(
+                context=context,
+                requests=requests,
+                cancellation_context=cancellation_context,
+                power_on=False,
+                logger=logger,
             )
 
-            power_mgmt_flow = AzurePowerManagementFlow(
+    def _change_apps_power_state(
+        self, context, requests, cancellation_context, power_on, logger
+    ):
+        """Power On/Off deployed Apps concurrently.
+
+        VM operations are submitted without waiting for them and tracked by
+        the shared long-running operation poller.
+
+        :param ResourceCommandContext context:
+        :param str requests:
+        :param CancellationContext cancellation_context:
+        :param bool power_on:
+        :param logging.Logger logger:
+        :rtype: str
+        """
+        api = CloudShellSessionContext(context).get_api()
+        resource_config = self._get_resource_config(context=context, api=api)
+
+        register_deployment_paths()
+
+        request_actions = GetVMDetailsRequestActions.from_request(
+            request=requests, cs_api=api
+        )
+
+        cancellation_manager = CancellationContextManager(cancellation_context)
+        reservation_info = AzureReservationInfo.from_resource_context(context)
+
+        with cancellation_manager:
+            task_results = self._change_vms_power_state(
+                # VM name is the name of the deployed App
+                vms=[
+                    (
+                        deployed_app.name,
+                        deployed_app.resource_group_name
+                        or reservation_info.get_resource_group_name(),
+                    )
+                    for deployed_app in request_actions.deployed_apps
+                ],
+                power_on=power_on,
                 resource_config=resource_config,
-                azure_client=azure_client,
                 reservation_info=reservation_info,
                 logger=logger,
+                is_cancelled=lambda: cancellation_context.is_cancelled,
             )
 
-            return power_mgmt_flow.power_off(
-                deployed_app=deployed_vm_actions.deployed_app
-            )
+        results = []
+        for task_result in task_results:
+            app_name, _ = task_result.item
+            result = {"appName": app_name, "success": task_result.success}
+            if not task_result.success:
+                logger.warning(
+                    f"Unable to change power state of the App '{app_name}'",
+                    exc_info=task_result.error,
+                )
+                result["errorMessage"] = str(task_result.error)
+            results.append(result)
+
+        return json.dumps(results)
 
     def PowerCycle(self, context, ports, delay):
         pass
@@ -353,32 +860,27 @@ class AzureDriver(ResourceDriverInterface):
         :param CancellationContext cancellation_context:
         :return:
         """
-        with LoggingSessionContext(context) as logger:
+        from cloudshell.cp.azure.flows.refresh_ip import AzureRefreshIPFlow
+
+        with self._command_session(context, command="remote_refresh_ip") as logger:
             logger.info("Starting Remote Refresh IP command...")
             api = CloudShellSessionContext(context).get_api()
-            resource_config = AzureResourceConfig.from_context(
-                shell_name=self.SHELL_NAME, context=context, api=api
-            )
+            resource_config = self._get_resource_config(context=context, api=api)
 
             reservation_info = AzureReservationInfo.from_remote_resource_context(
                 context
             )
             cancellation_manager = CancellationContextManager(cancellation_context)
 
-            azure_client = AzureAPIClient(
-                azure_subscription_id=resource_config.azure_subscription_id,
-                azure_tenant_id=resource_config.azure_tenant_id,
-                azure_application_id=resource_config.azure_application_id,
-                azure_application_key=resource_config.azure_application_key,
+            azure_client = self._get_azure_client(
+                resource_config=resource_config,
+                reservation_info=reservation_info,
+                cache_reads=True,
+                priority=ArmRequestScheduler.PRIORITY_LOW,
                 logger=logger,
             )
 
-            for deploy_app_cls in (
-                AzureVMFromMarketplaceDeployedApp,
-                AzureVMFromCustomImageDeployedApp,
-                AzureVMFromSharedGalleryImageDeployedApp,
-            ):
-                DeployedVMActions.register_deployment_path(deploy_app_cls)
+            register_deployment_paths()
 
             resource = context.remote_endpoints[0]
             deployed_vm_actions = DeployedVMActions.from_remote_resource(
@@ -409,54 +911,57 @@ class AzureDriver(ResourceDriverInterface):
         data_disks,
     ):
         """Reconfigure VM Size and Data Disks."""
-        with LoggingSessionContext(context) as logger:
+        from reconfigure_vm import ParallelReconfigureVMFlow
+
+        with self._command_session(context, command="reconfigure_vm") as logger:
             logger.info("Starting Reconfigure VM command...")
             api = CloudShellSessionContext(context).get_api()
-            resource_config = AzureResourceConfig.from_context(
-                shell_name=self.SHELL_NAME, context=context, api=api
-            )
+            resource_config = self._get_resource_config(context=context, api=api)
 
             reservation_info = AzureReservationInfo.from_remote_resource_context(
                 context
             )
             cancellation_manager = CancellationContextManager(cancellation_context)
 
-            azure_client = AzureAPIClient(
-                azure_subscription_id=resource_config.azure_subscription_id,
-                azure_tenant_id=resource_config.azure_tenant_id,
-                azure_application_id=resource_config.azure_application_id,
-                azure_application_key=resource_config.azure_application_key,
+            azure_client = self._get_azure_client(
+                resource_config=resource_config,
+                reservation_info=reservation_info,
                 logger=logger,
             )
 
-            for deployed_app_cls in (
-                AzureVMFromMarketplaceDeployedApp,
-                AzureVMFromCustomImageDeployedApp,
-                AzureVMFromSharedGalleryImageDeployedApp,
-            ):
-                DeployedVMActions.register_deployment_path(deployed_app_cls)
+            register_deployment_paths()
 
             resource = context.remote_endpoints[0]
             deployed_vm_actions = DeployedVMActions.from_remote_resource(
                 resource=resource, cs_api=api
             )
 
-            reconfigure_vm_flow = AzureReconfigureVMFlow(
-                resource_config=resource_config,
-                azure_client=azure_client,
-                cs_api=api,
-                reservation_info=reservation_info,
-                cancellation_manager=cancellation_manager,
-                logger=logger,
-            )
-
-            return reconfigure_vm_flow.reconfigure(
+            with self._admit_vm_reconfigure(
                 deployed_app=deployed_vm_actions.deployed_app,
                 vm_size=vm_size,
-                os_disk_size=os_disk_size,
-                os_disk_type=os_disk_type,
                 data_disks=data_disks,
-            )
+                azure_client=azure_client,
+                resource_config=resource_config,
+                reservation_info=reservation_info,
+                logger=logger,
+            ) as admission:
+                reconfigure_vm_flow = ParallelReconfigureVMFlow(
+                    resource_config=resource_config,
+                    azure_client=AdmittedAzureClient(azure_client, admission),
+                    cs_api=api,
+                    reservation_info=reservation_info,
+                    cancellation_manager=cancellation_manager,
+                    logger=logger,
+                    max_workers=self.RECONFIGURE_DISKS_CONCURRENCY,
+                    poller=self._lro_poller,
+                )
+                return reconfigure_vm_flow.reconfigure(
+                    deployed_app=deployed_vm_actions.deployed_app,
+                    vm_size=vm_size,
+                    os_disk_size=os_disk_size,
+                    os_disk_type=os_disk_type,
+                    data_disks=data_disks,
+                )
 
     def GetVmDetails(self, context, requests, cancellation_context):
         """Called when reserving a sandbox during setup.
@@ -472,20 +977,15 @@ class AzureDriver(ResourceDriverInterface):
         :param CancellationContext cancellation_context:
         :return:
         """
-        with LoggingSessionContext(context) as logger:
+        from cloudshell.cp.azure.flows.vm_details import AzureGetVMDetailsFlow
+
+        with self._command_session(context, command="GetVmDetails") as logger:
             logger.info("Starting Get VM Details command...")
             logger.debug(f"Requests: {requests}")
             api = CloudShellSessionContext(context).get_api()
-            resource_config = AzureResourceConfig.from_context(
-                shell_name=self.SHELL_NAME, context=context, api=api
-            )
+            resource_config = self._get_resource_config(context=context, api=api)
 
-            for deploy_app_cls in (
-                AzureVMFromMarketplaceDeployedApp,
-                AzureVMFromCustomImageDeployedApp,
-                AzureVMFromSharedGalleryImageDeployedApp,
-            ):
-                GetVMDetailsRequestActions.register_deployment_path(deploy_app_cls)
+            register_deployment_paths()
 
             request_actions = GetVMDetailsRequestActions.from_request(
                 request=requests, cs_api=api
@@ -494,14 +994,24 @@ class AzureDriver(ResourceDriverInterface):
             cancellation_manager = CancellationContextManager(cancellation_context)
             reservation_info = AzureReservationInfo.from_resource_context(context)
 
-            azure_client = AzureAPIClient(
-                azure_subscription_id=resource_config.azure_subscription_id,
-                azure_tenant_id=resource_config.azure_tenant_id,
-                azure_application_id=resource_config.azure_application_id,
-                azure_application_key=resource_config.azure_application_key,
+            azure_client = self._get_azure_client(
+                resource_config=resource_config,
+                reservation_info=reservation_info,
+                cache_reads=True,
+                priority=ArmRequestScheduler.PRIORITY_LOW,
                 logger=logger,
             )
 
+            if len(request_actions.deployed_apps) >= self.VM_DETAILS_SNAPSHOT_MIN_APPS:
+                snapshot = ResourceGroupSnapshot(
+                    azure_client=azure_client,
+                    resource_group_name=reservation_info.get_resource_group_name(),
+                    logger=logger,
+                )
+                azure_client = SnapshotAzureClient(
+                    azure_client=azure_client, snapshot=snapshot
+                )
+
             vm_details_flow = AzureGetVMDetailsFlow(
                 resource_config=resource_config,
                 azure_client=azure_client,
@@ -510,7 +1020,18 @@ class AzureDriver(ResourceDriverInterface):
                 logger=logger,
             )
 
-            return vm_details_flow.get_vm_details(request_actions=request_actions)
+            if len(request_actions.deployed_apps) < 2:
+                return vm_details_flow.get_vm_details(request_actions=request_actions)
+
+            with cancellation_manager:
+                return get_vm_details_concurrently(
+                    vm_details_flow=vm_details_flow,
+                    request_actions=request_actions,
+                    max_workers=self.VM_DETAILS_CONCURRENCY,
+                    timeout=self.VM_DETAILS_TIMEOUT,
+                    is_cancelled=lambda: cancellation_context.is_cancelled,
+                    logger=logger,
+                )
 
     def DeleteInstance(self, context, ports):
         """Called when removing a deployed App from the sandbox.
@@ -520,32 +1041,27 @@ class AzureDriver(ResourceDriverInterface):
         :param ResourceRemoteCommandContext context:
         :param ports:
         """
-        with LoggingSessionContext(context) as logger:
+        from cloudshell.cp.azure.flows.delete_instance import AzureDeleteInstanceFlow
+
+        with self._command_session(context, command="DeleteInstance") as logger:
             logger.info("Starting Delete Instance command...")
             api = CloudShellSessionContext(context).get_api()
-            resource_config = AzureResourceConfig.from_context(
-                shell_name=self.SHELL_NAME, context=context, api=api
-            )
+            resource_config = self._get_resource_config(context=context, api=api)
 
             reservation_info = AzureReservationInfo.from_remote_resource_context(
                 context
             )
-            cs_ip_pool_manager = CSIPPoolManager(cs_api=api, logger=logger)
 
-            azure_client = AzureAPIClient(
-                azure_subscription_id=resource_config.azure_subscription_id,
-                azure_tenant_id=resource_config.azure_tenant_id,
-                azure_application_id=resource_config.azure_application_id,
-                azure_application_key=resource_config.azure_application_key,
+            azure_client = self._get_azure_client(
+                resource_config=resource_config,
+                reservation_info=reservation_info,
+                priority=ArmRequestScheduler.PRIORITY_HIGH,
                 logger=logger,
             )
 
-            for deploy_app_cls in (
-                AzureVMFromMarketplaceDeployedApp,
-                AzureVMFromCustomImageDeployedApp,
-                AzureVMFromSharedGalleryImageDeployedApp,
-            ):
-                GetVMDetailsRequestActions.register_deployment_path(deploy_app_cls)
+            cs_ip_pool_manager = CSIPPoolManager(cs_api=api, logger=logger)
+
+            register_deployment_paths()
 
             resource = context.remote_endpoints[0]
             deployed_vm_actions = DeployedVMActions.from_remote_resource(
@@ -576,63 +1092,81 @@ class AzureDriver(ResourceDriverInterface):
         :return:
         :rtype: str
         """
-        with LoggingSessionContext(context) as logger:
+        from sandbox_cleanup import ParallelCleanupSandboxInfraFlow
+
+        with self._command_session(context, command="CleanupSandboxInfra") as logger:
             logger.info("Starting Cleanup Sandbox Infra command...")
             api = CloudShellSessionContext(context).get_api()
-            resource_config = AzureResourceConfig.from_context(
-                shell_name=self.SHELL_NAME, context=context, api=api
-            )
+            resource_config = self._get_resource_config(context=context, api=api)
 
             request_actions = CleanupSandboxInfraRequestActions.from_request(request)
             reservation_info = AzureReservationInfo.from_resource_context(context)
 
-            azure_client = AzureAPIClient(
-                azure_subscription_id=resource_config.azure_subscription_id,
-                azure_tenant_id=resource_config.azure_tenant_id,
-                azure_application_id=resource_config.azure_application_id,
-                azure_application_key=resource_config.azure_application_key,
+            azure_client = self._get_azure_client(
+                resource_config=resource_config,
+                reservation_info=reservation_info,
+                priority=ArmRequestScheduler.PRIORITY_HIGH,
                 logger=logger,
             )
 
-            cleanup_flow = AzureCleanupSandboxInfraFlow(
+            cleanup_flow = ParallelCleanupSandboxInfraFlow(
                 resource_config=resource_config,
                 azure_client=azure_client,
                 reservation_info=reservation_info,
                 lock_manager=self.lock_manager,
+                max_workers=self.CLEANUP_CONCURRENCY,
                 logger=logger,
             )
 
-            return cleanup_flow.cleanup(request_actions=request_actions)
+            try:
+                return cleanup_flow.cleanup(request_actions=request_actions)
+            finally:
+                self._azure_read_cache.invalidate(
+                    reservation_id=reservation_info.reservation_id
+                )
+                self._prepared_sandbox_cache.invalidate(
+                    reservation_id=reservation_info.reservation_id
+                )
 
     def CreateRouteTables(self, context, request):
-        with LoggingSessionContext(context) as logger:
+        """Create Route Tables and associate them with the sandbox subnets.
+
+        Request with "dry_run": true is only validated and the plan is returned.
+        :param ResourceCommandContext context:
+        :param str request:
+        :return:
+        :rtype: str
+        """
+        from route_tables import ParallelCreateRouteTablesFlow
+
+        with self._command_session(context, command="CreateRouteTables") as logger:
             logger.info("Starting Create Route Tables command...")
             api = CloudShellSessionContext(context).get_api()
 
-            resource_config = AzureResourceConfig.from_context(
-                shell_name=self.SHELL_NAME, context=context, api=api
-            )
+            resource_config = self._get_resource_config(context=context, api=api)
 
             request_actions = CreateRouteTablesRequestActions.from_request(request)
             reservation_info = AzureReservationInfo.from_resource_context(context)
 
-            azure_client = AzureAPIClient(
-                azure_subscription_id=resource_config.azure_subscription_id,
-                azure_tenant_id=resource_config.azure_tenant_id,
-                azure_application_id=resource_config.azure_application_id,
-                azure_application_key=resource_config.azure_application_key,
+            azure_client = self._get_azure_client(
+                resource_config=resource_config,
+                reservation_info=reservation_info,
                 logger=logger,
             )
 
-            route_table_flow = CreateRouteTablesFlow(
+            route_table_flow = ParallelCreateRouteTablesFlow(
                 resource_config=resource_config,
                 reservation_info=reservation_info,
                 azure_client=azure_client,
                 cs_api=api,
+                max_workers=self.ROUTE_TABLES_CONCURRENCY,
                 logger=logger,
             )
 
-            return route_table_flow.create_route_tables(request_actions=request_actions)
+            return route_table_flow.create_route_tables(
+                request_actions=request_actions,
+                dry_run=json.loads(request).get("dry_run", False),
+            )
 
     def SetAppSecurityGroups(self, context, request):
         """Called via cloudshell API call.
@@ -650,30 +1184,29 @@ class AzureDriver(ResourceDriverInterface):
         :return:
         :rtype: str
         """
-        with LoggingSessionContext(context) as logger:
+        from app_security_groups import BatchedAppSecurityGroupsFlow
+
+        with self._command_session(context, command="SetAppSecurityGroups") as logger:
             logger.info("Starting Set App Security Groups command...")
             logger.debug(f"Request: {request}")
             api = CloudShellSessionContext(context).get_api()
-            resource_config = AzureResourceConfig.from_context(
-                shell_name=self.SHELL_NAME, context=context, api=api
-            )
+            resource_config = self._get_resource_config(context=context, api=api)
 
             request_actions = SetAppSecurityGroupsRequestActions.from_request(request)
             reservation_info = AzureReservationInfo.from_resource_context(context)
 
-            azure_client = AzureAPIClient(
-                azure_subscription_id=resource_config.azure_subscription_id,
-                azure_tenant_id=resource_config.azure_tenant_id,
-                azure_application_id=resource_config.azure_application_id,
-                azure_application_key=resource_config.azure_application_key,
+            azure_client = self._get_azure_client(
+                resource_config=resource_config,
+                reservation_info=reservation_info,
                 logger=logger,
             )
 
-            app_security_groups_flow = AzureAppSecurityGroupsFlow(
+            app_security_groups_flow = BatchedAppSecurityGroupsFlow(
                 resource_config=resource_config,
                 azure_client=azure_client,
                 reservation_info=reservation_info,
                 lock_manager=self.lock_manager,
+                max_workers=self.SECURITY_GROUPS_CONCURRENCY,
                 logger=logger,
             )
 
@@ -687,35 +1220,40 @@ class AzureDriver(ResourceDriverInterface):
         This function is called every time a driver instance is destroyed.
         This is a good place to close any open sessions, finish writing
         to log files, etc.
+        Caches and the long-running operation poller are shared by all driver
+        instances of the process, so only the state of the instance's cloud
+        provider resource is released, when no other driver instance uses it.
         """
-        pass
+        if self._resource_name is None:
+            return
+
+        if self._warm_contexts.stop(resource_name=self._resource_name):
+            self._azure_client_cache.invalidate(resource_name=self._resource_name)
+            self._resource_config_cache.invalidate(resource_name=self._resource_name)
 
     def GetApplicationPorts(self, context, ports):
-        with LoggingSessionContext(context) as logger:
+        from cloudshell.cp.azure.flows.application_ports import (
+            AzureGetApplicationPortsFlow,
+        )
+
+        with self._command_session(context, command="GetApplicationPorts") as logger:
             logger.info("Starting Get Application Ports command...")
             api = CloudShellSessionContext(context).get_api()
-            resource_config = AzureResourceConfig.from_context(
-                shell_name=self.SHELL_NAME, context=context, api=api
-            )
+            resource_config = self._get_resource_config(context=context, api=api)
 
             reservation_info = AzureReservationInfo.from_remote_resource_context(
                 context
             )
 
-            azure_client = AzureAPIClient(
-                azure_subscription_id=resource_config.azure_subscription_id,
-                azure_tenant_id=resource_config.azure_tenant_id,
-                azure_application_id=resource_config.azure_application_id,
-                azure_application_key=resource_config.azure_application_key,
+            azure_client = self._get_azure_client(
+                resource_config=resource_config,
+                reservation_info=reservation_info,
+                cache_reads=True,
+                priority=ArmRequestScheduler.PRIORITY_LOW,
                 logger=logger,
             )
 
-            for deploy_app_cls in (
-                AzureVMFromMarketplaceDeployedApp,
-                AzureVMFromCustomImageDeployedApp,
-                AzureVMFromSharedGalleryImageDeployedApp,
-            ):
-                DeployedVMActions.register_deployment_path(deploy_app_cls)
+            register_deployment_paths()
 
             resource = context.remote_endpoints[0]
             deployed_vm_actions = DeployedVMActions.from_remote_resource(
@@ -734,22 +1272,22 @@ class AzureDriver(ResourceDriverInterface):
             )
 
     def GetAccessKey(self, context, ports):
-        with LoggingSessionContext(context) as logger:
+        from cloudshell.cp.azure.flows.access_key import AzureGetAccessKeyFlow
+
+        with self._command_session(context, command="GetAccessKey") as logger:
             logger.info("Starting Get Access Key command...")
             api = CloudShellSessionContext(context).get_api()
-            resource_config = AzureResourceConfig.from_context(
-                shell_name=self.SHELL_NAME, context=context, api=api
-            )
+            resource_config = self._get_resource_config(context=context, api=api)
 
             reservation_info = AzureReservationInfo.from_remote_resource_context(
                 context
             )
 
-            azure_client = AzureAPIClient(
-                azure_subscription_id=resource_config.azure_subscription_id,
-                azure_tenant_id=resource_config.azure_tenant_id,
-                azure_application_id=resource_config.azure_application_id,
-                azure_application_key=resource_config.azure_application_key,
+            azure_client = self._get_azure_client(
+                resource_config=resource_config,
+                reservation_info=reservation_info,
+                cache_reads=True,
+                priority=ArmRequestScheduler.PRIORITY_LOW,
                 logger=logger,
             )
 
@@ -763,26 +1301,28 @@ class AzureDriver(ResourceDriverInterface):
             return access_key_flow.get_access_key()
 
     def GetAvailablePrivateIP(self, context, subnet_cidr, owner):
-        with LoggingSessionContext(context) as logger:
+        from cloudshell.cp.azure.flows.available_ip import (
+            AzureGetAvailablePrivateIPFlow,
+        )
+
+        with self._command_session(context, command="GetAvailablePrivateIP") as logger:
             logger.info("Starting Get Available Private IP command...")
             api = CloudShellSessionContext(context).get_api()
-            resource_config = AzureResourceConfig.from_context(
-                shell_name=self.SHELL_NAME, context=context, api=api
-            )
+            resource_config = self._get_resource_config(context=context, api=api)
 
             reservation_info = AzureReservationInfo.from_remote_resource_context(
                 context
             )
-            cs_ip_pool_manager = CSIPPoolManager(cs_api=api, logger=logger)
 
-            azure_client = AzureAPIClient(
-                azure_subscription_id=resource_config.azure_subscription_id,
-                azure_tenant_id=resource_config.azure_tenant_id,
-                azure_application_id=resource_config.azure_application_id,
-                azure_application_key=resource_config.azure_application_key,
+            azure_client = self._get_azure_client(
+                resource_config=resource_config,
+                reservation_info=reservation_info,
+                cache_reads=True,
                 logger=logger,
             )
 
+            cs_ip_pool_manager = CSIPPoolManager(cs_api=api, logger=logger)
+
             get_available_ip_flow = AzureGetAvailablePrivateIPFlow(
                 resource_config=resource_config,
                 azure_client=azure_client,
@@ -0,0 +1,124 @@
+import functools
+
+from cache import TTLCache
+from client_proxy import AzureClientProxy
+from single_flight import SingleFlight
+
+# Azure API client methods that resolve the VM image reference
+IMAGE_METHODS = frozenset(
+    {
+        "get_latest_virtual_machine_image",
+        "get_custom_virtual_machine_image",
+        "get_gallery_machine_image",
+        "get_gallery_machine_image_version",
+    }
+)
+
+
+def _normalize(value):
+    # region, image and gallery names are case-insensitive in Azure
+    return value.lower() if isinstance(value, str) else value
+
+
+class ImageMetadataCache:
+    """Process-wide cache of the VM images resolved for the deploys.
+
+    Images are shared by all reservations, so the same App deployed many times
+    resolves its image (latest version, OS type, purchase plan, image ID) once
+    per TTL. Concurrent lookups of the same image wait for one Azure call.
+    """
+
+    # new marketplace image versions and re-created custom images are picked up
+    # after the TTL
+    IMAGE_TTL = 30 * 60
+    MAX_IMAGES = 256
+
+    def __init__(self, ttl=IMAGE_TTL, max_size=MAX_IMAGES):
+        """Init command.
+
+        :param float ttl: time to live of the image in seconds
+        :param int max_size:
+        """
+        self._images = TTLCache(max_size=max_size, ttl=ttl)
+        self._single_flight = SingleFlight()
+
+    @staticmethod
+    def get_key(subscription_id, method_name, args, kwargs):
+        """Get image key from the region and image identity of the lookup.
+
+        :param str subscription_id:
+        :param str method_name:
+        :param tuple args:
+        :param dict kwargs:
+        :rtype: tuple
+        """
+        return (
+            subscription_id,
+            method_name,
+            tuple(_normalize(arg) for arg in args),
+            tuple(sorted((name, _normalize(arg)) for name, arg in kwargs.items())),
+        )
+
+    def get_or_read(self, key, read):
+        """Get cached image or read it once for all concurrent lookups.
+
+        Failed lookups are not cached.
+        :param tuple key:
+        :param read: function that reads the image
+        :return:
+        """
+        sentinel = object()
+        image = self._images.get(key, sentinel)
+        if image is not sentinel:
+            return image
+
+        def read_and_cache():
+            image = self._images.get(key, sentinel)
+            if image is sentinel:
+                image = read()
+                self._images.set(key, image)
+            return image
+
+        return self._single_flight.do(key, read_and_cache)
+
+    def clear(self):
+        self._images.clear()
+
+
+class ImageCachingAzureClient(AzureClientProxy):
+    """Azure API client that resolves images via the image metadata cache."""
+
+    def __init__(self, azure_client, image_cache, subscription_id):
+        """Init command.
+
+        :param cloudshell.cp.azure.azure_client.AzureAPIClient azure_client:
+        :param ImageMetadataCache image_cache:
+        :param str subscription_id: subscription of the Azure API client
+        """
+        super().__init__(azure_client)
+        self._image_cache = image_cache
+        self._subscription_id = subscription_id
+
+    def __getattr__(self, name):
+        attr = super().__getattr__(name)
+        if name not in IMAGE_METHODS:
+            return attr
+
+        @functools.wraps(attr)
+        def get_image(*args, **kwargs):
+            key = self._image_cache.get_key(
+                subscription_id=self._subscription_id,
+                method_name=name,
+                args=args,
+                kwargs=kwargs,
+            )
+            try:
+                hash(key)
+            except TypeError:
+                return attr(*args, **kwargs)
+
+            return self._image_cache.get_or_read(
+                key=key, read=lambda: attr(*args, **kwargs)
+            )
+
+        return get_image
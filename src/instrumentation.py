@@ -0,0 +1,326 @@
+import contextvars
+import functools
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+from dataclasses import asdict, dataclass, field
+
+from client_proxy import AzureClientProxy
+from metrics import Histogram
+
+_current_command = contextvars.ContextVar("current_command", default=None)
+
+
+@dataclass
+class CommandRun:
+    """Timings of one driver command collected from all its threads."""
+
+    command: str
+    reservation_id: str
+    started_at: float = field(repr=False)
+    logger: object = field(default=None, repr=False)
+    azure_calls: int = 0
+    azure_call_time: float = 0.0
+    arm_wait_time: float = 0.0
+    throttling_retries: int = 0
+
+    def to_dict(self):
+        data = asdict(self)
+        del data["started_at"], data["logger"]
+        return data
+
+
+def get_reservation_id(context):
+    """Get reservation id from the command context.
+
+    :param context: resource or remote resource command context
+    :rtype: str | None
+    """
+    for name in ("reservation", "remote_reservation"):
+        reservation = getattr(context, name, None)
+        if reservation is not None:
+            return reservation.reservation_id
+
+    return None
+
+
+def _escape_label_value(value):
+    """Escape label value as required by the OpenMetrics text format.
+
+    :param value:
+    :rtype: str
+    """
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_labels(labels):
+    return ",".join(f'{name}="{_escape_label_value(value)}"' for name, value in labels)
+
+
+def _format_bound(bound):
+    return "+Inf" if bound == float("inf") else repr(float(bound))
+
+
+class Instrumentation:
+    """Process-wide timings of the driver commands and Azure API calls.
+
+    Every command collects its Azure calls, ARM scheduler waits and throttling
+    retries, also from the threads started via concurrency.run_concurrently.
+    Per-call and per-command records are written to the command log as JSON,
+    aggregated histograms and counters can be dumped in the OpenMetrics text
+    format, optionally to the textfile after every command.
+    """
+
+    def __init__(self, textfile_path=None, timer=time.monotonic):
+        """Init command.
+
+        :param str textfile_path: file for the metrics dump, None - don't dump
+        :param timer: monotonic clock function
+        """
+        self._textfile_path = textfile_path
+        self._timer = timer
+        self._histograms = {}
+        self._counters = {}
+        self._collectors = []
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _get_key(name, labels):
+        return name, tuple(sorted(labels.items()))
+
+    def observe(self, name, value, **labels):
+        """Add value to the histogram.
+
+        :param str name:
+        :param float value: seconds
+        :param labels:
+        :return:
+        """
+        key = self._get_key(name, labels)
+        with self._lock:
+            histogram = self._histograms.get(key)
+            if histogram is None:
+                histogram = self._histograms[key] = Histogram()
+        histogram.observe(value)
+
+    def increment(self, name, value=1, **labels):
+        key = self._get_key(name, labels)
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + value
+
+    def add_collector(self, collector):
+        """Add source of the extra histograms for the metrics dump.
+
+        :param collector: function that returns list of tuples with the name,
+            the labels dict and the Histogram snapshot
+        :return:
+        """
+        self._collectors.append(collector)
+
+    @staticmethod
+    def get_current_command():
+        """Get command that runs in the current context.
+
+        :rtype: CommandRun | None
+        """
+        return _current_command.get()
+
+    @contextmanager
+    def command(self, command, reservation_id, logger=None):
+        """Measure the driver command.
+
+        :param str command:
+        :param str reservation_id:
+        :param logging.Logger logger: command logger for the timing records
+        :rtype: CommandRun
+        """
+        run = CommandRun(
+            command=command,
+            reservation_id=reservation_id,
+            started_at=self._timer(),
+            logger=logger,
+        )
+        token = _current_command.set(run)
+        status = "error"
+        try:
+            yield run
+            status = "success"
+        finally:
+            _current_command.reset(token)
+            duration = self._timer() - run.started_at
+            self.observe(
+                "command_duration_seconds", duration, command=command, status=status
+            )
+            if logger is not None:
+                record = {"duration": duration, "status": status, **run.to_dict()}
+                logger.info(f"Command timings: {json.dumps(record)}")
+            if self._textfile_path:
+                self.write_textfile(self._textfile_path)
+
+    def observe_azure_call(self, method, duration, status):
+        """Record Azure API client call.
+
+        :param str method: Azure API client method name
+        :param float duration: seconds, including waiting for the operation result
+        :param str status: "success" or "error"
+        :return:
+        """
+        run = self.get_current_command()
+        command = run.command if run else ""
+        self.observe(
+            "azure_call_duration_seconds",
+            duration,
+            command=command,
+            method=method,
+            status=status,
+        )
+        if run is None:
+            return
+
+        with self._lock:
+            run.azure_calls += 1
+            run.azure_call_time += duration
+        if run.logger is not None:
+            record = {
+                "command": command,
+                "reservation_id": run.reservation_id,
+                "method": method,
+                "duration": duration,
+                "status": status,
+            }
+            run.logger.debug(f"Azure call timings: {json.dumps(record)}")
+
+    def observe_arm_wait(self, kind, duration):
+        """Record time the ARM request waited in the request scheduler.
+
+        :param str kind: "reads", "writes" or "deletes"
+        :param float duration: seconds
+        :return:
+        """
+        self.observe("arm_request_wait_seconds", duration, kind=kind)
+        run = self.get_current_command()
+        if run is not None:
+            with self._lock:
+                run.arm_wait_time += duration
+
+    def increment_throttling_retries(self, kind):
+        self.increment("arm_throttling_retries_total", kind=kind)
+        run = self.get_current_command()
+        if run is not None:
+            with self._lock:
+                run.throttling_retries += 1
+
+    def increment_lro_polls(self):
+        self.increment("lro_polls_total")
+
+    def get_openmetrics(self):
+        """Dump all metrics in the OpenMetrics text format.
+
+        :rtype: str
+        """
+        with self._lock:
+            histograms = [
+                (name, labels, histogram.get_snapshot())
+                for (name, labels), histogram in self._histograms.items()
+            ]
+            counters = list(self._counters.items())
+
+        for collector in self._collectors:
+            histograms.extend(
+                (name, tuple(sorted(labels.items())), snapshot)
+                for name, labels, snapshot in collector()
+            )
+
+        lines = []
+        for name in sorted({name for name, _, _ in histograms}):
+            lines.append(f"# TYPE {name} histogram")
+            for metric_name, labels, snapshot in histograms:
+                if metric_name != name:
+                    continue
+                for bound, count in snapshot["buckets"].items():
+                    bucket_labels = _format_labels(
+                        (*labels, ("le", _format_bound(bound)))
+                    )
+                    lines.append(f"{name}_bucket{{{bucket_labels}}} {count}")
+                lines.append(
+                    f"{name}_count{{{_format_labels(labels)}}} {snapshot['count']}"
+                )
+                lines.append(
+                    f"{name}_sum{{{_format_labels(labels)}}} {snapshot['sum']}"
+                )
+
+        for name in sorted({name for (name, _), _ in counters}):
+            lines.append(f"# TYPE {name} counter")
+            for (metric_name, labels), value in counters:
+                if metric_name == name:
+                    lines.append(f"{name}{{{_format_labels(labels)}}} {value}")
+
+        lines.append("# EOF")
+        return "\n".join(lines) + "\n"
+
+    def write_textfile(self, path):
+        """Atomically write the metrics dump, i.e. for the node exporter.
+
+        :param str path:
+        :return:
+        """
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp_path, "w") as f:
+            f.write(self.get_openmetrics())
+        os.replace(tmp_path, path)
+
+    def clear(self):
+        with self._lock:
+            self._histograms.clear()
+            self._counters.clear()
+
+
+def get_lock_metrics_collector(lock_manager):
+    """Get collector of the wait and hold times of the keyed locks.
+
+    :param lock_manager.KeyedLockManager lock_manager:
+    """
+
+    def collect():
+        for key, metrics in lock_manager.get_metrics().items():
+            yield "lock_wait_seconds", {"key": key}, metrics["wait"]
+            yield "lock_hold_seconds", {"key": key}, metrics["hold"]
+
+    return collect
+
+
+class InstrumentedAzureClient(AzureClientProxy):
+    """Azure API client which calls are timed by the instrumentation."""
+
+    def __init__(self, azure_client, instrumentation, timer=time.monotonic):
+        """Init command.
+
+        :param cloudshell.cp.azure.azure_client.AzureAPIClient azure_client:
+        :param Instrumentation instrumentation:
+        :param timer: monotonic clock function
+        """
+        super().__init__(azure_client)
+        self._instrumentation = instrumentation
+        self._timer = timer
+
+    def __getattr__(self, name):
+        attr = super().__getattr__(name)
+        if name.startswith("_") or not callable(attr):
+            return attr
+
+        @functools.wraps(attr)
+        def call(*args, **kwargs):
+            started_at = self._timer()
+            status = "error"
+            try:
+                result = attr(*args, **kwargs)
+                status = "success"
+                return result
+            finally:
+                self._instrumentation.observe_azure_call(
+                    method=name, duration=self._timer() - started_at, status=status
+                )
+
+        return call
@@ -0,0 +1,177 @@
+import threading
+import time
+
+from cache import TTLCache
+from metrics import Histogram
+
+
+class LockTimeoutError(TimeoutError):
+    """Lock wasn't acquired in time."""
+
+
+class _KeyState:
+    """Lock of one key."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        # handles that are waiting for or holding the lock
+        self.users = 0
+
+
+class _KeyMetrics:
+    def __init__(self):
+        self.wait = Histogram()
+        self.hold = Histogram()
+        self.timeouts = 0
+
+
+class KeyedLock:
+    """Exclusive lock of one key.
+
+    Handle is a context manager like threading.Lock, it must not be shared
+    between the threads.
+    """
+
+    def __init__(self, manager, key, timeout):
+        """Init command.
+
+        :param KeyedLockManager manager:
+        :param str key:
+        :param float timeout: default acquire timeout, None - wait forever
+        """
+        self._manager = manager
+        self.key = key
+        self._timeout = timeout
+        self._acquired_at = None
+
+    def acquire(self, timeout=None):
+        """Acquire the lock.
+
+        :param float timeout: None - use the default timeout of the lock
+        :raises LockTimeoutError:
+        """
+        timeout = self._timeout if timeout is None else timeout
+        self._manager._acquire(self.key, timeout)
+        self._acquired_at = self._manager._timer()
+
+    def release(self):
+        self._manager._release(self.key, self._acquired_at)
+        self._acquired_at = None
+
+    def __enter__(self):
+        self.acquire()
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.release()
+
+
+class KeyedLockManager:
+    """Process-wide exclusive locks per resource key.
+
+    Drop-in replacement of the ThreadLockManager used by the flows: locks are
+    created atomically, removal of the lock that is in use is postponed until it
+    is released, acquiring waits for at most LOCK_TIMEOUT. Wait and hold times
+    are collected per key to find the contention. Flows lock only the
+    read-modify-write of one NSG, so there are no shared or multi-key locks.
+    """
+
+    LOCK_TIMEOUT = 30 * 60
+    MAX_METRICS_KEYS = 1024
+
+    def __init__(self, timeout=LOCK_TIMEOUT, timer=time.monotonic):
+        """Init command.
+
+        :param float timeout: default acquire timeout, None - wait forever
+        :param timer: monotonic clock function
+        """
+        self._timeout = timeout
+        self._timer = timer
+        self._keys = {}
+        self._removed_keys = set()
+        self._metrics = TTLCache(max_size=self.MAX_METRICS_KEYS)
+        self._lock = threading.Lock()
+
+    def get_lock(self, key, timeout=None):
+        """Get exclusive lock of the key.
+
+        :param str key:
+        :param float timeout: None - use the default timeout
+        :rtype: KeyedLock
+        """
+        return KeyedLock(
+            manager=self,
+            key=key,
+            timeout=self._timeout if timeout is None else timeout,
+        )
+
+    def remove_lock(self, key):
+        """Remove lock of the key when it isn't used anymore.
+
+        :param str key:
+        :return:
+        """
+        with self._lock:
+            state = self._keys.get(key)
+            if state is None:
+                return
+            if state.users:
+                self._removed_keys.add(key)
+            else:
+                del self._keys[key]
+
+    def _get_key_metrics(self, key):
+        with self._lock:
+            metrics = self._metrics.get(key)
+            if metrics is None:
+                metrics = _KeyMetrics()
+                self._metrics.set(key, metrics)
+
+        return metrics
+
+    def _acquire(self, key, timeout):
+        with self._lock:
+            state = self._keys.setdefault(key, _KeyState())
+            state.users += 1
+            self._removed_keys.discard(key)
+
+        started_at = self._timer()
+        acquired = state.lock.acquire(timeout=-1 if timeout is None else timeout)
+
+        metrics = self._get_key_metrics(key)
+        metrics.wait.observe(self._timer() - started_at)
+        if not acquired:
+            with self._lock:
+                metrics.timeouts += 1
+            self._release_user(key, state)
+            raise LockTimeoutError(f"Unable to acquire lock '{key}' in {timeout}s")
+
+    def _release(self, key, acquired_at):
+        with self._lock:
+            state = self._keys[key]
+
+        state.lock.release()
+        if acquired_at is not None:
+            self._get_key_metrics(key).hold.observe(self._timer() - acquired_at)
+        self._release_user(key, state)
+
+    def _release_user(self, key, state):
+        with self._lock:
+            state.users -= 1
+            if not state.users and key in self._removed_keys:
+                self._removed_keys.discard(key)
+                del self._keys[key]
+
+    def get_metrics(self):
+        """Get wait and hold time histograms per lock key.
+
+        :rtype: dict[str, dict]
+        """
+        return {
+            key: {
+                "wait": metrics.wait.get_snapshot(),
+                "hold": metrics.hold.get_snapshot(),
+                "timeouts": metrics.timeouts,
+            }
+            for key, metrics in self._metrics.items()
+        }
@@ -0,0 +1,177 @@
+import heapq
+import itertools
+import threading
+import time
+from concurrent.futures import CancelledError, Future, ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import Any, Callable
+
+
+@dataclass
+class PollResult:
+    done: bool
+    result: Any = None
+    # seconds to wait before the next poll, None - use the operation interval
+    retry_after: float = None
+
+
+@dataclass
+class _Operation:
+    key: Any
+    poll: Callable
+    interval: float
+    future: Future = field(default_factory=Future)
+    polls: int = 0
+
+
+class SharedLROPoller:
+    """Process-wide poller of the long-running operations.
+
+    One scheduler thread multiplexes polls of all outstanding operations and
+    a small pool sends them, so commands don't keep a polling thread per
+    operation. Operations with the same key are polled once and share the result.
+    """
+
+    POLL_INTERVAL = 5
+    POLL_WORKERS = 4
+
+    def __init__(
+        self,
+        interval=POLL_INTERVAL,
+        poll_workers=POLL_WORKERS,
+        instrumentation=None,
+        timer=time.monotonic,
+    ):
+        """Init command.
+
+        :param float interval: default seconds between the polls of the operation
+        :param int poll_workers: max number of the concurrent polls
+        :param instrumentation.Instrumentation instrumentation:
+        :param timer: monotonic clock function
+        """
+        self._interval = interval
+        self._instrumentation = instrumentation
+        self._poll_workers = poll_workers
+        self._timer = timer
+        self._condition = threading.Condition()
+        self._operations = {}
+        self._schedule = []
+        self._counter = itertools.count()
+        self._thread = None
+        self._executor = None
+
+    def submit(self, key, poll, initial_delay=None, interval=None):
+        """Start polling the operation.
+
+        :param key: operation key, pending operation with the same key is reused
+        :param poll: function that checks operation status, returns PollResult
+        :param float initial_delay: seconds before the first poll
+        :param float interval: seconds between the polls
+        :rtype: concurrent.futures.Future
+        """
+        with self._condition:
+            operation = self._operations.get(key)
+            if operation is not None:
+                return operation.future
+
+            operation = _Operation(
+                key=key, poll=poll, interval=interval or self._interval
+            )
+            self._operations[key] = operation
+            delay = operation.interval if initial_delay is None else initial_delay
+            self._schedule_poll(operation, delay)
+            self._start()
+            return operation.future
+
+    def is_pending(self, key):
+        with self._condition:
+            return key in self._operations
+
+    def _start(self):
+        if self._thread is None:
+            self._executor = ThreadPoolExecutor(max_workers=self._poll_workers)
+            self._thread = threading.Thread(
+                target=self._run, name="lro-poller", daemon=True
+            )
+            self._thread.start()
+
+    def _schedule_poll(self, operation, delay):
+        heapq.heappush(
+            self._schedule,
+            (self._timer() + delay, next(self._counter), operation),
+        )
+        self._condition.notify_all()
+
+    def _run(self):
+        thread = threading.current_thread()
+        while True:
+            with self._condition:
+                while self._thread is thread:
+                    now = self._timer()
+                    if self._schedule and self._schedule[0][0] <= now:
+                        break
+                    timeout = self._schedule[0][0] - now if self._schedule else None
+                    self._condition.wait(timeout)
+                else:
+                    return
+
+                _, _, operation = heapq.heappop(self._schedule)
+                executor = self._executor
+
+            try:
+                executor.submit(self._poll, operation)
+            except RuntimeError:
+                # poller was shut down
+                return
+
+    def _finish(self, operation, result=None, error=None):
+        with self._condition:
+            self._operations.pop(operation.key, None)
+
+        if operation.future.done():
+            return
+        if error is None:
+            operation.future.set_result(result)
+        else:
+            operation.future.set_exception(error)
+
+    def _poll(self, operation):
+        operation.polls += 1
+        if self._instrumentation is not None:
+            self._instrumentation.increment_lro_polls()
+        try:
+            poll_result = operation.poll()
+        except Exception as e:
+            self._finish(operation, error=e)
+            return
+
+        if poll_result.done:
+            self._finish(operation, result=poll_result.result)
+            return
+
+        delay = poll_result.retry_after or operation.interval
+        with self._condition:
+            if self._operations.get(operation.key) is operation:
+                self._schedule_poll(operation, delay)
+
+    def shutdown(self):
+        """Stop polling and cancel all pending operations.
+
+        Poller is started again on the next submitted operation.
+        """
+        with self._condition:
+            operations = list(self._operations.values())
+            self._operations.clear()
+            self._schedule.clear()
+            executor, self._executor = self._executor, None
+            self._thread = None
+            self._condition.notify_all()
+
+        if executor is not None:
+            executor.shutdown(wait=False)
+
+        for operation in operations:
+            if not operation.future.done():
+                operation.future.set_exception(
+                    CancelledError("Long-running operation polling was stopped")
+                )
@@ -0,0 +1,40 @@
+import bisect
+import threading
+
+
+class Histogram:
+    """Thread-safe histogram of the observed durations in seconds."""
+
+    BUCKETS = (0.001, 0.01, 0.1, 0.5, 1, 5, 10, 30, 60, 300)
+
+    def __init__(self, buckets=BUCKETS):
+        """Init command.
+
+        :param tuple[float] buckets: sorted upper bounds of the buckets
+        """
+        self._buckets = tuple(buckets)
+        self._counts = [0] * (len(self._buckets) + 1)
+        self._sum = 0.0
+        self._lock = threading.Lock()
+
+    def observe(self, value):
+        with self._lock:
+            self._counts[bisect.bisect_left(self._buckets, value)] += 1
+            self._sum += value
+
+    def get_snapshot(self):
+        """Get cumulative bucket counts, like in the Prometheus histograms.
+
+        :rtype: dict
+        """
+        with self._lock:
+            counts = list(self._counts)
+            total = self._sum
+
+        buckets = {}
+        cumulative = 0
+        for bound, count in zip((*self._buckets, float("inf")), counts):
+            cumulative += count
+            buckets[bound] = cumulative
+
+        return {"buckets": buckets, "count": cumulative, "sum": total}
@@ -0,0 +1,249 @@
+import copy
+import functools
+
+from cache import TTLCache
+from client_proxy import AzureClientProxy, get_resource_name_and_group
+
+
+def is_read_method(name):
+    """Check if the Azure API client method only reads resources.
+
+    :param str name: method name
+    :rtype: bool
+    """
+    return (
+        name.startswith(("get_", "list_")) and "create" not in name
+    ) or name.endswith("_exists")
+
+
+def has_callbacks(kwargs):
+    """Check if the Azure API client call gets callbacks, i.e. raw_response_hook.
+
+    Callbacks have to see the response of their own call, so such reads are
+    neither cached nor shared between the callers.
+    :param dict kwargs:
+    :rtype: bool
+    """
+    return any(callable(value) for value in kwargs.values())
+
+
+def copy_read_result(result):
+    """Copy the Azure read result that is shared between the commands.
+
+    Flows update the read models before writing them back, so every command
+    gets its own copy. Results that can't be copied are shared.
+    :param result: Azure read result
+    :return:
+    """
+    try:
+        return copy.deepcopy(result)
+    except (copy.Error, TypeError):
+        return result
+
+
+def get_resource_scope(args, kwargs):
+    """Get resource group and resource names of the Azure API client call.
+
+    Resource names are the string arguments which names end with "_name",
+    i.e. vm_name, vnet_name, for the getters with the positional arguments
+    the resource name and the resource group name are taken by their order.
+    :param tuple args:
+    :param dict kwargs:
+    :return: lowercase resource group name, None if it is unknown,
+        and lowercase resource names
+    :rtype: tuple[str | None, frozenset[str]]
+    """
+    resource_group_name = kwargs.get("resource_group_name")
+    names = {
+        value.lower()
+        for name, value in kwargs.items()
+        if name.endswith("_name")
+        and name != "resource_group_name"
+        and isinstance(value, str)
+    }
+
+    if resource_group_name is None:
+        name_and_group = get_resource_name_and_group(args, kwargs)
+        if name_and_group is not None:
+            name, resource_group_name = name_and_group
+            if isinstance(name, str):
+                names.add(name.lower())
+
+    if not isinstance(resource_group_name, str):
+        return None, frozenset(names)
+
+    return resource_group_name.lower(), frozenset(names)
+
+
+class AzureReadCache:
+    """Short-lived cache of the Azure read results scoped by the reservation.
+
+    Reads are cached per subscription, so cloud provider resources of the
+    different subscriptions in one sandbox don't share the results for the
+    resources with the same names.
+    """
+
+    READ_TTL = 10
+    MAX_ENTRIES = 2048
+
+    def __init__(self, ttl=READ_TTL, max_size=MAX_ENTRIES):
+        """Init command.
+
+        :param float ttl: time to live of the read result in seconds
+        :param int max_size:
+        """
+        self._entries = TTLCache(max_size=max_size, ttl=ttl)
+
+    def get_or_read(
+        self, reservation_id, method_name, args, kwargs, read, subscription_id=None
+    ):
+        """Get cached read result or call the read function.
+
+        :param str reservation_id:
+        :param str method_name:
+        :param tuple args:
+        :param dict kwargs:
+        :param read: function that reads the resource
+        :param str subscription_id: subscription of the read resource
+        :return:
+        """
+        key = (
+            reservation_id,
+            subscription_id,
+            method_name,
+            args,
+            tuple(sorted(kwargs.items())),
+        )
+        try:
+            hash(key)
+        except TypeError:
+            return read()
+
+        sentinel = object()
+        result = self._entries.get(key, sentinel)
+        if result is sentinel:
+            result = read()
+            self._entries.set(key, result)
+
+        # commands update the read models, the cached result stays unchanged
+        return copy_read_result(result)
+
+    def invalidate(
+        self,
+        reservation_id,
+        subscription_id=None,
+        resource_group_name=None,
+        resource_names=frozenset(),
+    ):
+        """Evict read results of the reservation that the write could change.
+
+        :param str reservation_id:
+        :param str subscription_id: subscription of the written resources,
+            None - all subscriptions
+        :param str resource_group_name: resource group of the written resources,
+            None - all resource groups of the reservation
+        :param frozenset[str] resource_names: lowercase names of the written
+            resources, empty - all resources of the resource group
+        :return:
+        """
+
+        def is_changed(key):
+            key_reservation_id, key_subscription_id, _, args, kwargs = key
+            if key_reservation_id != reservation_id:
+                return False
+            if subscription_id is not None and key_subscription_id != subscription_id:
+                return False
+            if resource_group_name is None:
+                return True
+
+            read_group_name, read_names = get_resource_scope(args, dict(kwargs))
+            if read_group_name is None:
+                return True
+            if read_group_name != resource_group_name.lower():
+                return False
+            # lists of the resource group and reads of the written resources
+            return (
+                not read_names
+                or not resource_names
+                or bool(read_names & resource_names)
+            )
+
+        self._entries.pop_if(is_changed)
+
+    def clear(self):
+        self._entries.clear()
+
+
+class CachingAzureClient(AzureClientProxy):
+    """Azure API client that caches reads and invalidates them on writes.
+
+    Every call that is not a read can change Azure resources, so the cached reads
+    of the written resources and the lists of their resource group are evicted
+    before and after it. Writes with unknown resource group evict all reads of
+    the reservation.
+    """
+
+    def __init__(
+        self,
+        azure_client,
+        read_cache,
+        reservation_id,
+        cache_reads=True,
+        subscription_id=None,
+    ):
+        """Init command.
+
+        :param cloudshell.cp.azure.azure_client.AzureAPIClient azure_client:
+        :param AzureReadCache read_cache:
+        :param str reservation_id:
+        :param bool cache_reads: False - only invalidate the cache on writes
+        :param str subscription_id: subscription of the Azure API client
+        """
+        super().__init__(azure_client)
+        self._read_cache = read_cache
+        self._reservation_id = reservation_id
+        self._cache_reads = cache_reads
+        self._subscription_id = subscription_id
+
+    def __getattr__(self, name):
+        attr = super().__getattr__(name)
+        if name.startswith("_") or not callable(attr):
+            return attr
+
+        if is_read_method(name):
+            if not self._cache_reads:
+                return attr
+
+            @functools.wraps(attr)
+            def read(*args, **kwargs):
+                if has_callbacks(kwargs):
+                    return attr(*args, **kwargs)
+
+                return self._read_cache.get_or_read(
+                    reservation_id=self._reservation_id,
+                    subscription_id=self._subscription_id,
+                    method_name=name,
+                    args=args,
+                    kwargs=kwargs,
+                    read=lambda: attr(*args, **kwargs),
+                )
+
+            return read
+
+        @functools.wraps(attr)
+        def write(*args, **kwargs):
+            resource_group_name, resource_names = get_resource_scope(args, kwargs)
+            invalidate = functools.partial(
+                self._read_cache.invalidate,
+                reservation_id=self._reservation_id,
+                subscription_id=self._subscription_id,
+                resource_group_name=resource_group_name,
+                resource_names=resource_names,
+            )
+            invalidate()
+            try:
+                return attr(*args, **kwargs)
+            finally:
+                invalidate()
+
+        return write
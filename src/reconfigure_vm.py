@@ -0,0 +1,413 @@
+import time
+from dataclasses import dataclass
+from functools import partial
+from typing import Callable
+
+from azure.core.exceptions import HttpResponseError
+from azure.mgmt.compute import models as compute_models
+from msrestazure.azure_exceptions import CloudError
+
+from concurrency import run_concurrently
+from lro_poller import PollResult
+from vm_power import (
+    get_headers_hook,
+    get_retry_after,
+    get_vm_statuses,
+    wait_for_operation,
+)
+
+from cloudshell.cp.azure.actions.storage_account import StorageAccountActions
+from cloudshell.cp.azure.actions.vm import VMActions
+from cloudshell.cp.azure.exceptions import (
+    AzureTaskTimeoutException,
+    ReconfigureVMException,
+)
+from cloudshell.cp.azure.flows.reconfigure_vm import AzureReconfigureVMFlow, commands
+from cloudshell.cp.azure.utils.disks import (
+    convert_cs_to_azure_os_disk_type,
+    get_disk_lun_generator,
+    is_ultra_disk_in_list,
+    parse_data_disks_input,
+)
+
+
+class CreateZonalDataDiskCommand(commands.CreateDataDiskCommand):
+    """Create VM Data disk in the availability zones of the VM."""
+
+    def __init__(self, *args, zones, **kwargs):
+        """Init command.
+
+        :param list[str] zones: availability zones of the VM
+        """
+        super().__init__(*args, **kwargs)
+        self._zones = zones
+
+    def _execute(self):
+        return self._storage_actions.create_vm_data_disk(
+            disk_name=self._disk_model.name,
+            resource_group_name=self._resource_group_name,
+            vm_name=self._vm_name,
+            region=self._region,
+            disk_size=self._disk_model.disk_size,
+            disk_type=self._disk_model.disk_type or self._disk_model.DEFAULT_DISK_TYPE,
+            tags=self._tags,
+            zones=self._zones,
+        )
+
+
+@dataclass
+class DiskOperation:
+    name: str
+    func: Callable
+    # new Data disk is attached to the VM by the VM update
+    attach: bool = False
+
+
+def _is_disk_changed(disk, disk_size=None, disk_type=None, tags=None):
+    """Check if the disk update would change the disk.
+
+    :param azure.mgmt.compute.models.Disk disk:
+    :param str disk_size:
+    :param str disk_type:
+    :param dict[str, str] tags:
+    :rtype: bool
+    """
+    return any(
+        [
+            disk_size and int(disk_size) != disk.disk_size_gb,
+            disk_type and (disk.sku is None or disk.sku.name != disk_type),
+            tags and tags != disk.tags,
+        ]
+    )
+
+
+class ParallelReconfigureVMFlow(AzureReconfigureVMFlow):
+    """Reconfigure VM that plans all disk changes once and applies them concurrently.
+
+    OS disk and requested Data disks are read concurrently, then disks are
+    resized, updated and created concurrently, skipping updates that don't
+    change the disk. VM size and attachment of the new Data disks are applied
+    by a single VM update, which is skipped when only existing disks change.
+    The VM update is polled by the shared long-running operation poller.
+    Created disks are deleted if any operation fails.
+    """
+
+    VM_UPDATE_TIMEOUT = 30 * 60
+    PROVISIONING_STATE_SUCCEEDED = "ProvisioningState/succeeded"
+    PROVISIONING_STATE_FAILED = "ProvisioningState/failed"
+
+    def __init__(self, *args, max_workers, poller, **kwargs):
+        """Init command.
+
+        :param int max_workers: max number of the concurrent disk operations
+        :param lro_poller.SharedLROPoller poller:
+        """
+        super().__init__(*args, **kwargs)
+        self._max_workers = max_workers
+        self._poller = poller
+
+    def _get_disks(
+        self, storage_actions, vm, resource_group_name, disk_models, get_os_disk
+    ):
+        """Read OS disk and existing requested Data disks concurrently.
+
+        :param StorageAccountActions storage_actions:
+        :param vm:
+        :param str resource_group_name:
+        :param list disk_models: requested Data disks
+        :param bool get_os_disk:
+        :return: OS disk, None if it isn't read, and the Data disks of the models,
+            None for the disks that don't exist
+        :rtype: tuple
+        """
+
+        def get_disk(disk_model):
+            if disk_model is None:
+                return storage_actions.get_disk(
+                    disk_name=vm.storage_profile.os_disk.name,
+                    resource_group_name=resource_group_name,
+                )
+            return storage_actions.get_vm_data_disk(
+                disk_name=disk_model.name,
+                resource_group_name=resource_group_name,
+                vm_name=vm.name,
+            )
+
+        items = [None, *disk_models] if get_os_disk else disk_models
+        task_results = run_concurrently(
+            func=get_disk, items=items, max_workers=self._max_workers
+        )
+        for task_result in task_results:
+            if not task_result.success:
+                raise task_result.error
+
+        disks = [task_result.result for task_result in task_results]
+        if get_os_disk:
+            return disks[0], disks[1:]
+
+        return None, disks
+
+    def _plan_disk_operations(
+        self,
+        storage_actions,
+        vm,
+        resource_group_name,
+        deployed_app,
+        os_disk_size,
+        os_disk_type,
+        disk_models,
+    ):
+        """Plan OS disk and Data disks operations of the reconfiguration.
+
+        :param StorageAccountActions storage_actions:
+        :param vm:
+        :param str resource_group_name:
+        :param deployed_app:
+        :param str os_disk_size:
+        :param str os_disk_type: Azure disk type
+        :param list disk_models: requested Data disks
+        :return: disk operations and existing Data disks of the models,
+            None for the disks that will be created
+        :rtype: tuple[list[DiskOperation], list]
+        """
+        os_disk, disks = self._get_disks(
+            storage_actions=storage_actions,
+            vm=vm,
+            resource_group_name=resource_group_name,
+            disk_models=disk_models,
+            get_os_disk=bool(os_disk_size or os_disk_type),
+        )
+        operations = []
+
+        if os_disk is not None and _is_disk_changed(
+            os_disk, disk_size=os_disk_size, disk_type=os_disk_type
+        ):
+            operations.append(
+                DiskOperation(
+                    name=os_disk.name,
+                    func=partial(
+                        storage_actions.update_disk,
+                        disk=os_disk,
+                        resource_group_name=resource_group_name,
+                        disk_size=os_disk_size,
+                        disk_type=os_disk_type,
+                    ),
+                )
+            )
+
+        if not disk_models:
+            return operations, disks
+
+        tags = self._tags_manager.get_vm_tags(
+            vm_name=vm.name, extended_custom_tags=deployed_app.extended_custom_tags
+        )
+        for disk_model, disk in zip(disk_models, disks):
+            if disk is None:
+                create_command = CreateZonalDataDiskCommand(
+                    rollback_manager=self._rollback_manager,
+                    cancellation_manager=self._cancellation_manager,
+                    storage_actions=storage_actions,
+                    disk_model=disk_model,
+                    resource_group_name=resource_group_name,
+                    region=self._resource_config.region,
+                    vm_name=vm.name,
+                    tags=tags,
+                    zones=vm.zones,
+                )
+                operations.append(
+                    DiskOperation(
+                        name=disk_model.name, func=create_command.execute, attach=True
+                    )
+                )
+            elif _is_disk_changed(
+                disk,
+                disk_size=disk_model.disk_size,
+                disk_type=disk_model.disk_type,
+                tags=tags,
+            ):
+                operations.append(
+                    DiskOperation(
+                        name=disk.name,
+                        func=partial(
+                            storage_actions.update_disk,
+                            disk=disk,
+                            resource_group_name=resource_group_name,
+                            disk_size=disk_model.disk_size,
+                            disk_type=disk_model.disk_type,
+                            tags=tags,
+                        ),
+                    )
+                )
+            else:
+                self._logger.info(f"Data disk {disk.name} is already up to date")
+
+        return operations, disks
+
+    def _run_disk_operations(self, operations):
+        """Run disk operations concurrently.
+
+        :param list[DiskOperation] operations:
+        :return: disks by the operations
+        :rtype: dict[str, azure.mgmt.compute.models.Disk]
+        """
+
+        def run(operation):
+            self._logger.info(f"Processing disk {operation.name}")
+            return operation.func()
+
+        task_results = run_concurrently(
+            func=run, items=operations, max_workers=self._max_workers
+        )
+        for task_result in task_results:
+            if not task_result.success:
+                raise task_result.error
+
+        return {
+            task_result.item.name: task_result.result for task_result in task_results
+        }
+
+    def _update_vm(self, vm, resource_group_name):
+        """Submit the VM update and wait for it via the shared poller.
+
+        :param azure.mgmt.compute.models.VirtualMachine vm:
+        :param str resource_group_name:
+        :return:
+        """
+        self._logger.info("Starting VM update task...")
+        headers = {}
+        try:
+            self._azure_client.begin_update_vm(
+                vm_name=vm.name,
+                resource_group_name=resource_group_name,
+                virtual_machine=vm,
+                raw_response_hook=get_headers_hook(headers),
+            )
+        except (CloudError, HttpResponseError) as e:
+            self._logger.exception("Unable to start update VM task due to:")
+            exp_msg = str(e).lower()
+            if all(["ultrassdenabled" in exp_msg, "deallocated" in exp_msg]):
+                raise ReconfigureVMException(
+                    "Unable to add 'Ultra SSD' Data disk. "
+                    "VM should be in the powered off state."
+                )
+            raise
+
+        def poll():
+            statuses, retry_after = get_vm_statuses(
+                self._azure_client, vm.name, resource_group_name
+            )
+            failed = [
+                code
+                for code in statuses
+                if code.startswith(self.PROVISIONING_STATE_FAILED)
+            ]
+            if failed:
+                raise ReconfigureVMException(
+                    f"VM '{vm.name}' update failed: {failed[0]}"
+                )
+            return PollResult(
+                done=self.PROVISIONING_STATE_SUCCEEDED in statuses,
+                retry_after=retry_after,
+            )
+
+        self._logger.info("Waiting update VM task to be completed...")
+        future = self._poller.submit(
+            key=(resource_group_name.lower(), vm.name.lower(), "update"),
+            poll=poll,
+            initial_delay=get_retry_after(headers),
+        )
+        with self._cancellation_manager:
+            done = wait_for_operation(
+                future,
+                deadline=time.monotonic() + self.VM_UPDATE_TIMEOUT,
+                is_cancelled=lambda: (
+                    self._cancellation_manager.cancellation_context.is_cancelled
+                ),
+            )
+        if not done:
+            raise AzureTaskTimeoutException(
+                f"Unable to update VM within {self.VM_UPDATE_TIMEOUT / 60} minute(s)"
+            )
+        future.result()
+
+    def reconfigure(
+        self, deployed_app, vm_size, os_disk_size, os_disk_type, data_disks
+    ):
+        """Change VM Size and Data Disks."""
+        sandbox_resource_group_name = self._reservation_info.get_resource_group_name()
+        vm_resource_group_name = (
+            deployed_app.resource_group_name or sandbox_resource_group_name
+        )
+        vm_actions = VMActions(azure_client=self._azure_client, logger=self._logger)
+        storage_actions = StorageAccountActions(
+            azure_client=self._azure_client, logger=self._logger
+        )
+
+        vm = vm_actions.get_vm(
+            vm_name=deployed_app.name, resource_group_name=vm_resource_group_name
+        )
+        disk_models = parse_data_disks_input(data_disks) if data_disks else []
+        os_disk_type = (
+            convert_cs_to_azure_os_disk_type(os_disk_type) if os_disk_type else None
+        )
+
+        update_vm = False
+        if vm_size and vm_size.lower() != vm.hardware_profile.vm_size.lower():
+            self._logger.info(f"Setting new VM Size: {vm_size}")
+            vm.hardware_profile.vm_size = vm_size
+            update_vm = True
+
+        with self._rollback_manager:
+            operations, disks = self._plan_disk_operations(
+                storage_actions=storage_actions,
+                vm=vm,
+                resource_group_name=vm_resource_group_name,
+                deployed_app=deployed_app,
+                os_disk_size=os_disk_size,
+                os_disk_type=os_disk_type,
+                disk_models=disk_models,
+            )
+            self._logger.info(
+                f"Processing disks: {[operation.name for operation in operations]}"
+            )
+            results = self._run_disk_operations(operations)
+
+            lun_generator = get_disk_lun_generator(
+                existing_disks=vm.storage_profile.data_disks
+            )
+            for operation in operations:
+                if not operation.attach:
+                    continue
+
+                disk = results[operation.name]
+                vm.storage_profile.data_disks.append(
+                    compute_models.DataDisk(
+                        lun=next(lun_generator),
+                        name=disk.name,
+                        create_option=compute_models.DiskCreateOptionTypes.attach,
+                        managed_disk=compute_models.ManagedDiskParameters(id=disk.id),
+                    )
+                )
+                update_vm = True
+
+            disks = [
+                results.get(disk_model.name) if disk is None else disk
+                for disk_model, disk in zip(disk_models, disks)
+            ]
+            ultra_ssd_enabled = (
+                vm.additional_capabilities is not None
+                and vm.additional_capabilities.ultra_ssd_enabled
+            )
+            if is_ultra_disk_in_list(disks) and not ultra_ssd_enabled:
+                self._logger.info(
+                    "Enabling 'Ultra SSD' additional capability on the VM"
+                )
+                vm.additional_capabilities = compute_models.AdditionalCapabilities(
+                    ultra_ssd_enabled=True
+                )
+                update_vm = True
+
+            if update_vm:
+                self._update_vm(vm=vm, resource_group_name=vm_resource_group_name)
+            else:
+                self._logger.info("VM is not changed, skipping VM update")
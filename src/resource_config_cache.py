@@ -0,0 +1,94 @@
+import hashlib
+import json
+import time
+
+from cloudshell.shell.standards.core.resource_config_entities import PasswordAttrRO
+
+from cache import TTLCache
+
+from cloudshell.cp.azure.resource_config import AzureResourceConfig
+
+
+class ResourceConfigCache:
+    """Memoized AzureResourceConfig per resource and attributes revision.
+
+    Password attributes of the resource config are decrypted via CloudShell API
+    once, when the config is created, so reusing the config object for
+    the unchanged attributes skips the decrypt round-trip. Cached config doesn't
+    keep the API session of the command that created it.
+    """
+
+    # decrypted credentials are kept in memory only while the resource is used
+    CONFIG_TTL = 30 * 60
+    MAX_CONFIGS = 64
+
+    def __init__(self, ttl=CONFIG_TTL, max_size=MAX_CONFIGS, timer=time.monotonic):
+        """Init command.
+
+        :param float ttl:
+        :param int max_size:
+        :param timer: monotonic clock function
+        """
+        self._configs = TTLCache(max_size=max_size, ttl=ttl, timer=timer)
+
+    @staticmethod
+    def _get_key(context):
+        """Get cache key from the resource name and raw attribute values.
+
+        :param context: command context with the cloud provider resource
+        :rtype: tuple
+        """
+        attributes = sorted(dict(context.resource.attributes).items())
+        attributes_hash = hashlib.sha256(
+            json.dumps(attributes, default=str).encode()
+        ).hexdigest()
+
+        return context.resource.name, attributes_hash
+
+    @staticmethod
+    def _detach_api(resource_config):
+        """Decrypt password attributes of the config and drop its API session.
+
+        :param AzureResourceConfig resource_config:
+        :return:
+        """
+        for config_class in type(resource_config).__mro__:
+            for name, attribute in vars(config_class).items():
+                if isinstance(attribute, PasswordAttrRO):
+                    # instance value overrides the attribute descriptor
+                    setattr(resource_config, name, getattr(resource_config, name))
+
+        resource_config.api = None
+
+    def get_config(self, shell_name, context, api):
+        """Get cached resource config or create a new one.
+
+        :param str shell_name:
+        :param context: command context with the cloud provider resource
+        :param cloudshell.api.cloudshell_api.CloudShellAPISession api:
+        :rtype: AzureResourceConfig
+        """
+        key = self._get_key(context)
+        resource_config = self._configs.get(key)
+
+        if resource_config is None:
+            resource_config = AzureResourceConfig.from_context(
+                shell_name=shell_name, context=context, api=api
+            )
+            self._detach_api(resource_config)
+            # keep only the latest attributes revision of the resource
+            self.invalidate(resource_name=context.resource.name)
+            self._configs.set(key, resource_config)
+
+        return resource_config
+
+    def invalidate(self, resource_name):
+        """Evict all configs of the given resource.
+
+        :param str resource_name:
+        :return:
+        """
+        self._configs.pop_if(lambda key: key[0] == resource_name)
+
+    def clear(self):
+        self._configs.clear()
@@ -0,0 +1,118 @@
+import threading
+
+from client_proxy import AzureClientProxy, get_resource_name_and_group
+
+
+class ResourceGroupSnapshot:
+    """In-memory index of the VMs, NICs and public IPs of the resource group.
+
+    The whole resource group is read with a few paged list calls on the first
+    access instead of reading every resource separately. The lists are
+    SdkAzureClient operations, so they are sent via the ARM request scheduler
+    like the other calls of the command.
+    """
+
+    def __init__(self, azure_client, resource_group_name, logger):
+        """Init command.
+
+        :param cloudshell.cp.azure.azure_client.AzureAPIClient azure_client: client
+            with the SdkAzureClient operations
+        :param str resource_group_name:
+        :param logging.Logger logger:
+        """
+        self._azure_client = azure_client
+        self.resource_group_name = resource_group_name
+        self._logger = logger
+        self._indexes = None
+        self._lock = threading.Lock()
+
+    def _load(self):
+        """Read all resources of the resource group.
+
+        :rtype: dict[str, dict]
+        """
+        self._logger.info(
+            f"Loading snapshot of the resource group '{self.resource_group_name}'"
+        )
+        resources = {
+            "vm": self._azure_client.list_vms(
+                resource_group_name=self.resource_group_name
+            ),
+            "network_interface": self._azure_client.list_network_interfaces(
+                resource_group_name=self.resource_group_name
+            ),
+            "public_ip": self._azure_client.list_public_ips(
+                resource_group_name=self.resource_group_name
+            ),
+        }
+
+        return {
+            resource_type: {resource.name.lower(): resource for resource in items}
+            for resource_type, items in resources.items()
+        }
+
+    def _get_indexes(self):
+        with self._lock:
+            if self._indexes is None:
+                try:
+                    self._indexes = self._load()
+                except Exception:
+                    self._logger.warning(
+                        "Unable to load resource group snapshot, resources will be "
+                        "read one by one",
+                        exc_info=True,
+                    )
+                    self._indexes = {}
+
+        return self._indexes
+
+    def get(self, resource_type, name):
+        """Get resource from the snapshot.
+
+        :param str resource_type: "vm", "network_interface" or "public_ip"
+        :param str name: resource name
+        :return: Azure resource model or None if it's missing in the snapshot
+        """
+        return self._get_indexes().get(resource_type, {}).get(name.lower())
+
+
+class SnapshotAzureClient(AzureClientProxy):
+    """Azure API client that reads VMs, NICs and public IPs from the snapshot.
+
+    Resources from other resource groups or missing in the snapshot are read
+    by the wrapped client.
+    """
+
+    def __init__(self, azure_client, snapshot):
+        """Init command.
+
+        :param cloudshell.cp.azure.azure_client.AzureAPIClient azure_client:
+        :param ResourceGroupSnapshot snapshot:
+        """
+        super().__init__(azure_client)
+        self._snapshot = snapshot
+
+    def _get(self, resource_type, getter, args, kwargs):
+        name_and_group = get_resource_name_and_group(args, kwargs)
+        if name_and_group is not None:
+            name, resource_group_name = name_and_group
+            if (
+                resource_group_name.lower()
+                == self._snapshot.resource_group_name.lower()
+            ):
+                resource = self._snapshot.get(resource_type, name)
+                if resource is not None:
+                    return resource
+
+        return getter(*args, **kwargs)
+
+    def get_vm(self, *args, **kwargs):
+        return self._get("vm", self._azure_client.get_vm, args, kwargs)
+
+    def get_network_interface(self, *args, **kwargs):
+        return self._get(
+            "network_interface", self._azure_client.get_network_interface, args, kwargs
+        )
+
+    def get_public_ip(self, *args, **kwargs):
+        return self._get("public_ip", self._azure_client.get_public_ip, args, kwargs)
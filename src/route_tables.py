@@ -0,0 +1,144 @@
+import json
+
+from concurrency import run_concurrently
+
+from cloudshell.cp.azure.actions.network import NetworkActions
+from cloudshell.cp.azure.actions.route_tables import RouteTablesActions
+from cloudshell.cp.azure.flows.create_route_tables import CreateRouteTablesFlow
+
+
+class ParallelCreateRouteTablesFlow(CreateRouteTablesFlow):
+    """Create Route Tables concurrently and associate them with the subnets.
+
+    Every Route Table is created together with its routes by one request.
+    Subnets of the request are validated before creating anything, then each
+    subnet is updated once and only when it isn't associated with the Route
+    Table yet. Subnets are updated one by one because the sandbox vNet is
+    shared between the reservations, so it can't be replaced as a whole, and
+    Azure doesn't allow concurrent operations on one vNet.
+    """
+
+    def __init__(self, *args, max_workers, **kwargs):
+        """Init command.
+
+        :param int max_workers: max number of the concurrently created tables
+        """
+        super().__init__(*args, **kwargs)
+        self._max_workers = max_workers
+
+    def _get_subnet_route_tables(self, request_actions, sandbox_vnet):
+        """Map every requested subnet to the name of its Route Table.
+
+        :param request_actions:
+        :param sandbox_vnet:
+        :return: dict with the subnet name as a key and a tuple of the subnet
+            and the Route Table name as a value
+        :rtype: dict[str, tuple]
+        """
+        subnet_route_tables = {}
+        for route_table_request in request_actions.route_tables:
+            for subnet_name in route_table_request.subnets:
+                subnet = self._find_sandbox_subnet(
+                    sandbox_vnet=sandbox_vnet, subnet_name=subnet_name
+                )
+                subnet_route_tables[subnet_name] = (subnet, route_table_request.name)
+
+        return subnet_route_tables
+
+    @staticmethod
+    def get_plan(request_actions):
+        """Get Route Tables, routes and subnet associations that will be created.
+
+        :param request_actions:
+        :rtype: list[dict]
+        """
+        return [
+            {
+                "route_table": route_table_request.name,
+                "routes": [
+                    {
+                        "name": route.name,
+                        "address_prefix": route.address_prefix,
+                        "next_hop_type": route.next_hop_type,
+                        "next_hop_address": route.next_hop_address,
+                    }
+                    for route in route_table_request.routes
+                ],
+                "subnets": list(route_table_request.subnets),
+            }
+            for route_table_request in request_actions.route_tables
+        ]
+
+    def create_route_tables(self, request_actions, dry_run=False):
+        """Create Route Tables on the Azure.
+
+        :param request_actions:
+        :param bool dry_run: only validate the request and return the plan
+        :return: JSON plan in the dry run mode
+        """
+        resource_group_name = self._reservation_info.get_resource_group_name()
+        mgmt_resource_group_name = self._resource_config.management_group_name
+
+        network_actions = NetworkActions(
+            azure_client=self._azure_client, logger=self._logger
+        )
+        route_tables_actions = RouteTablesActions(
+            azure_client=self._azure_client, logger=self._logger
+        )
+
+        sandbox_vnet = network_actions.get_sandbox_virtual_network(
+            resource_group_name=mgmt_resource_group_name,
+            sandbox_vnet_name=self._resource_config.sandbox_vnet_name,
+        )
+        subnet_route_tables = self._get_subnet_route_tables(
+            request_actions=request_actions, sandbox_vnet=sandbox_vnet
+        )
+
+        if dry_run:
+            plan = json.dumps(self.get_plan(request_actions))
+            self._logger.info(f"Route Tables plan: {plan}")
+            return plan
+
+        def create_route_table(route_table_request):
+            self._logger.info(f"Processing Route Table {route_table_request}")
+            self._cs_reservation_output.write_message(
+                f"Processing Route Table {route_table_request.name}"
+            )
+            return route_tables_actions.create_route_table(
+                resource_group_name=resource_group_name,
+                route_table_name=route_table_request.name,
+                region=self._resource_config.region,
+                route_table=route_table_request,
+            )
+
+        task_results = run_concurrently(
+            func=create_route_table,
+            items=request_actions.route_tables,
+            max_workers=self._max_workers,
+        )
+        for task_result in task_results:
+            if not task_result.success:
+                raise task_result.error
+
+        azure_route_tables = {
+            task_result.item.name: task_result.result for task_result in task_results
+        }
+
+        for subnet_name, (subnet, route_table_name) in subnet_route_tables.items():
+            azure_route_table = azure_route_tables[route_table_name]
+            if subnet.route_table is not None and (
+                subnet.route_table.id.lower() == azure_route_table.id.lower()
+            ):
+                self._logger.info(
+                    f"Subnet {subnet_name} is already associated with "
+                    f"Route Table {route_table_name}"
+                )
+                continue
+
+            subnet.route_table = azure_route_table
+            network_actions.update_subnet(
+                subnet_name=subnet_name,
+                vnet_name=sandbox_vnet.name,
+                resource_group_name=mgmt_resource_group_name,
+                subnet=subnet,
+            )
@@ -0,0 +1,171 @@
+from functools import partial
+from http import HTTPStatus
+
+from msrestazure.azure_exceptions import CloudError
+
+from task_graph import DependencyFailedError, TaskGraph
+
+from cloudshell.cp.azure.actions.network import NetworkActions
+from cloudshell.cp.azure.actions.network_security_group import (
+    NetworkSecurityGroupActions,
+)
+from cloudshell.cp.azure.actions.resource_group import ResourceGroupActions
+from cloudshell.cp.azure.actions.ssh_key_pair import SSHKeyPairActions
+from cloudshell.cp.azure.actions.storage_account import StorageAccountActions
+from cloudshell.cp.azure.flows.cleanup import AzureCleanupSandboxInfraFlow
+
+
+class ParallelCleanupSandboxInfraFlow(AzureCleanupSandboxInfraFlow):
+    """Sandbox infrastructure teardown as a graph of the dependent deletions.
+
+    Sandbox subnets are deleted one by one because Azure doesn't allow
+    concurrent operations on one vNet. Deletion of the SSH keys and the storage
+    account runs concurrently with them. The NSG used by the subnets and then
+    the resource group are deleted as soon as the subnets are released, without
+    waiting for the private key purge in the Key Vault.
+    """
+
+    def __init__(self, *args, max_workers, **kwargs):
+        """Init command.
+
+        :param int max_workers: max number of the concurrent deletions
+        """
+        super().__init__(*args, **kwargs)
+        self._max_workers = max_workers
+
+    def _skip_not_found(self, cleanup_command):
+        try:
+            cleanup_command()
+        except CloudError as e:
+            if e.status_code != HTTPStatus.NOT_FOUND:
+                raise
+            self._logger.warning(
+                "Unable to find resource on Azure for deleting:", exc_info=True
+            )
+
+    def cleanup_sandbox_infra(self, request_actions):
+        """Cleanup Sandbox Infra.
+
+        :param request_actions:
+        :return:
+        """
+        resource_group_name = self._reservation_info.get_resource_group_name()
+        nsg_name = self._reservation_info.get_network_security_group_name()
+        storage_account_name = self._reservation_info.get_storage_account_name()
+        mgmt_resource_group_name = self._resource_config.management_group_name
+
+        network_actions = NetworkActions(
+            azure_client=self._azure_client, logger=self._logger
+        )
+        resource_group_actions = ResourceGroupActions(
+            azure_client=self._azure_client, logger=self._logger
+        )
+        nsg_actions = NetworkSecurityGroupActions(
+            azure_client=self._azure_client, logger=self._logger
+        )
+        storage_actions = StorageAccountActions(
+            azure_client=self._azure_client, logger=self._logger
+        )
+        ssh_key_actions = SSHKeyPairActions(
+            azure_client=self._azure_client, logger=self._logger
+        )
+
+        self._lock_manager.remove_lock(nsg_name)
+
+        sandbox_vnet = network_actions.get_sandbox_virtual_network(
+            resource_group_name=mgmt_resource_group_name,
+            sandbox_vnet_name=self._resource_config.sandbox_vnet_name,
+        )
+        graph = TaskGraph(max_workers=self._max_workers, logger=self._logger)
+
+        subnet_tasks = []
+        for subnet in network_actions.get_sandbox_subnets(
+            resource_group_name=resource_group_name,
+            mgmt_resource_group_name=mgmt_resource_group_name,
+            sandbox_vnet_name=self._resource_config.sandbox_vnet_name,
+        ):
+            task_name = f"subnet {subnet.name}"
+            graph.add(
+                name=task_name,
+                func=partial(
+                    self._skip_not_found,
+                    partial(
+                        network_actions.delete_subnet,
+                        subnet_name=subnet.name,
+                        vnet_name=sandbox_vnet.name,
+                        resource_group_name=mgmt_resource_group_name,
+                    ),
+                ),
+                depends_on=subnet_tasks[-1:],
+            )
+            subnet_tasks.append(task_name)
+
+        resource_group_dependencies = list(subnet_tasks)
+        if nsg_actions.network_security_group_exists(
+            nsg_name=nsg_name, resource_group_name=resource_group_name
+        ):
+            graph.add(
+                name="network security group",
+                func=partial(
+                    self._skip_not_found,
+                    partial(
+                        nsg_actions.delete_network_security_group,
+                        nsg_name=nsg_name,
+                        resource_group_name=resource_group_name,
+                    ),
+                ),
+                depends_on=subnet_tasks,
+            )
+            resource_group_dependencies.append("network security group")
+
+        graph.add(
+            name="ssh public key",
+            func=partial(
+                self._skip_not_found,
+                partial(
+                    ssh_key_actions.delete_ssh_public_key,
+                    public_key_name=self._reservation_info.reservation_id,
+                    resource_group_name=resource_group_name,
+                ),
+            ),
+        )
+        graph.add(
+            name="ssh private key",
+            func=partial(
+                self._skip_not_found,
+                partial(
+                    ssh_key_actions.delete_ssh_private_key,
+                    key_vault_name=self._resource_config.key_vault,
+                    private_key_name=self._reservation_info.reservation_id,
+                ),
+            ),
+        )
+        graph.add(
+            name="storage account",
+            func=partial(
+                self._skip_not_found,
+                partial(
+                    storage_actions.delete_storage_account,
+                    storage_account_name=storage_account_name,
+                    resource_group_name=resource_group_name,
+                ),
+            ),
+        )
+        resource_group_dependencies.extend(["ssh public key", "storage account"])
+
+        graph.add(
+            name="resource group",
+            func=partial(
+                self._skip_not_found,
+                partial(
+                    resource_group_actions.delete_resource_group,
+                    resource_group_name=resource_group_name,
+                ),
+            ),
+            depends_on=resource_group_dependencies,
+        )
+
+        errors = [result.error for result in graph.run().values() if not result.success]
+        errors.sort(key=lambda error: isinstance(error, DependencyFailedError))
+        if errors:
+            raise errors[0]
@@ -0,0 +1,248 @@
+import hashlib
+import json
+from dataclasses import dataclass
+
+from cache import TTLCache
+from client_proxy import get_sdk_client
+
+
+def get_action_key(action):
+    """Get key of the request action that doesn't depend on its id.
+
+    Setup sends new action ids every time it runs, actions with the same
+    type and params describe the same sandbox infrastructure.
+    :param dict action: request action
+    :rtype: str
+    """
+    action = {key: value for key, value in action.items() if key != "actionId"}
+    return json.dumps(action, sort_keys=True, default=str)
+
+
+def get_actions_digest(actions):
+    """Get digest of the request actions that doesn't depend on their ids.
+
+    :param list[dict] actions: request actions
+    :rtype: str
+    """
+    action_keys = sorted(get_action_key(action) for action in actions)
+    return hashlib.sha256(json.dumps(action_keys).encode()).hexdigest()
+
+
+@dataclass
+class PreparedSandbox:
+    # action results of the prepare response by the action keys,
+    # results of the keys action are kept without the access key
+    action_results: dict
+    # ids of the resources created in the sandbox resource group
+    resource_ids: frozenset
+    # names of the subnets created for the sandbox in the sandbox vNet
+    subnet_names: frozenset
+
+
+class PreparedSandboxCache:
+    """Desired state of the prepared sandboxes.
+
+    Result of every successful PrepareSandboxInfra is saved with the resources
+    that exist after it. Repeated setup with the same actions is answered with
+    the saved action results if all saved resources still exist, this is checked
+    with one list call of the sandbox resource group and one read of the sandbox
+    vNet instead of the get-or-create of the NSG, its rules, subnets and keys.
+
+    Sandboxes are kept by the reservation id and the digest of the request
+    actions. SSH private key of the sandbox isn't kept in memory, it is read
+    from the Key Vault for the repeated setup, sandboxes of the resources
+    without Key Vault are prepared again.
+    """
+
+    # action type is case insensitive, i.e. "createKeys" or "CreateKeys"
+    CREATE_KEYS_ACTION_TYPE = "createkeys"
+
+    # prepared sandbox lives until the reservation cleanup
+    PREPARED_TTL = 24 * 60 * 60
+    MAX_SANDBOXES = 256
+
+    def __init__(self, ttl=PREPARED_TTL, max_size=MAX_SANDBOXES):
+        """Init command.
+
+        :param float ttl:
+        :param int max_size:
+        """
+        self._sandboxes = TTLCache(max_size=max_size, ttl=ttl)
+
+    @staticmethod
+    def _read_resource_ids(azure_client, resource_group_name):
+        """Read ids of all resources in the resource group with one list call.
+
+        :param cloudshell.cp.azure.azure_client.AzureAPIClient azure_client:
+        :param str resource_group_name:
+        :rtype: frozenset[str]
+        """
+        resource_client = get_sdk_client(azure_client, "resource")
+        return frozenset(
+            resource.id.lower()
+            for resource in resource_client.resources.list_by_resource_group(
+                resource_group_name
+            )
+        )
+
+    @staticmethod
+    def _read_subnet_names(azure_client, resource_config, reservation_id, logger):
+        """Read names of the sandbox subnets with one read of the sandbox vNet.
+
+        :param cloudshell.cp.azure.azure_client.AzureAPIClient azure_client:
+        :param cloudshell.cp.azure.resource_config.AzureResourceConfig resource_config:
+        :param str reservation_id:
+        :param logging.Logger logger:
+        :rtype: frozenset[str]
+        """
+        from cloudshell.cp.azure.actions.network import NetworkActions
+
+        network_actions = NetworkActions(azure_client=azure_client, logger=logger)
+        sandbox_vnet = network_actions.get_sandbox_virtual_network(
+            resource_group_name=resource_config.management_group_name,
+            sandbox_vnet_name=resource_config.sandbox_vnet_name,
+        )
+        return frozenset(
+            subnet.name
+            for subnet in sandbox_vnet.subnets or []
+            if subnet.name.startswith(reservation_id)
+        )
+
+    @classmethod
+    def _is_create_keys(cls, action):
+        return str(action.get("type", "")).lower() == cls.CREATE_KEYS_ACTION_TYPE
+
+    @staticmethod
+    def _read_access_key(azure_client, resource_config, reservation_id):
+        """Read SSH private key of the sandbox from the Key Vault.
+
+        :param cloudshell.cp.azure.azure_client.AzureAPIClient azure_client:
+        :param cloudshell.cp.azure.resource_config.AzureResourceConfig resource_config:
+        :param str reservation_id:
+        :rtype: str
+        """
+        return azure_client.get_key_vault_secret(
+            key_vault_name=resource_config.key_vault, secret_name=reservation_id
+        )
+
+    def get_response(
+        self, reservation_id, request, azure_client, resource_config, logger
+    ):
+        """Get response of the already prepared sandbox.
+
+        :param str reservation_id:
+        :param str request: PrepareSandboxInfra request
+        :param cloudshell.cp.azure.azure_client.AzureAPIClient azure_client:
+        :param cloudshell.cp.azure.resource_config.AzureResourceConfig resource_config:
+        :param logging.Logger logger:
+        :return: driver response or None if sandbox must be prepared
+        :rtype: str | None
+        """
+        actions = json.loads(request)["driverRequest"]["actions"]
+        prepared_sandbox = self._sandboxes.get(
+            (reservation_id, get_actions_digest(actions))
+        )
+        if prepared_sandbox is None:
+            return None
+
+        creates_keys = any(self._is_create_keys(action) for action in actions)
+        if creates_keys and not resource_config.key_vault:
+            logger.info("SSH private key of the sandbox isn't saved, preparing it")
+            return None
+
+        action_results = []
+        for action in actions:
+            action_result = prepared_sandbox.action_results.get(get_action_key(action))
+            if action_result is None:
+                logger.info("Sandbox infrastructure was changed, preparing it")
+                return None
+            action_results.append({**action_result, "actionId": action["actionId"]})
+
+        try:
+            resource_ids = self._read_resource_ids(azure_client, reservation_id)
+            subnet_names = self._read_subnet_names(
+                azure_client, resource_config, reservation_id, logger
+            )
+            if creates_keys:
+                access_key = self._read_access_key(
+                    azure_client, resource_config, reservation_id
+                )
+        except Exception:
+            logger.warning("Unable to read sandbox infrastructure", exc_info=True)
+            return None
+
+        if not (
+            prepared_sandbox.resource_ids <= resource_ids
+            and prepared_sandbox.subnet_names <= subnet_names
+        ):
+            logger.info("Sandbox infrastructure resources are missing, preparing it")
+            return None
+
+        if creates_keys:
+            for action, action_result in zip(actions, action_results):
+                if self._is_create_keys(action):
+                    action_result["accessKey"] = access_key
+
+        logger.info("Sandbox infrastructure is already prepared")
+        return json.dumps({"driverResponse": {"actionResults": action_results}})
+
+    def save(
+        self, reservation_id, request, response, azure_client, resource_config, logger
+    ):
+        """Save desired state of the prepared sandbox.
+
+        :param str reservation_id:
+        :param str request: PrepareSandboxInfra request
+        :param str response: PrepareSandboxInfra response
+        :param cloudshell.cp.azure.azure_client.AzureAPIClient azure_client:
+        :param cloudshell.cp.azure.resource_config.AzureResourceConfig resource_config:
+        :param logging.Logger logger:
+        :return:
+        """
+        request_actions = json.loads(request)["driverRequest"]["actions"]
+        key = (reservation_id, get_actions_digest(request_actions))
+        self._sandboxes.pop(key)
+        actions = {action["actionId"]: action for action in request_actions}
+        action_results = json.loads(response)["driverResponse"]["actionResults"]
+        if not all(action_result.get("success") for action_result in action_results):
+            return
+
+        try:
+            resource_ids = self._read_resource_ids(azure_client, reservation_id)
+            subnet_names = self._read_subnet_names(
+                azure_client, resource_config, reservation_id, logger
+            )
+        except Exception:
+            logger.warning("Unable to read sandbox infrastructure", exc_info=True)
+            return
+
+        response_subnet_names = {
+            action_result.get("subnetId") for action_result in action_results
+        }
+        self._sandboxes.set(
+            key,
+            PreparedSandbox(
+                action_results={
+                    get_action_key(actions[action_result["actionId"]]): {
+                        name: value
+                        for name, value in action_result.items()
+                        if name != "accessKey"
+                    }
+                    for action_result in action_results
+                    if action_result.get("actionId") in actions
+                },
+                resource_ids=resource_ids,
+                subnet_names=subnet_names & response_subnet_names,
+            ),
+        )
+
+    def invalidate(self, reservation_id):
+        """Forget the prepared sandbox.
+
+        :param str reservation_id:
+        :return:
+        """
+        self._sandboxes.pop_if(lambda key: key[0] == reservation_id)
+
+    def clear(self):
+        self._sandboxes.clear()
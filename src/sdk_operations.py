@@ -0,0 +1,151 @@
+from client_proxy import AzureClientProxy
+
+
+class SdkAzureClient(AzureClientProxy):
+    """Azure API client with the Azure SDK operations AzureAPIClient doesn't have.
+
+    It wraps the AzureAPIClient directly, so these operations are called through
+    the same wrappers as the AzureAPIClient methods: they are timed, sent via
+    the ARM request scheduler and their writes invalidate the shared reads.
+    Resource names are passed as the "*_name" keyword arguments, so the read
+    caches evict only the reads of the written resources.
+    """
+
+    @staticmethod
+    def _get_response_hook(sdk_client, raw_response_hook):
+        """Get hook of the call that also calls the response hook of the SDK client.
+
+        Hook passed to the call replaces the hook of the SDK client, which reports
+        the remaining ARM requests to the request scheduler.
+        :param sdk_client: Azure SDK management client
+        :param raw_response_hook: function that receives the response
+        :return: raw response hook of the call
+        """
+        custom_hook_policy = getattr(
+            getattr(sdk_client, "_config", None), "custom_hook_policy", None
+        )
+        client_hook = getattr(custom_hook_policy, "_response_callback", None)
+        if raw_response_hook is None or client_hook is None:
+            return raw_response_hook
+
+        def on_response(pipeline_response):
+            client_hook(pipeline_response)
+            raw_response_hook(pipeline_response)
+
+        return on_response
+
+    def update_network_security_group(
+        self, network_security_group_name, resource_group_name, nsg, etag=None
+    ):
+        """Update Network Security Group if it wasn't changed after it was read.
+
+        :param str network_security_group_name:
+        :param str resource_group_name:
+        :param azure.mgmt.network.models.NetworkSecurityGroup nsg:
+        :param str etag: etag of the read NSG, None - overwrite the NSG
+        :return:
+        """
+        headers = {"If-Match": etag} if etag else {}
+        return self._network_client.network_security_groups.begin_create_or_update(
+            resource_group_name=resource_group_name,
+            network_security_group_name=network_security_group_name,
+            parameters=nsg,
+            headers=headers,
+        ).result()
+
+    def begin_start_vm(self, vm_name, resource_group_name, raw_response_hook=None):
+        """Submit start of the Virtual Machine without waiting for it.
+
+        :param str vm_name:
+        :param str resource_group_name:
+        :param raw_response_hook: function that receives the response
+        :return:
+        """
+        self._compute_client.virtual_machines.begin_start(
+            resource_group_name=resource_group_name,
+            vm_name=vm_name,
+            polling=False,
+            raw_response_hook=self._get_response_hook(
+                self._compute_client, raw_response_hook
+            ),
+        )
+
+    def begin_deallocate_vm(self, vm_name, resource_group_name, raw_response_hook=None):
+        """Submit deallocation of the Virtual Machine without waiting for it.
+
+        :param str vm_name:
+        :param str resource_group_name:
+        :param raw_response_hook: function that receives the response
+        :return:
+        """
+        self._compute_client.virtual_machines.begin_deallocate(
+            resource_group_name=resource_group_name,
+            vm_name=vm_name,
+            polling=False,
+            raw_response_hook=self._get_response_hook(
+                self._compute_client, raw_response_hook
+            ),
+        )
+
+    def begin_update_vm(
+        self, vm_name, resource_group_name, virtual_machine, raw_response_hook=None
+    ):
+        """Submit update of the Virtual Machine without waiting for it.
+
+        :param str vm_name:
+        :param str resource_group_name:
+        :param azure.mgmt.compute.models.VirtualMachine virtual_machine:
+        :param raw_response_hook: function that receives the response
+        :return:
+        """
+        self._compute_client.virtual_machines.begin_create_or_update(
+            resource_group_name=resource_group_name,
+            vm_name=vm_name,
+            parameters=virtual_machine,
+            polling=False,
+            raw_response_hook=self._get_response_hook(
+                self._compute_client, raw_response_hook
+            ),
+        )
+
+    def get_vm_instance_view(
+        self, vm_name, resource_group_name, raw_response_hook=None
+    ):
+        """Get instance view of the Virtual Machine with its statuses.
+
+        :param str vm_name:
+        :param str resource_group_name:
+        :param raw_response_hook: function that receives the response
+        :rtype: azure.mgmt.compute.models.VirtualMachineInstanceView
+        """
+        return self._compute_client.virtual_machines.instance_view(
+            resource_group_name=resource_group_name,
+            vm_name=vm_name,
+            raw_response_hook=self._get_response_hook(
+                self._compute_client, raw_response_hook
+            ),
+        )
+
+    def list_vms(self, resource_group_name):
+        """List Virtual Machines of the resource group.
+
+        :param str resource_group_name:
+        :rtype: list[azure.mgmt.compute.models.VirtualMachine]
+        """
+        return list(self._compute_client.virtual_machines.list(resource_group_name))
+
+    def list_network_interfaces(self, resource_group_name):
+        """List Network Interfaces of the resource group.
+
+        :param str resource_group_name:
+        :rtype: list[azure.mgmt.network.models.NetworkInterface]
+        """
+        return list(self._network_client.network_interfaces.list(resource_group_name))
+
+    def list_public_ips(self, resource_group_name):
+        """List Public IP addresses of the resource group.
+
+        :param str resource_group_name:
+        :rtype: list[azure.mgmt.network.models.PublicIPAddress]
+        """
+        return list(self._network_client.public_ip_addresses.list(resource_group_name))
@@ -0,0 +1,139 @@
+import functools
+import threading
+from collections.abc import Iterator
+
+from client_proxy import AzureClientProxy
+from read_cache import copy_read_result, has_callbacks, is_read_method
+
+
+class _Call:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class SingleFlight:
+    """Coalesces concurrent calls with the same key into one call.
+
+    The first caller runs the function, callers that come while it is in flight
+    wait for it and get the same result or exception.
+    """
+
+    def __init__(self):
+        self._calls = {}
+        self._lock = threading.Lock()
+
+    def do(self, key, func, copy_result=None):
+        """Run the function or wait for the in-flight call with the same key.
+
+        :param key: hashable call key
+        :param func: function without arguments
+        :param copy_result: function that copies the result for the waiting
+            callers, None - share the result
+        :return: function result
+        """
+        with self._lock:
+            call = self._calls.get(key)
+            is_leader = call is None
+            if is_leader:
+                call = self._calls[key] = _Call()
+
+        if not is_leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return copy_result(call.result) if copy_result else call.result
+
+        try:
+            call.result = func()
+            return call.result
+        except Exception as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                if self._calls.get(key) is call:
+                    del self._calls[key]
+            call.done.set()
+
+    def forget(self, predicate):
+        """Don't join the in-flight calls which keys match the predicate.
+
+        Callers that already wait for these calls still get their results, new
+        callers start new calls.
+        :param predicate: function that receives the call key
+        :return:
+        """
+        with self._lock:
+            for key in [key for key in self._calls if predicate(key)]:
+                del self._calls[key]
+
+    def __len__(self):
+        with self._lock:
+            return len(self._calls)
+
+
+class SingleFlightAzureClient(AzureClientProxy):
+    """Azure API client that shares concurrent identical reads between commands.
+
+    Reads of the same resource that are in flight in any command are made once,
+    the waiting commands get copies of the result. Paged list results are read
+    into the list, so they can be shared. Every call that is not a read can
+    change Azure resources, so reads started before it are not joined by
+    the later calls of the subscription.
+    """
+
+    def __init__(self, azure_client, single_flight, subscription_id):
+        """Init command.
+
+        :param cloudshell.cp.azure.azure_client.AzureAPIClient azure_client:
+        :param SingleFlight single_flight: process-wide in-flight reads
+        :param str subscription_id: subscription of the Azure API client
+        """
+        super().__init__(azure_client)
+        self._single_flight = single_flight
+        self._subscription_id = subscription_id
+
+    def _forget_reads(self):
+        self._single_flight.forget(lambda key: key[0] == self._subscription_id)
+
+    def __getattr__(self, name):
+        attr = super().__getattr__(name)
+        if name.startswith("_") or not callable(attr):
+            return attr
+
+        if is_read_method(name):
+
+            @functools.wraps(attr)
+            def read(*args, **kwargs):
+                if has_callbacks(kwargs):
+                    return attr(*args, **kwargs)
+
+                key = (self._subscription_id, name, args, tuple(sorted(kwargs.items())))
+                try:
+                    hash(key)
+                except TypeError:
+                    return attr(*args, **kwargs)
+
+                def read_once():
+                    result = attr(*args, **kwargs)
+                    if isinstance(result, Iterator):
+                        result = list(result)
+                    return result
+
+                return self._single_flight.do(
+                    key, read_once, copy_result=copy_read_result
+                )
+
+            return read
+
+        @functools.wraps(attr)
+        def write(*args, **kwargs):
+            self._forget_reads()
+            try:
+                return attr(*args, **kwargs)
+            finally:
+                self._forget_reads()
+
+        return write
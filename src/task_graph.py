@@ -0,0 +1,106 @@
+import contextvars
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from dataclasses import dataclass, field
+from typing import Callable
+
+from concurrency import TaskResult
+
+
+class DependencyFailedError(Exception):
+    """Task was not started because its dependency failed."""
+
+
+@dataclass
+class _Task:
+    name: str
+    func: Callable
+    depends_on: tuple = field(default_factory=tuple)
+
+
+class TaskGraph:
+    """Run tasks concurrently as soon as all their dependencies succeed."""
+
+    def __init__(self, max_workers, logger):
+        """Init command.
+
+        :param int max_workers:
+        :param logging.Logger logger:
+        """
+        self._max_workers = max_workers
+        self._logger = logger
+        self._tasks = {}
+
+    def add(self, name, func, depends_on=()):
+        """Add task to the graph.
+
+        :param str name: unique task name
+        :param func: function without arguments
+        :param depends_on: names of the tasks that must succeed before this one
+        :return:
+        """
+        if name in self._tasks:
+            raise ValueError(f"Task '{name}' is already added")
+
+        self._tasks[name] = _Task(name=name, func=func, depends_on=tuple(depends_on))
+
+    def _validate(self):
+        for task in self._tasks.values():
+            for dependency in task.depends_on:
+                if dependency not in self._tasks:
+                    raise ValueError(
+                        f"Task '{task.name}' depends on unknown task '{dependency}'"
+                    )
+
+    def run(self):
+        """Run all tasks.
+
+        :return: task results by the task names
+        :rtype: dict[str, TaskResult]
+        """
+        self._validate()
+        results = {}
+        not_started = dict(self._tasks)
+        running = {}
+
+        with ThreadPoolExecutor(max_workers=self._max_workers) as executor:
+            while not_started or running:
+                for task in list(not_started.values()):
+                    dependency_results = [results.get(dep) for dep in task.depends_on]
+                    if None in dependency_results:
+                        continue
+
+                    del not_started[task.name]
+                    failed = [r.item for r in dependency_results if not r.success]
+                    if failed:
+                        error = DependencyFailedError(
+                            f"Task '{task.name}' skipped, dependencies failed: "
+                            f"{', '.join(failed)}"
+                        )
+                        results[task.name] = TaskResult(item=task.name, error=error)
+                    else:
+                        self._logger.debug(f"Starting task '{task.name}'")
+                        context = contextvars.copy_context()
+                        running[executor.submit(context.run, task.func)] = task
+
+                if not running:
+                    if not_started:
+                        raise ValueError(
+                            "Tasks have cyclic dependencies: "
+                            f"{', '.join(not_started)}"
+                        )
+                    break
+
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    task = running.pop(future)
+                    try:
+                        results[task.name] = TaskResult(
+                            item=task.name, result=future.result()
+                        )
+                    except Exception as e:
+                        self._logger.warning(
+                            f"Task '{task.name}' failed", exc_info=True
+                        )
+                        results[task.name] = TaskResult(item=task.name, error=e)
+
+        return results
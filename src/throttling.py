@@ -0,0 +1,384 @@
+import functools
+import heapq
+import itertools
+import random
+import threading
+import time
+from collections import defaultdict
+
+from client_proxy import AzureClientProxy, get_sdk_client
+from read_cache import is_read_method
+
+RATELIMIT_HEADERS = {
+    "reads": "x-ms-ratelimit-remaining-subscription-reads",
+    "writes": "x-ms-ratelimit-remaining-subscription-writes",
+    "deletes": "x-ms-ratelimit-remaining-subscription-deletes",
+}
+# Azure SDK management clients of the AzureAPIClient
+SDK_CLIENT_NAMES = ("subscription", "resource", "compute", "storage", "network")
+
+
+def get_throttling_headers(error):
+    """Get response headers if the error is ARM throttling (HTTP 429) error.
+
+    :param Exception error:
+    :return: response headers or None if it's not a throttling error
+    :rtype: dict | None
+    """
+    response = getattr(error, "response", None)
+    status_code = getattr(error, "status_code", None) or getattr(
+        response, "status_code", None
+    )
+    if status_code != 429:
+        return None
+
+    return dict(getattr(response, "headers", None) or {})
+
+
+def get_request_kind(method_name):
+    """Get ARM request kind for the Azure API client method.
+
+    :param str method_name:
+    :return: "reads", "writes" or "deletes"
+    :rtype: str
+    """
+    if is_read_method(method_name):
+        return "reads"
+    if "delete" in method_name:
+        return "deletes"
+    return "writes"
+
+
+class TokenBucket:
+    """Token bucket that refills with the constant rate."""
+
+    def __init__(self, capacity, refill_rate, timer=time.monotonic):
+        """Init command.
+
+        :param float capacity: max number of tokens
+        :param float refill_rate: tokens per second
+        :param timer: monotonic clock function
+        """
+        self._capacity = capacity
+        self._refill_rate = refill_rate
+        self._timer = timer
+        self._tokens = capacity
+        self._updated_at = timer()
+        self._paused_until = 0
+
+    def _refill(self):
+        now = self._timer()
+        start = max(self._updated_at, self._paused_until)
+        if now > start:
+            self._tokens = min(
+                self._capacity, self._tokens + (now - start) * self._refill_rate
+            )
+        self._updated_at = max(now, self._updated_at)
+
+    def try_acquire(self):
+        """Take one token.
+
+        :return: 0 if the token was taken, otherwise seconds to wait for the token
+        :rtype: float
+        """
+        self._refill()
+        now = self._timer()
+        if now < self._paused_until:
+            return self._paused_until - now
+
+        if self._tokens >= 1:
+            self._tokens -= 1
+            return 0
+
+        return (1 - self._tokens) / self._refill_rate
+
+    def limit(self, remaining):
+        """Don't give out more tokens than requests remaining in ARM.
+
+        :param int remaining: remaining requests reported by ARM
+        :return:
+        """
+        self._refill()
+        self._tokens = min(self._tokens, remaining)
+
+    def pause(self, seconds, remaining=None):
+        """Stop giving out tokens after the throttling response.
+
+        :param float seconds:
+        :param int remaining: remaining requests reported by ARM
+        :return:
+        """
+        self._refill()
+        self._tokens = 0 if remaining is None else min(self._tokens, remaining)
+        self._paused_until = max(self._paused_until, self._timer() + seconds)
+
+
+class ArmRequestScheduler:
+    """Process-wide scheduler of the ARM requests.
+
+    Requests wait for a token from the bucket of the subscription and request
+    kind, waiting requests are served by their priority. Throttled (HTTP 429)
+    requests pause the bucket for the Retry-After time and are retried with
+    the jittered exponential backoff.
+    """
+
+    PRIORITY_HIGH = 0
+    PRIORITY_NORMAL = 1
+    PRIORITY_LOW = 2
+
+    # ARM token bucket limits per subscription and region: (capacity, refill/sec)
+    BUCKET_LIMITS = {
+        "reads": (250, 25),
+        "writes": (200, 10),
+        "deletes": (200, 10),
+    }
+    MAX_RETRIES = 5
+    BACKOFF_BASE = 1
+    BACKOFF_MAX = 60
+
+    def __init__(
+        self,
+        bucket_limits=None,
+        instrumentation=None,
+        timer=time.monotonic,
+        sleep=time.sleep,
+    ):
+        """Init command.
+
+        :param dict bucket_limits: overrides BUCKET_LIMITS
+        :param instrumentation.Instrumentation instrumentation:
+        :param timer: monotonic clock function
+        :param sleep: sleep function
+        """
+        self._bucket_limits = {**self.BUCKET_LIMITS, **(bucket_limits or {})}
+        self._instrumentation = instrumentation
+        self._timer = timer
+        self._sleep = sleep
+        self._condition = threading.Condition()
+        self._buckets = {}
+        self._queues = defaultdict(list)
+        self._counter = itertools.count()
+        self._requests = 0
+        self._throttled = 0
+        self._wait_time_total = 0.0
+        self._wait_time_max = 0.0
+
+    def _get_bucket(self, key):
+        if key not in self._buckets:
+            capacity, refill_rate = self._bucket_limits[key[1]]
+            self._buckets[key] = TokenBucket(
+                capacity=capacity, refill_rate=refill_rate, timer=self._timer
+            )
+        return self._buckets[key]
+
+    def acquire(self, subscription_id, kind, priority=PRIORITY_NORMAL):
+        """Wait until the request is allowed to be sent.
+
+        :param str subscription_id:
+        :param str kind: "reads", "writes" or "deletes"
+        :param int priority: lower value is served first
+        :return:
+        """
+        key = (subscription_id, kind)
+        started_at = self._timer()
+
+        with self._condition:
+            queue = self._queues[key]
+            entry = (priority, next(self._counter))
+            heapq.heappush(queue, entry)
+            try:
+                while True:
+                    wait_time = None
+                    if queue[0] == entry:
+                        wait_time = self._get_bucket(key).try_acquire()
+                        if not wait_time:
+                            break
+                    self._condition.wait(wait_time)
+            finally:
+                queue.remove(entry)
+                heapq.heapify(queue)
+                self._condition.notify_all()
+
+            wait_time = self._timer() - started_at
+            self._requests += 1
+            self._wait_time_total += wait_time
+            self._wait_time_max = max(self._wait_time_max, wait_time)
+
+        if self._instrumentation is not None:
+            self._instrumentation.observe_arm_wait(kind=kind, duration=wait_time)
+
+    def observe_remaining(self, subscription_id, kind, remaining):
+        """Limit the bucket by the remaining requests reported by ARM.
+
+        :param str subscription_id:
+        :param str kind: "reads", "writes" or "deletes"
+        :param int remaining:
+        :return:
+        """
+        with self._condition:
+            self._get_bucket((subscription_id, kind)).limit(remaining)
+
+    def get_response_hook(self, subscription_id):
+        """Get raw response hook that limits the buckets of the subscription.
+
+        ARM reports the remaining requests of the subscription in every response,
+        so the buckets slow down before the requests are throttled.
+        :param str subscription_id:
+        :return: raw response hook of the Azure SDK client
+        """
+
+        def on_response(pipeline_response):
+            headers = pipeline_response.http_response.headers
+            for kind, header in RATELIMIT_HEADERS.items():
+                try:
+                    remaining = int(headers[header])
+                except (KeyError, TypeError, ValueError):
+                    continue
+                self.observe_remaining(
+                    subscription_id=subscription_id, kind=kind, remaining=remaining
+                )
+
+        return on_response
+
+    def _on_throttled(self, subscription_id, kind, headers, attempt):
+        """Pause the bucket and get time to wait before the retry.
+
+        :param str subscription_id:
+        :param str kind:
+        :param dict headers: response headers
+        :param int attempt:
+        :rtype: float
+        """
+        headers = {name.lower(): value for name, value in headers.items()}
+        backoff = min(self.BACKOFF_MAX, self.BACKOFF_BASE * 2**attempt)
+        try:
+            retry_after = float(headers["retry-after"])
+        except (KeyError, ValueError):
+            retry_after = backoff
+        try:
+            remaining = int(headers[RATELIMIT_HEADERS[kind]])
+        except (KeyError, ValueError):
+            remaining = None
+
+        with self._condition:
+            self._throttled += 1
+            self._get_bucket((subscription_id, kind)).pause(
+                seconds=retry_after, remaining=remaining
+            )
+            self._condition.notify_all()
+
+        # spread retries of the throttled requests
+        return retry_after + random.uniform(0, backoff)
+
+    def execute(self, func, subscription_id, kind, priority=PRIORITY_NORMAL):
+        """Send the request when it is allowed and retry it on throttling.
+
+        :param func: function that sends the request
+        :param str subscription_id:
+        :param str kind: "reads", "writes" or "deletes"
+        :param int priority: lower value is served first
+        :return: function result
+        """
+        for attempt in itertools.count():
+            self.acquire(subscription_id=subscription_id, kind=kind, priority=priority)
+            try:
+                return func()
+            except Exception as e:
+                headers = get_throttling_headers(e)
+                if headers is None or attempt >= self.MAX_RETRIES:
+                    raise
+
+                if self._instrumentation is not None:
+                    self._instrumentation.increment_throttling_retries(kind=kind)
+                self._sleep(
+                    self._on_throttled(
+                        subscription_id=subscription_id,
+                        kind=kind,
+                        headers=headers,
+                        attempt=attempt,
+                    )
+                )
+
+    def get_metrics(self):
+        """Get scheduler metrics.
+
+        :rtype: dict
+        """
+        with self._condition:
+            return {
+                "requests": self._requests,
+                "throttled": self._throttled,
+                "queue_depth": sum(len(queue) for queue in self._queues.values()),
+                "wait_time_total": self._wait_time_total,
+                "wait_time_max": self._wait_time_max,
+            }
+
+
+def _disable_throttling_retries(retry_policy):
+    """Stop the Azure SDK retry policy from retrying throttled requests.
+
+    :param azure.core.pipeline.policies.RetryPolicy retry_policy:
+    :return:
+    """
+    is_retry = retry_policy.is_retry
+
+    def is_retry_not_throttled(settings, response):
+        if response.http_response.status_code == 429:
+            return False
+        return is_retry(settings, response)
+
+    retry_policy.is_retry = is_retry_not_throttled
+
+
+def hand_over_throttling(azure_client, scheduler, subscription_id):
+    """Let the ARM request scheduler handle throttling of the Azure SDK clients.
+
+    Remaining requests from every response limit the buckets of the subscription
+    and throttled requests aren't retried by the SDK clients, which would retry
+    them up to 10 times, but are raised to the scheduler that retries them with
+    its backoff and jitter. Throttled status polls of the long-running operations
+    fail the operation call and it is sent again, ARM PUTs and DELETEs are
+    idempotent.
+    :param cloudshell.cp.azure.azure_client.AzureAPIClient azure_client:
+    :param ArmRequestScheduler scheduler:
+    :param str subscription_id:
+    :return:
+    """
+    response_hook = scheduler.get_response_hook(subscription_id)
+    for name in SDK_CLIENT_NAMES:
+        config = get_sdk_client(azure_client, name)._config
+        config.custom_hook_policy._response_callback = response_hook
+        _disable_throttling_retries(config.retry_policy)
+
+
+class ThrottledAzureClient(AzureClientProxy):
+    """Azure API client which calls are sent via the ARM request scheduler."""
+
+    def __init__(self, azure_client, scheduler, subscription_id, priority):
+        """Init command.
+
+        :param cloudshell.cp.azure.azure_client.AzureAPIClient azure_client:
+        :param ArmRequestScheduler scheduler:
+        :param str subscription_id:
+        :param int priority:
+        """
+        super().__init__(azure_client)
+        self._scheduler = scheduler
+        self._subscription_id = subscription_id
+        self._priority = priority
+
+    def __getattr__(self, name):
+        attr = super().__getattr__(name)
+        if name.startswith("_") or not callable(attr):
+            return attr
+
+        @functools.wraps(attr)
+        def call(*args, **kwargs):
+            return self._scheduler.execute(
+                func=lambda: attr(*args, **kwargs),
+                subscription_id=self._subscription_id,
+                kind=get_request_kind(name),
+                priority=self._priority,
+            )
+
+        return call
@@ -0,0 +1,41 @@
+from cache import TTLCache
+
+
+class AutoloadValidationCache:
+    """Keys of the Azure resources validated by the successful autoloads.
+
+    Autoload of the resource with the same credentials and the same attribute
+    values doesn't validate the same Azure resources again during the TTL.
+    """
+
+    # resources deleted in Azure are found by autoload after the TTL
+    VALIDATION_TTL = 30 * 60
+    MAX_VALIDATIONS = 1024
+
+    def __init__(self, ttl=VALIDATION_TTL, max_size=MAX_VALIDATIONS):
+        """Init command.
+
+        :param float ttl: time to live of the validation in seconds
+        :param int max_size:
+        """
+        self._validations = TTLCache(max_size=max_size, ttl=ttl)
+
+    def is_validated(self, key):
+        """Check if the resources were validated by the successful autoload.
+
+        :param tuple key:
+        :rtype: bool
+        """
+        return self._validations.get(key, False)
+
+    def save(self, keys):
+        """Save keys of the validations of the successful autoload.
+
+        :param list[tuple] keys:
+        :return:
+        """
+        for key in keys:
+            self._validations.set(key, True)
+
+    def clear(self):
+        self._validations.clear()
@@ -0,0 +1,414 @@
+import itertools
+import threading
+from collections import Counter
+from contextlib import contextmanager
+from dataclasses import dataclass
+
+from cache import TTLCache
+from client_proxy import AzureClientProxy, get_sdk_client
+
+from cloudshell.cp.azure.exceptions import BaseAzureException
+
+# quota of the vCPUs of all VM families in the region
+TOTAL_CORES_QUOTA = "cores"
+
+
+class VMCapacityError(BaseAzureException):
+    """VM size can't be deployed in the region or there is no vCPU quota for it."""
+
+
+@dataclass(frozen=True)
+class VMSize:
+    name: str
+    # name of the vCPU quota of the VM family, i.e. "standardBSFamily"
+    family: str
+    cores: int
+    memory_mb: int
+    max_data_disks: int
+    # availability zones of the size in the region
+    zones: frozenset = frozenset()
+    # zones where the size can't be deployed by the subscription
+    restricted_zones: frozenset = frozenset()
+    # size can't be deployed in the region by the subscription
+    restricted: bool = False
+
+
+def _get_capability(sku, name, default="0"):
+    for capability in sku.capabilities or []:
+        if capability.name == name:
+            return capability.value
+
+    return default
+
+
+def _parse_vm_size(sku, region):
+    """Get VM size from the resource SKU of the region.
+
+    :param azure.mgmt.compute.models.ResourceSku sku:
+    :param str region:
+    :rtype: VMSize
+    """
+    zones = set()
+    for location_info in sku.location_info or []:
+        if location_info.location.lower() == region.lower():
+            zones.update(location_info.zones or [])
+
+    restricted = False
+    restricted_zones = set()
+    for restriction in sku.restrictions or []:
+        if restriction.reason_code != "NotAvailableForSubscription":
+            continue
+        if restriction.type == "Location":
+            restricted = True
+        elif restriction.type == "Zone" and restriction.restriction_info:
+            restricted_zones.update(restriction.restriction_info.zones or [])
+
+    return VMSize(
+        name=sku.name,
+        family=sku.family,
+        cores=int(_get_capability(sku, "vCPUs")),
+        memory_mb=int(float(_get_capability(sku, "MemoryGB")) * 1024),
+        max_data_disks=int(_get_capability(sku, "MaxDataDiskCount")),
+        zones=frozenset(zones),
+        restricted_zones=frozenset(restricted_zones),
+        restricted=restricted,
+    )
+
+
+@dataclass(eq=False)
+class _Reservation:
+    subscription_id: str
+    region: str
+    # vCPUs by the quota names
+    required_cores: dict
+    # usages with greater ids were read after Azure accepted the VM request
+    accepted_usage_id: int = None
+
+
+class VMAdmission:
+    """Admission of the VM that is created or resized."""
+
+    def __init__(self, index=None, reservation=None):
+        """Init command.
+
+        :param VMCapacityIndex index:
+        :param _Reservation reservation: vCPUs reserved for the VM, None - nothing
+            is reserved
+        """
+        self._index = index
+        self._reservation = reservation
+
+    def accept(self):
+        """Mark the VM create or update request as accepted by Azure.
+
+        Usage read after that counts the vCPUs of the VM, so they are no longer
+        reserved against it.
+        """
+        if self._reservation is not None:
+            self._index._accept(self._reservation)
+
+
+class AdmittedAzureClient(AzureClientProxy):
+    """Azure API client that accepts the VM admission when the VM is submitted."""
+
+    def __init__(self, azure_client, admission):
+        """Init command.
+
+        :param cloudshell.cp.azure.azure_client.AzureAPIClient azure_client:
+        :param VMAdmission admission:
+        """
+        super().__init__(azure_client)
+        self._admission = admission
+
+    def create_or_update_virtual_machine(self, *args, **kwargs):
+        result = self._azure_client.create_or_update_virtual_machine(*args, **kwargs)
+        self._admission.accept()
+        return result
+
+    def begin_update_vm(self, *args, **kwargs):
+        result = self._azure_client.begin_update_vm(*args, **kwargs)
+        self._admission.accept()
+        return result
+
+
+class VMCapacityIndex:
+    """Process-wide index of the VM sizes and vCPU quotas of the regions.
+
+    VM sizes of the region are listed once per catalog TTL from the resource
+    SKUs, vCPU quota usage is read once per usage TTL. VM size, its zones and
+    data disks are checked before the VM is created or updated, so requests
+    that Azure would reject fail before the long-running operation starts.
+    vCPUs of the VMs that are being created are reserved until the operation
+    ends, so concurrent deploys are admitted only while there is quota for them.
+    Reservations are counted against every usage until the VM request is
+    accepted by Azure, after that only against the usage read before it:
+    the new usage already counts the VM. If the catalogs can't be read,
+    VMs are not checked.
+    """
+
+    # usage is changed by every VM in the subscription, also outside the driver
+    USAGE_TTL = 60
+    MAX_USAGES = 256
+
+    def __init__(self, catalog_cache, usage_ttl=USAGE_TTL, max_size=MAX_USAGES):
+        """Init command.
+
+        :param catalog_cache.RegionCatalogCache catalog_cache:
+        :param float usage_ttl: time to live of the quota usage in seconds
+        :param int max_size:
+        """
+        self._catalog_cache = catalog_cache
+        self._usages = TTLCache(max_size=max_size, ttl=usage_ttl)
+        self._usage_ids = itertools.count()
+        self._reservations = set()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _read_vm_sizes(azure_client, region):
+        compute_client = get_sdk_client(azure_client, "compute")
+        return {
+            sku.name.lower(): _parse_vm_size(sku, region)
+            for sku in compute_client.resource_skus.list(
+                filter=f"location eq '{region}'"
+            )
+            if sku.resource_type == "virtualMachines"
+        }
+
+    def get_vm_sizes(self, azure_client, subscription_id, region):
+        """Get VM sizes of the region.
+
+        :param cloudshell.cp.azure.azure_client.AzureAPIClient azure_client:
+        :param str subscription_id:
+        :param str region:
+        :return: VM sizes by the lowercase names
+        :rtype: dict[str, VMSize]
+        """
+        return self._catalog_cache.get_or_read(
+            key=(subscription_id, "resource_skus", region.lower()),
+            read=lambda: self._read_vm_sizes(azure_client, region),
+        )
+
+    def _get_usage_snapshot(self, azure_client, subscription_id, region):
+        """Get vCPU quota usage of the region with the id of its read.
+
+        :param cloudshell.cp.azure.azure_client.AzureAPIClient azure_client:
+        :param str subscription_id:
+        :param str region:
+        :return: usage id and current value and limit by the quota names
+        :rtype: tuple[int, dict[str, tuple[int, int]]]
+        """
+        key = (subscription_id, region.lower())
+        snapshot = self._usages.get(key)
+        if snapshot is None:
+            # id is taken before the read, requests accepted during it get newer ids
+            usage_id = next(self._usage_ids)
+            compute_client = get_sdk_client(azure_client, "compute")
+            usages = {
+                usage.name.value: (usage.current_value, usage.limit)
+                for usage in compute_client.usage.list(region)
+            }
+            snapshot = (usage_id, usages)
+            self._usages.set(key, snapshot)
+
+        return snapshot
+
+    def get_usages(self, azure_client, subscription_id, region):
+        """Get vCPU quota usage of the region.
+
+        :param cloudshell.cp.azure.azure_client.AzureAPIClient azure_client:
+        :param str subscription_id:
+        :param str region:
+        :return: current value and limit by the quota names
+        :rtype: dict[str, tuple[int, int]]
+        """
+        _, usages = self._get_usage_snapshot(azure_client, subscription_id, region)
+        return usages
+
+    @staticmethod
+    def _check_vm_size(vm_size_name, vm_sizes, region, zones, data_disks):
+        vm_size = vm_sizes.get(vm_size_name.lower())
+        if vm_size is None:
+            raise VMCapacityError(
+                f"VM size '{vm_size_name}' is not available in the region '{region}'"
+            )
+        if vm_size.restricted:
+            raise VMCapacityError(
+                f"VM size '{vm_size_name}' is not available for the subscription "
+                f"in the region '{region}'"
+            )
+
+        unavailable_zones = set(zones) - (vm_size.zones - vm_size.restricted_zones)
+        if unavailable_zones:
+            raise VMCapacityError(
+                f"VM size '{vm_size_name}' is not available in the availability "
+                f"zones {', '.join(sorted(unavailable_zones))} of the region '{region}'"
+            )
+
+        VMCapacityIndex._check_data_disks(vm_size, data_disks)
+        return vm_size
+
+    @staticmethod
+    def _check_data_disks(vm_size, data_disks):
+        if data_disks > vm_size.max_data_disks:
+            raise VMCapacityError(
+                f"VM size '{vm_size.name}' supports up to {vm_size.max_data_disks} "
+                f"data disks, requested {data_disks}"
+            )
+
+    @staticmethod
+    def _get_required_cores(vm_size, current_vm_size):
+        """Get vCPUs required by the new VM or by the VM resize.
+
+        :param VMSize vm_size:
+        :param VMSize current_vm_size: size of the resized VM
+        :return: vCPUs by the quota names
+        :rtype: dict[str, int]
+        """
+        current_cores = current_vm_size.cores if current_vm_size else 0
+        current_family_cores = (
+            current_cores
+            if current_vm_size and current_vm_size.family == vm_size.family
+            else 0
+        )
+        required_cores = {
+            TOTAL_CORES_QUOTA: vm_size.cores - current_cores,
+            vm_size.family: vm_size.cores - current_family_cores,
+        }
+        return {name: cores for name, cores in required_cores.items() if cores > 0}
+
+    def _get_reserved_cores(self, subscription_id, region, usage_id):
+        """Get vCPUs reserved for the VMs that the usage may not count.
+
+        :param str subscription_id:
+        :param str region:
+        :param int usage_id: None - usage wasn't read
+        :return: vCPUs by the quota names
+        :rtype: collections.Counter
+        """
+        reserved = Counter()
+        for reservation in self._reservations:
+            if (
+                reservation.subscription_id == subscription_id
+                and reservation.region == region
+                and (
+                    reservation.accepted_usage_id is None
+                    or usage_id is None
+                    or usage_id < reservation.accepted_usage_id
+                )
+            ):
+                reserved.update(reservation.required_cores)
+
+        return reserved
+
+    def _reserve(self, reservation, usage_id, usages):
+        with self._lock:
+            reserved = self._get_reserved_cores(
+                reservation.subscription_id, reservation.region, usage_id
+            )
+            for quota_name, cores in reservation.required_cores.items():
+                if quota_name not in usages:
+                    continue
+
+                current_value, limit = usages[quota_name]
+                available = limit - current_value - reserved[quota_name]
+                if cores > available:
+                    raise VMCapacityError(
+                        f"Not enough vCPU quota '{quota_name}' in the region "
+                        f"'{reservation.region}': {cores} vCPUs are required, "
+                        f"{max(available, 0)} are available"
+                    )
+
+            self._reservations.add(reservation)
+
+    def _accept(self, reservation):
+        with self._lock:
+            if reservation.accepted_usage_id is None:
+                reservation.accepted_usage_id = next(self._usage_ids)
+
+    def _release(self, reservation):
+        with self._lock:
+            self._reservations.discard(reservation)
+
+        # created VMs are counted by Azure in the new usage
+        self._usages.pop((reservation.subscription_id, reservation.region))
+
+    @contextmanager
+    def admit(
+        self,
+        azure_client,
+        subscription_id,
+        region,
+        vm_size_name,
+        logger,
+        zones=(),
+        data_disks=0,
+        current_vm_size_name=None,
+    ):
+        """Check the VM and reserve its vCPUs while it is created or resized.
+
+        Yielded admission must be accepted when Azure accepts the VM request,
+        AdmittedAzureClient does it.
+
+        :param cloudshell.cp.azure.azure_client.AzureAPIClient azure_client:
+        :param str subscription_id:
+        :param str region:
+        :param str vm_size_name: VM size of the created or resized VM
+        :param logging.Logger logger:
+        :param list[str] zones: availability zones of the VM
+        :param int data_disks: number of the VM data disks
+        :param str current_vm_size_name: current VM size of the resized VM
+        :raises VMCapacityError: if Azure would reject the VM
+        :rtype: VMAdmission
+        """
+        region = region.lower()
+        try:
+            vm_sizes = self.get_vm_sizes(azure_client, subscription_id, region)
+        except Exception:
+            logger.warning("Unable to read VM sizes of the region", exc_info=True)
+            vm_sizes = None
+
+        if not vm_sizes:
+            yield VMAdmission()
+            return
+
+        current_vm_size = None
+        if current_vm_size_name:
+            current_vm_size = vm_sizes.get(current_vm_size_name.lower())
+            # vCPUs and data disks of the unknown size can't be compared
+            if current_vm_size is None:
+                yield VMAdmission()
+                return
+
+        if current_vm_size and current_vm_size.name.lower() == vm_size_name.lower():
+            self._check_data_disks(current_vm_size, data_disks)
+            yield VMAdmission()
+            return
+
+        vm_size = self._check_vm_size(
+            vm_size_name=vm_size_name,
+            vm_sizes=vm_sizes,
+            region=region,
+            zones=zones,
+            data_disks=data_disks,
+        )
+        reservation = _Reservation(
+            subscription_id=subscription_id,
+            region=region,
+            required_cores=self._get_required_cores(vm_size, current_vm_size),
+        )
+        try:
+            usage_id, usages = self._get_usage_snapshot(
+                azure_client, subscription_id, region
+            )
+        except Exception:
+            logger.warning("Unable to read vCPU quota usage", exc_info=True)
+            usage_id, usages = None, {}
+
+        self._reserve(reservation, usage_id, usages)
+        try:
+            yield VMAdmission(index=self, reservation=reservation)
+        finally:
+            self._release(reservation)
+
+    def clear(self):
+        self._usages.clear()
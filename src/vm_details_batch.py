@@ -0,0 +1,56 @@
+import dataclasses
+import json
+
+from cloudshell.cp.core.request_actions import GetVMDetailsRequestActions
+from cloudshell.cp.core.request_actions.models import VmDetailsData
+
+from concurrency import run_concurrently
+
+
+def get_vm_details_concurrently(
+    vm_details_flow, request_actions, max_workers, timeout, is_cancelled, logger
+):
+    """Get VM Details for all deployed Apps in parallel.
+
+    Failed or timed out Apps don't fail the whole request, VM Details for them
+    contain only the error message.
+    :param cloudshell.cp.azure.flows.vm_details.AzureGetVMDetailsFlow vm_details_flow:
+    :param GetVMDetailsRequestActions request_actions:
+    :param int max_workers:
+    :param float timeout: max time to get VM Details for one App in seconds
+    :param is_cancelled: function that returns True when command is cancelled
+    :param logging.Logger logger:
+    :rtype: str
+    """
+
+    def get_vm_details(deployed_app):
+        app_request_actions = GetVMDetailsRequestActions(deployed_apps=[deployed_app])
+        return json.loads(
+            vm_details_flow.get_vm_details(request_actions=app_request_actions)
+        )
+
+    task_results = run_concurrently(
+        func=get_vm_details,
+        items=request_actions.deployed_apps,
+        max_workers=max_workers,
+        timeout=timeout,
+        is_cancelled=is_cancelled,
+    )
+
+    results = []
+    for task_result in task_results:
+        if task_result.success:
+            results.extend(task_result.result)
+        else:
+            app_name = task_result.item.name
+            logger.warning(
+                f"Failed to get VM Details for the App '{app_name}'",
+                exc_info=task_result.error,
+            )
+            vm_details_data = VmDetailsData(
+                appName=app_name,
+                errorMessage=f"Failed to get VM Details: {task_result.error}",
+            )
+            results.append(dataclasses.asdict(vm_details_data))
+
+    return json.dumps(results)
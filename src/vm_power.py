@@ -0,0 +1,202 @@
+import time
+from concurrent.futures import CancelledError
+
+from concurrency import TaskResult, run_concurrently
+from lro_poller import PollResult
+
+
+def get_headers_hook(headers):
+    """Get raw response hook that saves the response headers.
+
+    :param dict headers: headers of the response are saved to the dict
+    :return: raw response hook of the Azure SDK operation
+    """
+
+    def save_headers(pipeline_response):
+        headers.update(pipeline_response.http_response.headers)
+
+    return save_headers
+
+
+def get_retry_after(headers):
+    """Get seconds from the Retry-After header.
+
+    :param dict headers:
+    :rtype: float | None
+    """
+    try:
+        return float(headers.get("Retry-After"))
+    except (TypeError, ValueError):
+        return None
+
+
+def get_vm_statuses(azure_client, vm_name, resource_group_name):
+    """Get status codes of the VM and Retry-After of the response.
+
+    :param cloudshell.cp.azure.azure_client.AzureAPIClient azure_client: client
+        with the SdkAzureClient operations
+    :param str vm_name:
+    :param str resource_group_name:
+    :return: status codes and seconds before the next poll
+    :rtype: tuple[list[str], float | None]
+    """
+    headers = {}
+    instance_view = azure_client.get_vm_instance_view(
+        vm_name=vm_name,
+        resource_group_name=resource_group_name,
+        raw_response_hook=get_headers_hook(headers),
+    )
+    statuses = [status.code for status in instance_view.statuses or []]
+    return statuses, get_retry_after(headers)
+
+
+def wait_for_operation(future, deadline, is_cancelled=None):
+    """Wait for the operation of the poller until the deadline or cancellation.
+
+    :param concurrent.futures.Future future:
+    :param float deadline: time.monotonic() value to stop waiting at
+    :param is_cancelled: function that returns True when command is cancelled
+    :return: True if the operation is done
+    :rtype: bool
+    """
+    while not future.done():
+        if is_cancelled is not None and is_cancelled():
+            break
+        if time.monotonic() >= deadline:
+            break
+        try:
+            future.result(timeout=1)
+        except Exception:
+            pass
+
+    return future.done()
+
+
+class VMPowerOperations:
+    """Start/deallocate VMs without keeping a thread per operation.
+
+    Operations are submitted to Azure without waiting and the VM power states
+    are polled by the shared long-running operation poller. Both are sent via
+    the Azure API client wrappers, so they go through the ARM request scheduler
+    and the submitted operations evict the cached reads of their VMs.
+    """
+
+    POWER_STATE_RUNNING = "PowerState/running"
+    POWER_STATE_DEALLOCATED = "PowerState/deallocated"
+    PROVISIONING_STATE_FAILED = "ProvisioningState/failed"
+
+    def __init__(self, azure_client, poller, logger):
+        """Init command.
+
+        :param cloudshell.cp.azure.azure_client.AzureAPIClient azure_client: client
+            with the SdkAzureClient operations
+        :param lro_poller.SharedLROPoller poller:
+        :param logging.Logger logger:
+        """
+        self._azure_client = azure_client
+        self._poller = poller
+        self._logger = logger
+
+    def _begin(self, vm_name, resource_group_name, power_on):
+        """Submit start/deallocate operation and get Retry-After of the response.
+
+        :param str vm_name:
+        :param str resource_group_name:
+        :param bool power_on:
+        :rtype: float | None
+        """
+        headers = {}
+        if power_on:
+            begin_operation = self._azure_client.begin_start_vm
+        else:
+            begin_operation = self._azure_client.begin_deallocate_vm
+
+        begin_operation(
+            vm_name=vm_name,
+            resource_group_name=resource_group_name,
+            raw_response_hook=get_headers_hook(headers),
+        )
+        return get_retry_after(headers)
+
+    def _start_operation(self, vm_name, resource_group_name, power_on):
+        """Submit the power operation and register it in the poller.
+
+        :param str vm_name:
+        :param str resource_group_name:
+        :param bool power_on:
+        :rtype: concurrent.futures.Future
+        """
+        if power_on:
+            expected_state = self.POWER_STATE_RUNNING
+        else:
+            expected_state = self.POWER_STATE_DEALLOCATED
+        key = (resource_group_name.lower(), vm_name.lower(), expected_state)
+
+        def poll():
+            statuses, retry_after = get_vm_statuses(
+                self._azure_client, vm_name, resource_group_name
+            )
+            failed = [
+                code
+                for code in statuses
+                if code.startswith(self.PROVISIONING_STATE_FAILED)
+            ]
+            if failed:
+                raise Exception(f"VM '{vm_name}' operation failed: {failed[0]}")
+            return PollResult(done=expected_state in statuses, retry_after=retry_after)
+
+        retry_after = None
+        if not self._poller.is_pending(key):
+            self._logger.info(f"Changing power state of the VM '{vm_name}'")
+            retry_after = self._begin(vm_name, resource_group_name, power_on)
+
+        return self._poller.submit(key=key, poll=poll, initial_delay=retry_after)
+
+    def change_power_state(
+        self,
+        vms,
+        power_on,
+        max_workers,
+        timeout,
+        is_cancelled=None,
+    ):
+        """Start or deallocate VMs and wait for all of them.
+
+        :param list[tuple[str, str]] vms: VM names and their resource group names
+        :param bool power_on:
+        :param int max_workers: max number of the concurrently submitted operations
+        :param float timeout: seconds to wait for all operations
+        :param is_cancelled: function that returns True when command is cancelled
+        :return: results with the VM name and resource group name as the item
+        :rtype: list[TaskResult]
+        """
+        submit_results = run_concurrently(
+            func=lambda vm: self._start_operation(
+                vm_name=vm[0], resource_group_name=vm[1], power_on=power_on
+            ),
+            items=vms,
+            max_workers=max_workers,
+        )
+
+        deadline = time.monotonic() + timeout
+        results = []
+        for submit_result in submit_results:
+            if not submit_result.success:
+                results.append(submit_result)
+                continue
+
+            future = submit_result.result
+            vm = submit_result.item
+            if not wait_for_operation(future, deadline, is_cancelled):
+                error = (
+                    CancelledError("Waiting was cancelled")
+                    if is_cancelled is not None and is_cancelled()
+                    else TimeoutError(f"VM power state didn't change in {timeout}s")
+                )
+                results.append(TaskResult(item=vm, error=error))
+            elif future.exception() is not None:
+                results.append(TaskResult(item=vm, error=future.exception()))
+            else:
+                results.append(TaskResult(item=vm, result=future.result()))
+
+        return results
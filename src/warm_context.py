@@ -0,0 +1,275 @@
+import functools
+import threading
+from collections.abc import Iterator
+
+from azure_client_cache import get_credentials_key
+from client_proxy import AzureClientProxy, get_resource_name_and_group
+from read_cache import copy_read_result
+
+# scope of the AAD access token for the Azure Resource Manager
+ARM_TOKEN_SCOPE = "https://management.azure.com/.default"
+
+# Azure API client methods that read the management resources
+WARM_METHODS = frozenset(
+    {
+        "get_resource_group",
+        "get_virtual_network",
+        "get_virtual_networks_by_resource_group",
+    }
+)
+
+
+def get_warm_key(resource_config):
+    """Get key of the resource attributes the warm context depends on.
+
+    :param cloudshell.cp.azure.resource_config.AzureResourceConfig resource_config:
+    :rtype: tuple
+    """
+    return (
+        resource_config.name,
+        *get_credentials_key(resource_config),
+        resource_config.management_group_name,
+        resource_config.sandbox_vnet_name,
+        resource_config.management_vnet_name,
+    )
+
+
+def _get_read_key(method_name, args, kwargs):
+    """Get key of the management resource read from the client call arguments.
+
+    :param str method_name:
+    :param tuple args:
+    :param dict kwargs:
+    :rtype: tuple | None
+    """
+    if method_name == "get_virtual_network":
+        name_and_group = get_resource_name_and_group(args, kwargs)
+        if name_and_group is None:
+            return None
+        vnet_name, resource_group_name = name_and_group
+        return method_name, resource_group_name.lower(), vnet_name.lower()
+
+    names = [*args, *kwargs.values()]
+    if len(names) != 1 or not isinstance(names[0], str):
+        return None
+
+    return method_name, names[0].lower()
+
+
+class WarmResourceContext:
+    """Management resources of the cloud provider resource read ahead of commands.
+
+    Only reads that don't depend on the sandboxes are kept: the management
+    resource group, the management vNet and the vNets list of the management
+    resource group that flows use to find the management vNet by its tag.
+    The list is kept only if the sandbox vNet is set by name, otherwise flows
+    look for the sandbox vNet and its subnets in the list too.
+    """
+
+    def __init__(self, key, reads):
+        """Init command.
+
+        :param tuple key: warm key of the resource config
+        :param dict reads: read results by the read keys
+        """
+        self.key = key
+        self._reads = reads
+
+    @classmethod
+    def read(cls, resource_config, azure_client, logger):
+        """Validate credentials and read the management resources.
+
+        :param cloudshell.cp.azure.resource_config.AzureResourceConfig resource_config:
+        :param cloudshell.cp.azure.azure_client.AzureAPIClient azure_client:
+        :param logging.Logger logger:
+        :rtype: WarmResourceContext
+        """
+        logger.info(f"Warming context of the resource '{resource_config.name}'...")
+        # credentials keep the access token, so commands skip the AAD round-trip
+        azure_client._credentials.get_token(ARM_TOKEN_SCOPE)
+
+        mgmt_group_name = resource_config.management_group_name
+        calls = [("get_resource_group", (mgmt_group_name,))]
+        if resource_config.management_vnet_name:
+            calls.append(
+                (
+                    "get_virtual_network",
+                    (resource_config.management_vnet_name, mgmt_group_name),
+                )
+            )
+        if resource_config.sandbox_vnet_name:
+            calls.append(("get_virtual_networks_by_resource_group", (mgmt_group_name,)))
+
+        reads = {}
+        for method_name, args in calls:
+            result = getattr(azure_client, method_name)(*args)
+            if isinstance(result, Iterator):
+                result = list(result)
+            reads[_get_read_key(method_name, args, {})] = result
+
+        return cls(key=get_warm_key(resource_config), reads=reads)
+
+    def get_read(self, method_name, args, kwargs, default=None):
+        """Get read result of the management resource.
+
+        :param str method_name:
+        :param tuple args:
+        :param dict kwargs:
+        :param default:
+        :return: copy of the read result or the default if it isn't kept
+        """
+        key = _get_read_key(method_name, args, kwargs)
+        if key not in self._reads:
+            return default
+
+        return copy_read_result(self._reads[key])
+
+
+class WarmContextManager:
+    """Warm contexts of the cloud provider resources used by the driver.
+
+    Context is read in the background when the driver is initialized, so
+    initialization doesn't wait for Azure and doesn't fail with it. Contexts
+    are refreshed in the background until the cleanup of the last driver
+    instance of the resource, failed refresh drops the context and commands
+    read the management resources themselves.
+    """
+
+    # management vNet address space changes are picked up after the interval
+    REFRESH_INTERVAL = 5 * 60
+
+    def __init__(self, refresh_interval=REFRESH_INTERVAL):
+        """Init command.
+
+        :param float refresh_interval: seconds between the context refreshes
+        """
+        self._refresh_interval = refresh_interval
+        self._contexts = {}
+        self._warmers = {}
+        # driver instances that use the resource context
+        self._references = {}
+        # refresher of the resource, changes when the refreshing is restarted
+        self._refreshers = {}
+        self._timers = {}
+        self._lock = threading.Lock()
+
+    def start(self, resource_name, warm):
+        """Warm context of the resource in the background and keep it fresh.
+
+        Context that is already refreshed for another driver instance is kept,
+        the next refresh reads it with the latest warm function.
+        :param str resource_name:
+        :param warm: function without arguments that reads WarmResourceContext
+        :return:
+        """
+        with self._lock:
+            self._warmers[resource_name] = warm
+            self._references[resource_name] = self._references.get(resource_name, 0) + 1
+            if resource_name not in self._refreshers:
+                refresher = self._refreshers[resource_name] = object()
+                self._schedule(resource_name, refresher, delay=0)
+
+    def _schedule(self, resource_name, refresher, delay):
+        timer = threading.Timer(delay, self._refresh, args=(resource_name, refresher))
+        timer.daemon = True
+        self._timers[resource_name] = timer
+        timer.start()
+
+    def _refresh(self, resource_name, refresher):
+        with self._lock:
+            if self._refreshers.get(resource_name) is not refresher:
+                return
+            warm = self._warmers[resource_name]
+
+        try:
+            context = warm()
+        except Exception:
+            context = None
+
+        with self._lock:
+            # context was stopped or started again while it was read
+            if self._refreshers.get(resource_name) is not refresher:
+                return
+
+            if context is None:
+                self._contexts.pop(resource_name, None)
+            else:
+                self._contexts[resource_name] = context
+
+            self._schedule(resource_name, refresher, delay=self._refresh_interval)
+
+    def get(self, resource_config):
+        """Get warm context for the resource config.
+
+        :param cloudshell.cp.azure.resource_config.AzureResourceConfig resource_config:
+        :return: context or None if it isn't warm or the resource was changed
+        :rtype: WarmResourceContext | None
+        """
+        with self._lock:
+            context = self._contexts.get(resource_config.name)
+
+        if context is None or context.key != get_warm_key(resource_config):
+            return None
+
+        return context
+
+    def _stop(self, resource_name):
+        self._references.pop(resource_name, None)
+        self._refreshers.pop(resource_name, None)
+        self._warmers.pop(resource_name, None)
+        self._contexts.pop(resource_name, None)
+        timer = self._timers.pop(resource_name, None)
+        if timer is not None:
+            timer.cancel()
+
+    def stop(self, resource_name):
+        """Release context of the resource for one driver instance.
+
+        Refreshing is stopped and the context is released when no driver
+        instance uses it anymore.
+        :param str resource_name:
+        :return: True if the last driver instance of the resource released it
+        :rtype: bool
+        """
+        with self._lock:
+            references = self._references.get(resource_name, 0) - 1
+            if references > 0:
+                self._references[resource_name] = references
+                return False
+
+            self._stop(resource_name)
+            return True
+
+    def clear(self):
+        with self._lock:
+            for resource_name in list(self._refreshers):
+                self._stop(resource_name)
+
+
+class WarmAzureClient(AzureClientProxy):
+    """Azure API client that takes management resources from the warm context."""
+
+    def __init__(self, azure_client, warm_context):
+        """Init command.
+
+        :param cloudshell.cp.azure.azure_client.AzureAPIClient azure_client:
+        :param WarmResourceContext warm_context:
+        """
+        super().__init__(azure_client)
+        self._warm_context = warm_context
+
+    def __getattr__(self, name):
+        attr = super().__getattr__(name)
+        if name not in WARM_METHODS:
+            return attr
+
+        @functools.wraps(attr)
+        def read(*args, **kwargs):
+            sentinel = object()
+            result = self._warm_context.get_read(name, args, kwargs, default=sentinel)
+            if result is sentinel:
+                return attr(*args, **kwargs)
+
+            return result
+
+        return read
@@ -0,0 +1,1045 @@
+"""Offline benchmark of the AzureDriver commands.
+
+Commands run against the in-process fake of the Azure API client and
+the CloudShell API with the injected latency, long-running operation
+duration and ARM throttling (HTTP 429) rate, i.e.:
+
+    PYTHONPATH=src python -m tests.benchmark --commands Deploy GetVmDetails \
+        --iterations 50 --concurrency 10 --latency 0.05 --lro-duration 0.5
+"""
+
+import argparse
+import json
+import logging
+import os
+import random
+import subprocess
+import sys
+import threading
+import time
+import uuid
+from collections import Counter
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from types import SimpleNamespace
+from unittest import mock
+
+from msrestazure.azure_exceptions import CloudError
+
+import driver
+from catalog_cache import RegionCatalogCache
+from concurrency import run_concurrently
+from image_cache import ImageMetadataCache
+from instrumentation import Instrumentation
+from lock_manager import KeyedLockManager
+from lro_poller import SharedLROPoller
+from read_cache import AzureReadCache, is_read_method
+from resource_config_cache import ResourceConfigCache
+from sandbox_prepare import PreparedSandboxCache
+from single_flight import SingleFlight
+from throttling import ArmRequestScheduler, get_request_kind
+from validation_cache import AutoloadValidationCache
+from vm_capacity import VMCapacityIndex
+from warm_context import WarmContextManager
+
+from cloudshell.cp.azure import constants
+
+logger = logging.getLogger(__name__)
+
+COMMANDS = (
+    "Deploy",
+    "GetVmDetails",
+    "DeleteInstance",
+    "SetAppSecurityGroups",
+    "CleanupSandboxInfra",
+    "get_inventory",
+    "reconfigure_vm",
+)
+SUBSCRIPTION_ID = "00000000-0000-0000-0000-000000000000"
+MGMT_RESOURCE_GROUP = "mgmt-rg"
+SANDBOX_VNET = "sandbox-vnet"
+SANDBOX_CIDR = "10.0.1.0/24"
+SRC_DIR = os.path.join(os.path.dirname(os.path.dirname(__file__)), "src")
+# modules that shouldn't be loaded with the driver, commands import them lazily
+STARTUP_LAZY_MODULES = (
+    "azure.mgmt",
+    "cloudshell.cp.azure.azure_client",
+    "cloudshell.cp.azure.flows",
+)
+STARTUP_SCRIPT = """
+import json, sys, time
+
+started_at = time.perf_counter()
+import driver
+imported_at = time.perf_counter()
+lazy_modules = [name for name in sys.modules if name.startswith(%r)]
+driver.AzureDriver()
+created_at = time.perf_counter()
+driver.register_deployment_paths()
+registered_at = time.perf_counter()
+
+print(json.dumps({
+    "import_driver": imported_at - started_at,
+    "create_driver": created_at - imported_at,
+    "register_deployment_paths": registered_at - created_at,
+    "lazy_modules_loaded": sorted(lazy_modules),
+}))
+""" % (STARTUP_LAZY_MODULES,)
+
+
+@dataclass
+class ArmConfig:
+    # seconds of every Azure call
+    latency: float = 0.0
+    # extra seconds of the calls that wait for the long-running operation
+    lro_duration: float = 0.0
+    # share of the calls rejected with HTTP 429
+    throttle_rate: float = 0.0
+    # Retry-After of the throttled calls
+    retry_after: float = 0.0
+    seed: int = None
+
+
+class FakeThrottlingError(Exception):
+    def __init__(self, retry_after):
+        super().__init__("Too many requests")
+        self.status_code = 429
+        self.response = SimpleNamespace(
+            status_code=429, headers={"Retry-After": str(retry_after)}
+        )
+
+
+class FakeArm:
+    """Simulated ARM endpoint that counts calls per benchmarked command."""
+
+    def __init__(self, config):
+        """Init command.
+
+        :param ArmConfig config:
+        """
+        self._config = config
+        self._random = random.Random(config.seed)
+        self._lock = threading.Lock()
+        self.calls = Counter()
+        self.throttled = 0
+
+    def call(self, method):
+        config = self._config
+        with self._lock:
+            self.calls[method] += 1
+            throttled = self._random.random() < config.throttle_rate
+
+        time.sleep(config.latency)
+        if throttled:
+            with self._lock:
+                self.throttled += 1
+            raise FakeThrottlingError(retry_after=config.retry_after)
+
+        if get_request_kind(method.rsplit(".", 1)[-1]) != "reads":
+            time.sleep(config.lro_duration)
+
+    def reset(self):
+        with self._lock:
+            self.calls.clear()
+            self.throttled = 0
+
+
+class FakeOperations:
+    """Azure SDK operations group, i.e. network_client.network_security_groups."""
+
+    def __init__(self, arm, name, responses):
+        self._arm = arm
+        self._name = name
+        self._responses = responses
+
+    def __getattr__(self, name):
+        method = f"{self._name}.{name}"
+
+        def call(*args, **kwargs):
+            # throttled calls are retried by the ARM request scheduler,
+            # the SDK clients don't retry them
+            self._arm.call(method)
+            response = self._responses.get(method)
+            return response(*args, **kwargs) if response else mock.MagicMock()
+
+        return call
+
+
+class FakeSdkClient:
+    def __init__(self, arm, name, responses):
+        self._arm = arm
+        self._name = name
+        self._responses = responses
+
+    def __getattr__(self, name):
+        return FakeOperations(
+            arm=self._arm, name=f"{self._name}.{name}", responses=self._responses
+        )
+
+
+class FakeOperationPoller:
+    """Poller of the long-running operation that is already finished."""
+
+    def __init__(self, result):
+        self._result = result
+
+    def done(self):
+        return True
+
+    def status(self):
+        return "Succeeded"
+
+    def result(self, timeout=None):
+        return self._result
+
+    def wait(self, timeout=None):
+        pass
+
+
+def _get_resource_id(resource_group_name, provider, name):
+    return (
+        f"/subscriptions/{SUBSCRIPTION_ID}/resourceGroups/{resource_group_name}"
+        f"/providers/{provider}/{name}"
+    )
+
+
+def _prepare_disk(
+    disk_name, resource_group_name, disk_size=30, disk_type="Standard_LRS"
+):
+    return SimpleNamespace(
+        name=disk_name,
+        id=_get_resource_id(resource_group_name, "Microsoft.Compute/disks", disk_name),
+        disk_size_gb=int(disk_size),
+        sku=SimpleNamespace(name=disk_type),
+        tags={},
+    )
+
+
+def _prepare_network_interface(
+    interface_name, resource_group_name, private_ip_address=None, subnet=None
+):
+    subnet_id = subnet.id if subnet else "/subnets/subnet"
+    return SimpleNamespace(
+        name=interface_name,
+        id=_get_resource_id(
+            resource_group_name,
+            "Microsoft.Network/networkInterfaces",
+            interface_name,
+        ),
+        primary=True,
+        mac_address="00-0D-3A-00-00-01",
+        resource_guid=str(uuid.uuid5(uuid.NAMESPACE_URL, interface_name)),
+        tags={},
+        ip_configurations=[
+            SimpleNamespace(
+                private_ip_address=private_ip_address or "10.0.1.4",
+                private_ip_allocation_method="Static",
+                public_ip_address=None,
+                subnet=SimpleNamespace(id=subnet_id),
+            )
+        ],
+    )
+
+
+def _prepare_virtual_machine(vm_name, resource_group_name):
+    managed_disk = SimpleNamespace(
+        id=_get_resource_id(
+            resource_group_name, "Microsoft.Compute/disks", f"{vm_name}_os"
+        ),
+        storage_account_type="Standard_LRS",
+    )
+    return SimpleNamespace(
+        name=vm_name,
+        id=_get_resource_id(
+            resource_group_name, "Microsoft.Compute/virtualMachines", vm_name
+        ),
+        vm_id=str(uuid.uuid5(uuid.NAMESPACE_URL, vm_name)),
+        location="westeurope",
+        tags={},
+        zones=None,
+        additional_capabilities=None,
+        hardware_profile=SimpleNamespace(vm_size="Standard_B1s"),
+        storage_profile=SimpleNamespace(
+            image_reference=SimpleNamespace(
+                publisher="Canonical", offer="UbuntuServer", sku="18.04-LTS", id=None
+            ),
+            os_disk=SimpleNamespace(
+                name=f"{vm_name}_os",
+                os_type="Linux",
+                disk_size_gb=30,
+                managed_disk=managed_disk,
+                vhd=None,
+            ),
+            data_disks=[],
+        ),
+        network_profile=SimpleNamespace(
+            network_interfaces=[
+                SimpleNamespace(
+                    id=_get_resource_id(
+                        resource_group_name,
+                        "Microsoft.Network/networkInterfaces",
+                        f"{vm_name}_0",
+                    ),
+                    primary=True,
+                )
+            ]
+        ),
+    )
+
+
+class FakeAzureAPIClient:
+    """Fake of the AzureAPIClient.
+
+    Calls that results are read by the flows return the VMs, network
+    interfaces, etc. generated by their names, other calls return MagicMock.
+    """
+
+    def __init__(self, arm):
+        """Init command.
+
+        :param FakeArm arm:
+        """
+        self._arm = arm
+        self._lock = threading.Lock()
+        self._subnets = {}
+        self._credentials = mock.Mock()
+        responses = {
+            "network.network_interfaces.list": lambda *args, **kwargs: [],
+            "compute.resource_skus.list": self._list_resource_skus,
+            "compute.usage.list": self._list_usages,
+            "compute.virtual_machines.instance_view": self._get_vm_instance_view,
+        }
+        for name in ("compute", "network", "resource", "storage", "subscription"):
+            setattr(
+                self,
+                f"_{name}_client",
+                FakeSdkClient(arm=arm, name=name, responses=responses),
+            )
+
+    def __getattr__(self, name):
+        if name.startswith("_"):
+            raise AttributeError(name)
+
+        def call(*args, **kwargs):
+            self._arm.call(name)
+            response = getattr(self, f"_fake_{name}", None)
+            if response:
+                return response(*args, **kwargs)
+            # read models are not iterable, unlike the paged list results
+            return mock.Mock() if is_read_method(name) else mock.MagicMock()
+
+        return call
+
+    def add_sandbox_subnet(self, reservation_id):
+        """Add subnet of the reservation to the sandbox vNet.
+
+        :param str reservation_id:
+        :rtype: str
+        """
+        name = get_sandbox_subnet_name(reservation_id)
+        subnet = SimpleNamespace(
+            name=name,
+            id=f"/subscriptions/{SUBSCRIPTION_ID}/resourceGroups/"
+            f"{MGMT_RESOURCE_GROUP}/providers/Microsoft.Network/virtualNetworks/"
+            f"{SANDBOX_VNET}/subnets/{name}",
+            address_prefix=SANDBOX_CIDR,
+            ip_configurations=[],
+            network_security_group=None,
+            route_table=None,
+        )
+        with self._lock:
+            self._subnets[name] = subnet
+        return name
+
+    @staticmethod
+    def _list_resource_skus(**kwargs):
+        return [
+            SimpleNamespace(
+                name="Standard_B1s",
+                resource_type="virtualMachines",
+                family="standardBSFamily",
+                capabilities=[
+                    SimpleNamespace(name="vCPUs", value="1"),
+                    SimpleNamespace(name="MemoryGB", value="1"),
+                    SimpleNamespace(name="MaxDataDiskCount", value="2"),
+                ],
+                location_info=[
+                    SimpleNamespace(location="westeurope", zones=["1", "2", "3"])
+                ],
+                restrictions=[],
+            )
+        ]
+
+    @staticmethod
+    def _get_vm_instance_view(**kwargs):
+        # operations of the fake ARM are finished when they are accepted
+        return SimpleNamespace(
+            statuses=[
+                SimpleNamespace(code="ProvisioningState/succeeded"),
+                SimpleNamespace(code="PowerState/running"),
+            ]
+        )
+
+    @staticmethod
+    def _list_usages(location):
+        # quota doesn't limit the benchmark deploys
+        return [
+            SimpleNamespace(
+                name=SimpleNamespace(value=name), current_value=0, limit=100000
+            )
+            for name in ("cores", "standardBSFamily")
+        ]
+
+    @staticmethod
+    def _fake_get_network_security_group(
+        network_security_group_name, resource_group_name
+    ):
+        return SimpleNamespace(
+            name=network_security_group_name, security_rules=[], etag=None
+        )
+
+    @staticmethod
+    def _fake_get_latest_virtual_machine_image(region, publisher_name, offer, sku):
+        return SimpleNamespace(
+            os_disk_image=SimpleNamespace(operating_system="Linux"), plan=None
+        )
+
+    @staticmethod
+    def _fake_network_security_group_exists(nsg_name, resource_group_name):
+        return True
+
+    @staticmethod
+    def _fake_get_nsg_rules(resource_group_name, nsg_name):
+        return []
+
+    @staticmethod
+    def _fake_get_virtual_networks_by_resource_group(resource_group_name):
+        return []
+
+    @staticmethod
+    def _fake_get_available_regions():
+        return [SimpleNamespace(name="westeurope")]
+
+    @staticmethod
+    def _fake_get_virtual_machine_sizes_by_region(region):
+        return iter([SimpleNamespace(name="Standard_B1s")])
+
+    @staticmethod
+    def _fake_create_network_interface(
+        interface_name, resource_group_name, subnet, private_ip_address=None, **kwargs
+    ):
+        return _prepare_network_interface(
+            interface_name=interface_name,
+            resource_group_name=resource_group_name,
+            private_ip_address=private_ip_address,
+            subnet=subnet,
+        )
+
+    @staticmethod
+    def _fake_get_network_interface(interface_name, resource_group_name):
+        return _prepare_network_interface(
+            interface_name=interface_name, resource_group_name=resource_group_name
+        )
+
+    @staticmethod
+    def _fake_create_or_update_virtual_machine(
+        vm_name, virtual_machine, resource_group_name, wait_for_result=True
+    ):
+        vm = _prepare_virtual_machine(
+            vm_name=vm_name, resource_group_name=resource_group_name
+        )
+        return vm if wait_for_result else FakeOperationPoller(vm)
+
+    @staticmethod
+    def _fake_get_disk(disk_name, resource_group_name):
+        # VMs are deployed without data disks
+        if not disk_name.endswith("_os"):
+            raise CloudError(SimpleNamespace(status_code=404), error="Not found")
+        return _prepare_disk(
+            disk_name=disk_name, resource_group_name=resource_group_name
+        )
+
+    @staticmethod
+    def _fake_create_disk(
+        disk_name, resource_group_name, region, disk_size, disk_type, tags, zones
+    ):
+        return _prepare_disk(
+            disk_name=disk_name,
+            resource_group_name=resource_group_name,
+            disk_size=disk_size,
+            disk_type=disk_type,
+        )
+
+    @staticmethod
+    def _fake_update_disk(disk, resource_group_name, **kwargs):
+        return disk
+
+    @staticmethod
+    def _fake_get_vm(vm_name, resource_group_name):
+        return _prepare_virtual_machine(
+            vm_name=vm_name, resource_group_name=resource_group_name
+        )
+
+    def _fake_get_virtual_network(self, virtual_network_name, resource_group_name):
+        with self._lock:
+            subnets = list(self._subnets.values())
+        return SimpleNamespace(name=virtual_network_name, subnets=subnets)
+
+
+class FakeAzureClientCache:
+    def __init__(self, azure_client):
+        self._azure_client = azure_client
+
+    def get_client(self, resource_config, logger):
+        return self._azure_client
+
+    def invalidate(self, resource_name):
+        pass
+
+    def clear(self):
+        pass
+
+
+class FakeCloudShellAPI:
+    """CloudShell API calls used by the driver commands."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._next_ip = 10
+
+    def DecryptPassword(self, password):
+        return SimpleNamespace(Value=password)
+
+    def CheckoutFromPool(self, selectionCriteriaJson):
+        with self._lock:
+            ip = f"10.0.1.{self._next_ip}"
+            self._next_ip = self._next_ip % 250 + 1
+        return SimpleNamespace(Items=[ip])
+
+    def __getattr__(self, name):
+        return mock.MagicMock()
+
+
+class BenchmarkAzureDriver(driver.AzureDriver):
+    """AzureDriver with its own process-wide state and the fake Azure client."""
+
+    def __init__(self, azure_client):
+        self._instrumentation = Instrumentation()
+        self._azure_client_cache = FakeAzureClientCache(azure_client)
+        self._resource_config_cache = ResourceConfigCache()
+        self._azure_read_cache = AzureReadCache(ttl=self.AZURE_READ_CACHE_TTL)
+        self._image_cache = ImageMetadataCache()
+        self._catalog_cache = RegionCatalogCache()
+        self._vm_capacity_index = VMCapacityIndex(catalog_cache=self._catalog_cache)
+        self._autoload_validation_cache = AutoloadValidationCache()
+        self._azure_single_flight = SingleFlight()
+        self._arm_scheduler = ArmRequestScheduler(instrumentation=self._instrumentation)
+        # operations of the fake ARM are finished when they are accepted
+        self._lro_poller = SharedLROPoller(
+            interval=0.1, instrumentation=self._instrumentation
+        )
+        self._prepared_sandbox_cache = PreparedSandboxCache()
+        self._lock_manager = KeyedLockManager()
+        self._warm_contexts = WarmContextManager()
+        super().__init__()
+
+
+def get_sandbox_subnet_name(reservation_id):
+    return f"{reservation_id}_{SANDBOX_CIDR.replace('/', '-')}"
+
+
+def _prepare_resource_context():
+    attributes = {
+        f"{constants.SHELL_NAME}.{name}": value
+        for name, value in {
+            "Region": "westeurope",
+            "VM Size": "Standard_B1s",
+            "Azure Subscription ID": SUBSCRIPTION_ID,
+            "Azure Tenant ID": "tenant",
+            "Azure Application ID": "application",
+            "Azure Application Key": "key",
+            "Management Group Name": MGMT_RESOURCE_GROUP,
+            "Sandbox Virtual Network Name": SANDBOX_VNET,
+            "Management Virtual Network Name": "mgmt-vnet",
+            "Networks in use": "",
+            "Execution Server Selector": "",
+            "Additional Mgmt Networks": "",
+            "Custom Tags": "",
+            "Private IP Allocation Method": "Cloudshell Allocation",
+            "Availability Zones": "",
+            "Key Vault": "key-vault",
+        }.items()
+    }
+    return SimpleNamespace(
+        name="Azure",
+        fullname="Azure",
+        address="NA",
+        family="Cloud Provider",
+        model=constants.SHELL_NAME,
+        attributes=attributes,
+    )
+
+
+def _prepare_reservation(reservation_id):
+    return SimpleNamespace(
+        reservation_id=reservation_id,
+        owner_user="admin",
+        environment_name="benchmark",
+        domain="Global",
+        description="",
+    )
+
+
+def _prepare_deployed_app_data(vm_name):
+    return {
+        "name": vm_name,
+        "family": "Generic App Family",
+        "model": "Generic App Model",
+        "address": "10.0.1.4",
+        "attributes": [
+            {"name": "Generic App Model.User", "value": "admin"},
+            {"name": "Generic App Model.Password", "value": "password"},
+            {"name": "Generic App Model.Public IP", "value": ""},
+        ],
+        "vmdetails": {
+            "id": str(uuid.uuid4()),
+            "cloudProviderId": "Azure",
+            "uid": vm_name,
+            "vmCustomParams": [],
+        },
+    }
+
+
+def _prepare_app_request_data():
+    return {
+        "deploymentService": {
+            "model": constants.AZURE_VM_FROM_MARKETPLACE_DEPLOYMENT_PATH,
+            "attributes": [],
+        }
+    }
+
+
+class CommandRequests:
+    """Contexts and requests of the benchmarked commands."""
+
+    def __init__(self, apps=1):
+        """Init command.
+
+        :param int apps: number of Apps in the multi-App requests
+        """
+        self._apps = apps
+
+    def _command_context(self, reservation_id):
+        return SimpleNamespace(
+            resource=_prepare_resource_context(),
+            reservation=_prepare_reservation(reservation_id),
+        )
+
+    def _remote_command_context(self, reservation_id, vm_name):
+        return SimpleNamespace(
+            resource=_prepare_resource_context(),
+            remote_reservation=_prepare_reservation(reservation_id),
+            remote_endpoints=[
+                SimpleNamespace(
+                    fullname=vm_name,
+                    app_context=SimpleNamespace(
+                        app_request_json=json.dumps(_prepare_app_request_data()),
+                        deployed_app_json=json.dumps(
+                            _prepare_deployed_app_data(vm_name)
+                        ),
+                    ),
+                )
+            ],
+        )
+
+    def Deploy(self, reservation_id):
+        deployment_path = constants.AZURE_VM_FROM_MARKETPLACE_DEPLOYMENT_PATH
+        attributes = {
+            "Image Publisher": "Canonical",
+            "Image Offer": "UbuntuServer",
+            "Image SKU": "18.04-LTS",
+            "Image Version": "latest",
+            "VM Size": "",
+            "Disk Type": "HDD",
+            "Disk Size": "",
+            "Data Disks": "",
+            "License Type": "No License",
+            "Enable Boot Diagnostics": "False",
+            "Boot Diagnostics Storage Account": "",
+            "Resource Group Name": "",
+            "Add Public IP": "False",
+            "Wait for IP": "False",
+            "Extension Script file": "",
+            "Extension Script Configurations": "",
+            "Extension Script Timeout": "1200",
+            "Public IP Type": "Dynamic",
+            "Inbound Ports": "",
+            "Custom Tags": "",
+            "Enable IP Forwarding": "False",
+            "Allow all Sandbox Traffic": "True",
+            "Autogenerated Name": "True",
+            "Availability Zones": "",
+        }
+        request = {
+            "driverRequest": {
+                "actions": [
+                    {
+                        "type": "deployApp",
+                        "actionId": str(uuid.uuid4()),
+                        "actionParams": {
+                            "type": "deployAppParams",
+                            "appName": "benchmark-app",
+                            "deployment": {
+                                "type": "deployAppDeploymentInfo",
+                                "deploymentPath": deployment_path,
+                                "attributes": [
+                                    {
+                                        "type": "attribute",
+                                        "attributeName": f"{deployment_path}.{name}",
+                                        "attributeValue": value,
+                                    }
+                                    for name, value in attributes.items()
+                                ],
+                            },
+                            "appResource": {
+                                "type": "appResourceInfo",
+                                "attributes": [
+                                    {
+                                        "type": "attribute",
+                                        "attributeName": "User",
+                                        "attributeValue": "",
+                                    },
+                                    {
+                                        "type": "attribute",
+                                        "attributeName": "Password",
+                                        "attributeValue": "",
+                                    },
+                                ],
+                            },
+                        },
+                    },
+                    {
+                        "type": "connectSubnet",
+                        "actionId": str(uuid.uuid4()),
+                        "actionParams": {
+                            "type": "connectToSubnetParams",
+                            "cidr": SANDBOX_CIDR,
+                            "subnetId": get_sandbox_subnet_name(reservation_id),
+                            "isPublic": False,
+                            "vnicName": "",
+                            "subnetServiceAttributes": [],
+                        },
+                    },
+                ]
+            }
+        }
+        cancellation_context = SimpleNamespace(is_cancelled=False)
+        return (
+            self._command_context(reservation_id),
+            json.dumps(request),
+            cancellation_context,
+        ), {}
+
+    def GetVmDetails(self, reservation_id):
+        request = {
+            "items": [
+                {
+                    "appRequestJson": _prepare_app_request_data(),
+                    "deployedAppJson": _prepare_deployed_app_data(f"vm-{index}"),
+                }
+                for index in range(self._apps)
+            ]
+        }
+        cancellation_context = SimpleNamespace(is_cancelled=False)
+        return (
+            self._command_context(reservation_id),
+            json.dumps(request),
+            cancellation_context,
+        ), {}
+
+    def DeleteInstance(self, reservation_id):
+        return (self._remote_command_context(reservation_id, "vm-0"), []), {}
+
+    def SetAppSecurityGroups(self, reservation_id):
+        request = [
+            {
+                "deployedApp": _prepare_deployed_app_data(f"vm-{index}"),
+                "securityGroupsConfigurations": [
+                    {
+                        "subnetId": get_sandbox_subnet_name(reservation_id),
+                        "rules": [
+                            {
+                                "fromPort": str(port),
+                                "toPort": str(port),
+                                "protocol": "tcp",
+                                "source": "0.0.0.0/0",
+                            }
+                            for port in (22, 80, 443)
+                        ],
+                    }
+                ],
+            }
+            for index in range(self._apps)
+        ]
+        return (self._command_context(reservation_id), json.dumps(request)), {}
+
+    def CleanupSandboxInfra(self, reservation_id):
+        request = {
+            "driverRequest": {
+                "actions": [
+                    {
+                        "type": "cleanupNetwork",
+                        "actionId": str(uuid.uuid4()),
+                    }
+                ]
+            }
+        }
+        return (self._command_context(reservation_id), json.dumps(request)), {}
+
+    def get_inventory(self, reservation_id):
+        return (SimpleNamespace(resource=_prepare_resource_context()),), {}
+
+    def reconfigure_vm(self, reservation_id):
+        cancellation_context = SimpleNamespace(is_cancelled=False)
+        return (self._remote_command_context(reservation_id, "vm-0"), []), {
+            "cancellation_context": cancellation_context,
+            "vm_size": "",
+            "os_disk_size": "64",
+            "os_disk_type": "",
+            # max number of the data disks of the Standard_B1s
+            "data_disks": "data0:32;data1:32,Premium SSD",
+        }
+
+
+@dataclass
+class BenchmarkResult:
+    command: str
+    iterations: int
+    errors: int
+    duration: float
+    latencies: list = field(repr=False)
+    azure_calls: Counter = field(repr=False)
+    throttled: int = 0
+
+    @property
+    def commands_per_sec(self):
+        return self.iterations / self.duration if self.duration else 0
+
+    def get_percentile(self, percentile):
+        latencies = sorted(self.latencies)
+        if not latencies:
+            return 0
+        index = min(len(latencies) - 1, int(len(latencies) * percentile / 100))
+        return latencies[index]
+
+    @property
+    def azure_calls_per_command(self):
+        return sum(self.azure_calls.values()) / self.iterations
+
+    def to_dict(self):
+        return {
+            "command": self.command,
+            "iterations": self.iterations,
+            "errors": self.errors,
+            "commands_per_sec": self.commands_per_sec,
+            "p50": self.get_percentile(50),
+            "p95": self.get_percentile(95),
+            "p99": self.get_percentile(99),
+            "azure_calls_per_command": self.azure_calls_per_command,
+            "throttled": self.throttled,
+            "azure_calls": dict(self.azure_calls.most_common()),
+        }
+
+
+@contextmanager
+def _patched_cloudshell_sessions(cs_api):
+    @contextmanager
+    def logging_session(context):
+        yield logger
+
+    with mock.patch.object(
+        driver, "LoggingSessionContext", logging_session
+    ), mock.patch.object(
+        driver, "get_qs_logger", return_value=logger
+    ), mock.patch.object(
+        driver, "CloudShellSessionContext"
+    ) as session_context:
+        session_context.return_value.get_api.return_value = cs_api
+        yield
+
+
+def _warm_driver(azure_driver, timeout=10):
+    """Initialize the driver and wait for the warm context of the resource.
+
+    :param BenchmarkAzureDriver azure_driver:
+    :param float timeout:
+    :return:
+    """
+    context = SimpleNamespace(resource=_prepare_resource_context())
+    azure_driver.initialize(context)
+    resource_config = azure_driver._get_resource_config(
+        context=context, api=FakeCloudShellAPI()
+    )
+    deadline = time.monotonic() + timeout
+    while azure_driver._warm_contexts.get(resource_config) is None:
+        if time.monotonic() > deadline:
+            raise TimeoutError("Resource context wasn't warmed")
+        time.sleep(0.01)
+
+
+def run_benchmark(
+    command,
+    iterations=10,
+    concurrency=1,
+    apps=1,
+    sandboxes=None,
+    arm_config=None,
+    warm=False,
+):
+    """Run the driver command several times and measure it.
+
+    :param str command: AzureDriver command name
+    :param int iterations:
+    :param int concurrency: number of the concurrently running commands
+    :param int apps: number of Apps in the multi-App requests
+    :param int sandboxes: number of reservations the iterations are spread
+        over, None - every iteration runs in its own reservation
+    :param ArmConfig arm_config:
+    :param bool warm: initialize the driver before the commands, Azure calls
+        of the initialization aren't counted
+    :rtype: BenchmarkResult
+    """
+    arm = FakeArm(arm_config or ArmConfig())
+    azure_client = FakeAzureAPIClient(arm=arm)
+    azure_driver = BenchmarkAzureDriver(azure_client=azure_client)
+    requests = CommandRequests(apps=apps)
+    command_func = getattr(azure_driver, command)
+    reservation_ids = [str(uuid.uuid4()) for _ in range(sandboxes or iterations)]
+    for reservation_id in reservation_ids:
+        azure_client.add_sandbox_subnet(reservation_id)
+
+    def run(iteration):
+        reservation_id = reservation_ids[iteration % len(reservation_ids)]
+        args, kwargs = getattr(requests, command)(reservation_id=reservation_id)
+        started_at = time.monotonic()
+        try:
+            command_func(*args, **kwargs)
+        finally:
+            latencies.append(time.monotonic() - started_at)
+
+    latencies = []
+    with _patched_cloudshell_sessions(FakeCloudShellAPI()):
+        if warm:
+            _warm_driver(azure_driver)
+            arm.reset()
+
+        started_at = time.monotonic()
+        task_results = run_concurrently(
+            func=run, items=range(iterations), max_workers=concurrency
+        )
+        duration = time.monotonic() - started_at
+
+    azure_driver._warm_contexts.clear()
+    azure_driver._lro_poller.shutdown()
+    for task_result in task_results:
+        if not task_result.success:
+            logger.warning(f"{command} failed", exc_info=task_result.error)
+
+    return BenchmarkResult(
+        command=command,
+        iterations=iterations,
+        errors=sum(not task_result.success for task_result in task_results),
+        duration=duration,
+        latencies=latencies,
+        azure_calls=Counter(arm.calls),
+        throttled=arm.throttled,
+    )
+
+
+def measure_startup():
+    """Measure loading of the driver in a new Python process.
+
+    :return: seconds of the startup steps and the lazily imported modules that
+        were loaded with the driver
+    :rtype: dict
+    """
+    env = dict(os.environ, PYTHONPATH=SRC_DIR)
+    output = subprocess.check_output(
+        [sys.executable, "-c", STARTUP_SCRIPT], env=env, text=True
+    )
+    return json.loads(output)
+
+
+def main(args=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--commands", nargs="+", default=COMMANDS, choices=COMMANDS)
+    parser.add_argument("--iterations", type=int, default=20)
+    parser.add_argument("--concurrency", type=int, default=5)
+    parser.add_argument("--apps", type=int, default=5)
+    parser.add_argument(
+        "--sandboxes",
+        type=int,
+        help="number of reservations the iterations are spread over, "
+        "by default every iteration runs in its own reservation",
+    )
+    parser.add_argument("--latency", type=float, default=0.05)
+    parser.add_argument("--lro-duration", type=float, default=0.5)
+    parser.add_argument("--throttle-rate", type=float, default=0.0)
+    parser.add_argument("--retry-after", type=float, default=0.1)
+    parser.add_argument("--seed", type=int)
+    parser.add_argument("--json", action="store_true", help="print JSON results")
+    parser.add_argument(
+        "--warm", action="store_true", help="initialize the driver before commands"
+    )
+    parser.add_argument(
+        "--startup", action="store_true", help="measure only loading of the driver"
+    )
+    args = parser.parse_args(args)
+
+    if args.startup:
+        sys.stdout.write(json.dumps(measure_startup(), indent=2) + "\n")
+        return
+
+    arm_config = ArmConfig(
+        latency=args.latency,
+        lro_duration=args.lro_duration,
+        throttle_rate=args.throttle_rate,
+        retry_after=args.retry_after,
+        seed=args.seed,
+    )
+    results = [
+        run_benchmark(
+            command=command,
+            iterations=args.iterations,
+            concurrency=args.concurrency,
+            apps=args.apps,
+            sandboxes=args.sandboxes,
+            arm_config=arm_config,
+            warm=args.warm,
+        )
+        for command in args.commands
+    ]
+
+    if args.json:
+        sys.stdout.write(
+            json.dumps([result.to_dict() for result in results], indent=2) + "\n"
+        )
+        return
+
+    sys.stdout.write(
+        f"{'command':<22}{'errors':>7}{'cmd/s':>9}{'p50':>9}{'p95':>9}{'p99':>9}"
+        f"{'calls/cmd':>11}{'429':>6}\n"
+    )
+    for result in results:
+        sys.stdout.write(
+            f"{result.command:<22}{result.errors:>7}"
+            f"{result.commands_per_sec:>9.2f}"
+            f"{result.get_percentile(50):>9.3f}"
+            f"{result.get_percentile(95):>9.3f}"
+            f"{result.get_percentile(99):>9.3f}"
+            f"{result.azure_calls_per_command:>11.1f}{result.throttled:>6}\n"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,225 @@
+import copy
+import json
+import logging
+import unittest
+from types import SimpleNamespace
+from unittest import mock
+
+from azure.core.exceptions import HttpResponseError
+from azure.mgmt.network.models import SecurityRule
+
+from app_security_groups import BatchedAppSecurityGroupsFlow, merge_custom_rules
+from lock_manager import KeyedLockManager
+from read_cache import AzureReadCache, CachingAzureClient
+from sdk_operations import SdkAzureClient
+from throttling import ThrottledAzureClient
+
+logger = logging.getLogger(__name__)
+
+
+def create_rule(name, priority=None, port="22", protocol="Tcp", ip="10.0.1.4"):
+    return SecurityRule(
+        name=name,
+        access="Allow",
+        direction="Inbound",
+        source_address_prefix="Internet",
+        source_port_range="*",
+        destination_address_prefix=ip,
+        destination_port_range=port,
+        priority=priority,
+        protocol=protocol,
+    )
+
+
+class TestMergeCustomRules(unittest.TestCase):
+    def setUp(self):
+        self.deny_rule = create_rule("Deny_all", priority=4000, port="*")
+
+    def test_unchanged_rules(self):
+        existing_rule = create_rule("Rule_vm_22", priority=1000)
+
+        rules, changed = merge_custom_rules(
+            existing_rules=[self.deny_rule, existing_rule],
+            desired_rules=[create_rule("Rule_vm_22", protocol="tcp")],
+        )
+
+        self.assertFalse(changed)
+        self.assertEqual(rules, [self.deny_rule, existing_rule])
+
+    def test_new_and_removed_rules(self):
+        existing_rules = [
+            self.deny_rule,
+            create_rule("Rule_vm_22", priority=1000),
+            create_rule("Rule_vm_80", priority=1005, port="80"),
+        ]
+        rdp_rule = create_rule("Rule_vm_3389", port="3389")
+        https_rule = create_rule("Rule_vm_443", port="443")
+
+        rules, changed = merge_custom_rules(
+            existing_rules=existing_rules,
+            desired_rules=[existing_rules[1], rdp_rule, https_rule],
+        )
+
+        self.assertTrue(changed)
+        self.assertEqual(
+            [(rule.name, rule.priority) for rule in rules],
+            [
+                ("Deny_all", 4000),
+                ("Rule_vm_22", 1000),
+                ("Rule_vm_3389", 1005),
+                ("Rule_vm_443", 1010),
+            ],
+        )
+
+
+class TestBatchedAppSecurityGroupsFlow(unittest.TestCase):
+    def setUp(self):
+        self.network_client = mock.MagicMock()
+        self.nsgs = {
+            "NSG_vm1": SimpleNamespace(security_rules=[], etag="etag-1"),
+            "NSG_vm2": SimpleNamespace(
+                etag="etag-2",
+                security_rules=[
+                    create_rule(
+                        "Rule_vm2_10.0.1.5_22_tcp",
+                        priority=1000,
+                        protocol="tcp",
+                        ip="10.0.1.5",
+                    )
+                ],
+            ),
+        }
+        self.azure_client = SdkAzureClient(
+            SimpleNamespace(
+                _network_client=self.network_client,
+                get_network_security_group=mock.Mock(
+                    side_effect=lambda network_security_group_name, **kwargs: (
+                        copy.deepcopy(self.nsgs[network_security_group_name])
+                    )
+                ),
+            )
+        )
+        reservation_info = mock.MagicMock()
+        reservation_info.get_resource_group_name.return_value = "rid"
+        self.flow = BatchedAppSecurityGroupsFlow(
+            resource_config=mock.MagicMock(),
+            reservation_info=reservation_info,
+            azure_client=self.azure_client,
+            lock_manager=KeyedLockManager(),
+            max_workers=2,
+            logger=logger,
+        )
+        self.flow._get_private_ip_by_subnet_map = lambda vm_name, **kwargs: {
+            "rid_10.0.1.0-24": {"vm1": "10.0.1.4", "vm2": "10.0.1.5"}[vm_name]
+        }
+
+    def create_security_group(self, vm_name, ports):
+        return SimpleNamespace(
+            deployed_app=SimpleNamespace(name=vm_name),
+            security_group_configs=[
+                SimpleNamespace(
+                    subnet_id="10.0.1.0/24",
+                    rules=[
+                        SimpleNamespace(
+                            source=None, from_port=port, to_port=port, protocol="tcp"
+                        )
+                        for port in ports
+                    ],
+                )
+            ],
+        )
+
+    def test_one_update_per_changed_nsg(self):
+        request_actions = SimpleNamespace(
+            security_groups=[
+                self.create_security_group("vm1", ports=["22", "80", "443"]),
+                self.create_security_group("vm2", ports=["22"]),
+            ]
+        )
+
+        results = json.loads(self.flow.set_app_security_groups(request_actions))
+
+        self.assertEqual(
+            [
+                (result["py/state"]["appName"], result["py/state"]["success"])
+                for result in results
+            ],
+            [("vm1", True), ("vm2", True)],
+        )
+        update = self.network_client.network_security_groups.begin_create_or_update
+        update.assert_called_once()
+        self.assertEqual(
+            update.call_args.kwargs["network_security_group_name"], "NSG_vm1"
+        )
+        self.assertEqual(update.call_args.kwargs["headers"], {"If-Match": "etag-1"})
+        self.assertEqual(
+            [
+                (rule.name, rule.priority)
+                for rule in update.call_args.kwargs["parameters"].security_rules
+            ],
+            [
+                ("Rule_vm1_10.0.1.4_22_tcp", 1000),
+                ("Rule_vm1_10.0.1.4_80_tcp", 1005),
+                ("Rule_vm1_10.0.1.4_443_tcp", 1010),
+            ],
+        )
+
+    def test_failed_nsg_update(self):
+        update = self.network_client.network_security_groups.begin_create_or_update
+        update.side_effect = ValueError("error")
+        request_actions = SimpleNamespace(
+            security_groups=[self.create_security_group("vm1", ports=["22"])]
+        )
+
+        results = json.loads(self.flow.set_app_security_groups(request_actions))
+
+        self.assertFalse(results[0]["py/state"]["success"])
+
+    def test_nsg_changed_after_read_is_merged_again(self):
+        update = self.network_client.network_security_groups.begin_create_or_update
+        update.side_effect = [
+            HttpResponseError(response=mock.Mock(status_code=412)),
+            mock.MagicMock(),
+        ]
+        request_actions = SimpleNamespace(
+            security_groups=[self.create_security_group("vm1", ports=["22"])]
+        )
+
+        results = json.loads(self.flow.set_app_security_groups(request_actions))
+
+        self.assertTrue(results[0]["py/state"]["success"])
+        self.assertEqual(update.call_count, 2)
+        self.assertEqual(self.azure_client.get_network_security_group.call_count, 2)
+
+    def test_nsg_update_is_scheduled_and_evicts_cached_nsg_read(self):
+        scheduler = mock.MagicMock()
+        scheduler.execute.side_effect = lambda func, **kwargs: func()
+        self.flow._azure_client = CachingAzureClient(
+            azure_client=ThrottledAzureClient(
+                azure_client=self.azure_client,
+                scheduler=scheduler,
+                subscription_id="subscription",
+                priority=0,
+            ),
+            read_cache=AzureReadCache(ttl=60),
+            reservation_id="rid",
+        )
+        request_actions = SimpleNamespace(
+            security_groups=[self.create_security_group("vm1", ports=["22"])]
+        )
+
+        self.flow.set_app_security_groups(request_actions)
+        self.flow._azure_client.get_network_security_group(
+            network_security_group_name="NSG_vm1", resource_group_name="rid"
+        )
+
+        self.assertEqual(self.azure_client.get_network_security_group.call_count, 2)
+        self.assertIn(
+            mock.call(
+                func=mock.ANY,
+                subscription_id="subscription",
+                kind="writes",
+                priority=0,
+            ),
+            scheduler.execute.call_args_list,
+        )
@@ -0,0 +1,80 @@
+import unittest
+from types import SimpleNamespace
+from unittest import mock
+
+from autoload import ParallelAutoloadFlow
+from validation_cache import AutoloadValidationCache
+
+
+class TestParallelAutoloadFlow(unittest.TestCase):
+    def setUp(self):
+        self.azure_client = mock.MagicMock()
+        self.azure_client.get_available_regions.return_value = [
+            SimpleNamespace(name="westeurope")
+        ]
+        self.azure_client.get_virtual_machine_sizes_by_region.return_value = [
+            SimpleNamespace(name="Standard_B1s")
+        ]
+        self.resource_config = SimpleNamespace(
+            region="westeurope",
+            vm_size="Standard_B1s",
+            azure_subscription_id="subscription",
+            azure_tenant_id="tenant",
+            azure_application_id="application",
+            azure_application_key="key",
+            management_group_name="mgmt-rg",
+            sandbox_vnet_name="sandbox-vnet",
+            management_vnet_name="mgmt-vnet",
+            additional_mgmt_networks=["10.0.0.0/24"],
+            custom_tags={},
+            key_vault="key-vault",
+        )
+        self.validation_cache = AutoloadValidationCache()
+
+    def _discover(self):
+        return ParallelAutoloadFlow(
+            resource_config=self.resource_config,
+            azure_client=self.azure_client,
+            validation_cache=self.validation_cache,
+            max_workers=4,
+            logger=mock.MagicMock(),
+        ).discover()
+
+    def test_unchanged_resources_are_not_validated_again(self):
+        self._discover()
+        self._discover()
+
+        self.assertEqual(self.azure_client._credentials.get_token.call_count, 2)
+        self.assertEqual(self.azure_client.get_available_regions.call_count, 2)
+        self.assertEqual(self.azure_client.register_provider.call_count, 4)
+        self.azure_client.get_resource_group.assert_called_once_with("mgmt-rg")
+        self.assertEqual(self.azure_client.get_virtual_network.call_count, 2)
+        self.azure_client.get_key_vault_secret.assert_called_once()
+
+    def test_changed_resources_are_validated(self):
+        self._discover()
+        self.resource_config.management_group_name = "new-mgmt-rg"
+        self._discover()
+
+        self.assertEqual(self.azure_client.get_resource_group.call_count, 2)
+        self.assertEqual(self.azure_client.register_provider.call_count, 4)
+
+    def test_failed_autoload_validates_all_resources_again(self):
+        self.azure_client.get_resource_group.side_effect = [
+            ValueError("Resource group not found"),
+            mock.DEFAULT,
+        ]
+
+        with self.assertRaisesRegex(ValueError, "Resource group not found"):
+            self._discover()
+        self._discover()
+
+        self.assertEqual(self.azure_client.get_resource_group.call_count, 2)
+        self.assertEqual(self.azure_client.register_provider.call_count, 8)
+
+    def test_first_failed_validation_is_raised(self):
+        self.resource_config.region = "unknown"
+        self.resource_config.vm_size = "unknown"
+
+        with self.assertRaisesRegex(Exception, "Region"):
+            self._discover()
@@ -1,6 +1,9 @@
 import unittest
+from types import SimpleNamespace
+from unittest import mock
 
-from driver import AzureDriver  # noqa F401
+from driver import AzureDriver
+from warm_context import WarmContextManager
 
 
 class TestAzureDriver(unittest.TestCase):
@@ -13,6 +16,28 @@ class TestAzureDriver(unittest.TestCase):
     def test_000_something(self):
         pass
 
+    @mock.patch.object(AzureDriver, "_resource_config_cache")
+    @mock.patch.object(AzureDriver, "_azure_client_cache")
+    @mock.patch.object(AzureDriver, "_warm_contexts", new_callable=WarmContextManager)
+    def test_cleanup_of_last_driver_instance_evicts_resource_state(
+        self, warm_contexts, azure_client_cache, resource_config_cache
+    ):
+        context = SimpleNamespace(resource=SimpleNamespace(name="Azure"))
+        drivers = [AzureDriver(), AzureDriver()]
+        with mock.patch.object(AzureDriver, "_warm_resource_context"):
+            for driver in drivers:
+                driver.initialize(context)
+
+        resource_config_cache.reset_mock()
+
+        drivers[0].cleanup()
+        azure_client_cache.invalidate.assert_not_called()
+        resource_config_cache.invalidate.assert_not_called()
+
+        drivers[1].cleanup()
+        azure_client_cache.invalidate.assert_called_once_with(resource_name="Azure")
+        resource_config_cache.invalidate.assert_called_once_with(resource_name="Azure")
+
 
 if __name__ == "__main__":
     import sys
@@ -0,0 +1,44 @@
+import threading
+import unittest
+from unittest import mock
+
+from azure_client_cache import CommandLogger
+from concurrency import run_concurrently
+
+
+class TestCommandLogger(unittest.TestCase):
+    def setUp(self):
+        self.client_logger = CommandLogger()
+
+    def _run_command(self, command_logger, func):
+        def command():
+            self.client_logger.bind(command_logger)
+            func()
+
+        thread = threading.Thread(target=command)
+        thread.start()
+        thread.join()
+
+    def test_thread_pool_of_command_logs_to_command_logger(self):
+        command_logger = mock.MagicMock()
+
+        self._run_command(
+            command_logger,
+            lambda: run_concurrently(
+                func=lambda index: self.client_logger.info(f"call {index}"),
+                items=range(3),
+                max_workers=3,
+            ),
+        )
+
+        self.assertEqual(command_logger.info.call_count, 3)
+
+    def test_thread_without_command_doesnt_log_to_other_command(self):
+        command_logger = mock.MagicMock()
+        self._run_command(command_logger, lambda: self.client_logger.info("call"))
+
+        thread = threading.Thread(target=self.client_logger.info, args=("other",))
+        thread.start()
+        thread.join()
+
+        command_logger.info.assert_called_once_with("call")
@@ -0,0 +1,37 @@
+import unittest
+
+from tests.benchmark import COMMANDS, ArmConfig, measure_startup, run_benchmark
+
+
+class TestBenchmark(unittest.TestCase):
+    def test_commands(self):
+        for command in COMMANDS:
+            with self.subTest(command=command):
+                result = run_benchmark(
+                    command=command, iterations=2, concurrency=2, apps=2
+                )
+
+                self.assertEqual(result.errors, 0)
+                self.assertEqual(len(result.latencies), 2)
+                self.assertGreater(result.azure_calls_per_command, 0)
+
+    def test_throttled_calls_are_retried(self):
+        result = run_benchmark(
+            command="GetVmDetails",
+            iterations=3,
+            apps=2,
+            arm_config=ArmConfig(throttle_rate=0.3, seed=1),
+        )
+
+        self.assertEqual(result.errors, 0)
+        self.assertGreater(result.throttled, 0)
+        self.assertGreater(sum(result.azure_calls.values()), result.throttled)
+
+    def test_driver_startup_does_not_load_azure_sdk(self):
+        self.assertEqual(measure_startup()["lazy_modules_loaded"], [])
+
+    def test_warm_driver_doesnt_read_management_resources(self):
+        result = run_benchmark(command="Deploy", iterations=2, warm=True)
+
+        self.assertEqual(result.errors, 0)
+        self.assertNotIn("get_virtual_networks_by_resource_group", result.azure_calls)
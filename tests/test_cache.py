@@ -0,0 +1,46 @@
+import unittest
+
+from cache import TTLCache
+
+
+class FakeTimer:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class TestTTLCache(unittest.TestCase):
+    def setUp(self):
+        self.timer = FakeTimer()
+        self.cache = TTLCache(max_size=2, ttl=10, timer=self.timer)
+
+    def test_get_returns_value_until_expired(self):
+        self.cache.set("key", "value")
+        self.timer.now = 9
+        self.assertEqual(self.cache.get("key"), "value")
+        self.timer.now = 10
+        self.assertIsNone(self.cache.get("key"))
+        self.assertEqual(len(self.cache), 0)
+
+    def test_per_entry_ttl(self):
+        self.cache.set("key", "value", ttl=100)
+        self.timer.now = 50
+        self.assertIn("key", self.cache)
+
+    def test_least_recently_used_entry_is_evicted(self):
+        self.cache.set("first", 1)
+        self.cache.set("second", 2)
+        self.cache.get("first")
+        self.cache.set("third", 3)
+        self.assertIn("first", self.cache)
+        self.assertNotIn("second", self.cache)
+        self.assertIn("third", self.cache)
+
+    def test_pop_if(self):
+        self.cache.set(("res1", "a"), 1)
+        self.cache.set(("res2", "b"), 2)
+        removed = self.cache.pop_if(lambda key: key[0] == "res1")
+        self.assertEqual(removed, [1])
+        self.assertEqual(len(self.cache), 1)
@@ -0,0 +1,48 @@
+import unittest
+from types import SimpleNamespace
+from unittest import mock
+
+from catalog_cache import CatalogCachingAzureClient, RegionCatalogCache
+
+
+class TestCatalogCachingAzureClient(unittest.TestCase):
+    def setUp(self):
+        self.azure_client = mock.MagicMock()
+        self.azure_client.get_virtual_machine_sizes_by_region.side_effect = (
+            lambda region: iter([SimpleNamespace(name="Standard_B1s")])
+        )
+        self.catalog_cache = RegionCatalogCache(ttl=60)
+
+    def _create_client(self, subscription_id="subscription-1"):
+        return CatalogCachingAzureClient(
+            azure_client=self.azure_client,
+            catalog_cache=self.catalog_cache,
+            subscription_id=subscription_id,
+        )
+
+    def test_catalogs_are_shared_between_clients(self):
+        sizes = self._create_client().get_virtual_machine_sizes_by_region("westeurope")
+
+        self.assertEqual([size.name for size in sizes], ["Standard_B1s"])
+        self._create_client().get_virtual_machine_sizes_by_region(region="WestEurope")
+        self._create_client().get_virtual_machine_sizes_by_region("eastus")
+        self._create_client("subscription-2").get_virtual_machine_sizes_by_region(
+            "westeurope"
+        )
+        self.assertEqual(
+            self.azure_client.get_virtual_machine_sizes_by_region.call_count, 3
+        )
+
+    def test_failed_calls_are_not_cached(self):
+        self.azure_client.get_available_regions.side_effect = [
+            ValueError("error"),
+            [SimpleNamespace(name="westeurope")],
+        ]
+        client = self._create_client()
+
+        with self.assertRaises(ValueError):
+            client.get_available_regions()
+
+        self.assertEqual(len(client.get_available_regions()), 1)
+        self.assertEqual(len(client.get_available_regions()), 1)
+        self.assertEqual(self.azure_client.get_available_regions.call_count, 2)
@@ -0,0 +1,62 @@
+import threading
+import unittest
+
+from concurrency import run_concurrently
+
+
+class TestRunConcurrently(unittest.TestCase):
+    def test_results_keep_items_order(self):
+        results = run_concurrently(func=lambda x: x * 2, items=[1, 2, 3], max_workers=2)
+        self.assertEqual([r.result for r in results], [2, 4, 6])
+        self.assertTrue(all(r.success for r in results))
+
+    def test_errors_are_returned_per_item(self):
+        def func(item):
+            if item == 2:
+                raise ValueError("boom")
+            return item
+
+        results = run_concurrently(func=func, items=[1, 2, 3], max_workers=3)
+        self.assertEqual([r.success for r in results], [True, False, True])
+        self.assertIsInstance(results[1].error, ValueError)
+
+    def test_items_are_processed_in_parallel(self):
+        barrier = threading.Barrier(3, timeout=5)
+        results = run_concurrently(
+            func=lambda item: barrier.wait(), items=range(3), max_workers=3
+        )
+        self.assertTrue(all(r.success for r in results))
+
+    def test_empty_items(self):
+        self.assertEqual(run_concurrently(func=str, items=[], max_workers=2), [])
+
+    def test_task_timeout(self):
+        release = threading.Event()
+
+        def func(item):
+            if item == "slow":
+                release.wait(5)
+            return item
+
+        results = run_concurrently(
+            func=func,
+            items=["fast", "slow"],
+            max_workers=2,
+            timeout=0.1,
+            poll_interval=0.05,
+        )
+        release.set()
+        self.assertTrue(results[0].success)
+        self.assertIsInstance(results[1].error, TimeoutError)
+
+    def test_not_started_tasks_are_cancelled(self):
+        release = threading.Event()
+        results = run_concurrently(
+            func=lambda item: release.wait(5),
+            items=range(3),
+            max_workers=1,
+            is_cancelled=lambda: True,
+            poll_interval=0.05,
+        )
+        release.set()
+        self.assertFalse(any(r.success for r in results))
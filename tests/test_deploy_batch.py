@@ -0,0 +1,107 @@
+import json
+import unittest
+import uuid
+from types import SimpleNamespace
+
+from deploy_batch import (
+    merge_driver_responses,
+    prepare_failed_deploy_response,
+    split_deploy_requests,
+)
+
+from tests.benchmark import (
+    ArmConfig,
+    BenchmarkAzureDriver,
+    CommandRequests,
+    FakeArm,
+    FakeAzureAPIClient,
+    FakeCloudShellAPI,
+    _patched_cloudshell_sessions,
+)
+
+
+def get_action_results(response):
+    return json.loads(response)["driverResponse"]["actionResults"]
+
+
+class TestDeployBatch(unittest.TestCase):
+    def test_split_deploy_requests(self):
+        deploy_requests = [
+            {"driverRequest": {"actions": [{"actionId": str(i)}]}} for i in range(2)
+        ]
+
+        self.assertEqual(
+            [
+                json.loads(request)
+                for request in split_deploy_requests(json.dumps(deploy_requests))
+            ],
+            deploy_requests,
+        )
+
+    def test_failed_deploy_response_fails_all_actions(self):
+        request_actions = SimpleNamespace(
+            deploy_app=SimpleNamespace(actionId="deploy"),
+            connect_subnets=[SimpleNamespace(actionId="subnet")],
+        )
+
+        action_results = get_action_results(
+            prepare_failed_deploy_response(request_actions, ValueError("no quota"))
+        )
+
+        self.assertEqual(
+            [
+                (result["actionId"], result["success"], result["errorMessage"])
+                for result in action_results
+            ],
+            [
+                ("deploy", False, "Failed to deploy App: no quota"),
+                ("subnet", False, "Failed to deploy App: no quota"),
+            ],
+        )
+
+    def test_merge_driver_responses(self):
+        responses = [
+            json.dumps({"driverResponse": {"actionResults": [{"actionId": str(i)}]}})
+            for i in range(2)
+        ]
+
+        self.assertEqual(
+            get_action_results(merge_driver_responses(responses)),
+            [{"actionId": "0"}, {"actionId": "1"}],
+        )
+
+
+class TestDeployApps(unittest.TestCase):
+    def setUp(self):
+        self.azure_client = FakeAzureAPIClient(arm=FakeArm(ArmConfig()))
+        self.driver = BenchmarkAzureDriver(azure_client=self.azure_client)
+        self.addCleanup(self.driver._lro_poller.shutdown)
+        self.reservation_id = str(uuid.uuid4())
+        self.azure_client.add_sandbox_subnet(self.reservation_id)
+        requests = CommandRequests()
+        deploy_requests = []
+        for _ in range(2):
+            (context, request, _), _ = requests.Deploy(self.reservation_id)
+            deploy_requests.append(json.loads(request))
+        self.context = context
+        self.request = json.dumps(deploy_requests)
+
+    def _deploy_apps(self, cancellation_context):
+        with _patched_cloudshell_sessions(FakeCloudShellAPI()):
+            return get_action_results(
+                self.driver.DeployApps(self.context, self.request, cancellation_context)
+            )
+
+    def test_apps_are_deployed_without_cancellation_context(self):
+        action_results = self._deploy_apps(cancellation_context=None)
+
+        self.assertEqual(len(action_results), 4)
+        self.assertTrue(all(result["success"] for result in action_results))
+
+    def test_cancelled_apps_fail_with_results(self):
+        action_results = self._deploy_apps(
+            cancellation_context=SimpleNamespace(is_cancelled=True)
+        )
+
+        self.assertEqual(len(action_results), 4)
+        self.assertFalse(any(result["success"] for result in action_results))
@@ -0,0 +1,88 @@
+import threading
+import unittest
+from unittest import mock
+
+from concurrency import run_concurrently
+from image_cache import ImageCachingAzureClient, ImageMetadataCache
+
+
+class TestImageCachingAzureClient(unittest.TestCase):
+    def setUp(self):
+        self.azure_client = mock.MagicMock()
+        self.image_cache = ImageMetadataCache(ttl=60)
+        self.client = self._create_client("subscription-1")
+
+    def _create_client(self, subscription_id):
+        return ImageCachingAzureClient(
+            azure_client=self.azure_client,
+            image_cache=self.image_cache,
+            subscription_id=subscription_id,
+        )
+
+    def _get_image(self, client, region="westeurope", sku="18.04-LTS"):
+        return client.get_latest_virtual_machine_image(
+            region=region, publisher_name="Canonical", offer="UbuntuServer", sku=sku
+        )
+
+    def test_images_are_shared_between_clients(self):
+        image = self._get_image(self.client)
+
+        self.assertIs(self._get_image(self._create_client("subscription-1")), image)
+        self._get_image(self.client, region="WestEurope")
+        self._get_image(self.client, region="eastus")
+        self._get_image(self.client, sku="20.04-LTS")
+        self._get_image(self._create_client("subscription-2"))
+        self.assertEqual(
+            self.azure_client.get_latest_virtual_machine_image.call_count, 4
+        )
+
+    def test_concurrent_lookups_are_coalesced(self):
+        started = threading.Event()
+        release = threading.Event()
+
+        def get_image(**kwargs):
+            started.set()
+            release.wait(5)
+            return mock.sentinel.image
+
+        self.azure_client.get_custom_virtual_machine_image.side_effect = get_image
+        thread = threading.Thread(
+            target=self.client.get_custom_virtual_machine_image,
+            kwargs={"image_name": "image", "resource_group_name": "rg"},
+        )
+        thread.start()
+        started.wait(5)
+        threading.Timer(0.1, release.set).start()
+
+        results = run_concurrently(
+            func=lambda _: self.client.get_custom_virtual_machine_image(
+                image_name="image", resource_group_name="rg"
+            ),
+            items=range(4),
+            max_workers=4,
+        )
+        thread.join(5)
+
+        self.assertEqual(
+            [result.result for result in results], [mock.sentinel.image] * 4
+        )
+        self.azure_client.get_custom_virtual_machine_image.assert_called_once()
+
+    def test_failed_lookups_are_not_cached(self):
+        self.azure_client.get_gallery_machine_image.side_effect = [
+            ValueError("error"),
+            mock.sentinel.image,
+        ]
+
+        with self.assertRaises(ValueError):
+            self.client.get_gallery_machine_image("rg", "gallery", "image")
+
+        self.assertIs(
+            self.client.get_gallery_machine_image("rg", "gallery", "image"),
+            mock.sentinel.image,
+        )
+
+    def test_other_calls_are_not_cached(self):
+        self.client.get_vm(vm_name="vm", resource_group_name="rg")
+        self.client.get_vm(vm_name="vm", resource_group_name="rg")
+        self.assertEqual(self.azure_client.get_vm.call_count, 2)
@@ -0,0 +1,112 @@
+import json
+import os
+import tempfile
+import unittest
+from types import SimpleNamespace
+from unittest import mock
+
+from concurrency import run_concurrently
+from instrumentation import (
+    Instrumentation,
+    InstrumentedAzureClient,
+    get_reservation_id,
+)
+from throttling import ArmRequestScheduler
+
+from tests.test_throttling import ThrottlingError
+
+
+class TestInstrumentation(unittest.TestCase):
+    def setUp(self):
+        self.instrumentation = Instrumentation()
+        self.azure_client = mock.MagicMock()
+        self.azure_client.delete_vm.side_effect = ValueError("error")
+        self.client = InstrumentedAzureClient(
+            azure_client=self.azure_client, instrumentation=self.instrumentation
+        )
+        self.logger = mock.MagicMock()
+
+    def test_command_collects_azure_calls_from_threads(self):
+        with self.instrumentation.command(
+            command="Deploy", reservation_id="rid", logger=self.logger
+        ) as run:
+            run_concurrently(
+                func=lambda vm_name: self.client.get_vm(vm_name, "rid"),
+                items=["vm1", "vm2", "vm3"],
+                max_workers=3,
+            )
+            with self.assertRaises(ValueError):
+                self.client.delete_vm("vm1", "rid")
+
+        self.assertEqual(run.azure_calls, 4)
+        self.assertEqual(self.logger.debug.call_count, 4)
+        record = json.loads(
+            self.logger.info.call_args.args[0].split("Command timings: ")[1]
+        )
+        self.assertEqual(record["command"], "Deploy")
+        self.assertEqual(record["reservation_id"], "rid")
+        self.assertEqual(record["status"], "success")
+        self.assertIsNone(self.instrumentation.get_current_command())
+
+    def test_failed_command(self):
+        with self.assertRaises(ValueError):
+            with self.instrumentation.command(command="Deploy", reservation_id="rid"):
+                raise ValueError("error")
+
+        self.assertIn(
+            'command_duration_seconds_count{command="Deploy",status="error"} 1',
+            self.instrumentation.get_openmetrics(),
+        )
+
+    def test_label_values_are_escaped(self):
+        self.instrumentation.increment("errors_total", error='a\\b "c"\nd')
+
+        self.assertIn(
+            'errors_total{error="a\\\\b \\"c\\"\\nd"} 1',
+            self.instrumentation.get_openmetrics(),
+        )
+
+    def test_throttling_retries(self):
+        scheduler = ArmRequestScheduler(
+            instrumentation=self.instrumentation, sleep=lambda seconds: None
+        )
+        func = mock.MagicMock(side_effect=[ThrottlingError({"Retry-After": "0"}), 1])
+
+        with self.instrumentation.command("Deploy", reservation_id="rid") as run:
+            scheduler.execute(func, subscription_id="sub", kind="writes")
+
+        self.assertEqual(run.throttling_retries, 1)
+        self.assertIn(
+            'arm_throttling_retries_total{kind="writes"} 1',
+            self.instrumentation.get_openmetrics(),
+        )
+
+    def test_write_textfile(self):
+        self.client.get_vm("vm1", "rid")
+
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            path = os.path.join(tmp_dir, "azure_shell.prom")
+            self.instrumentation.write_textfile(path)
+            with open(path) as f:
+                metrics = f.read()
+
+            self.assertEqual(os.listdir(tmp_dir), ["azure_shell.prom"])
+
+        self.assertIn("# TYPE azure_call_duration_seconds histogram", metrics)
+        self.assertIn(
+            'azure_call_duration_seconds_bucket{command="",method="get_vm",'
+            'status="success",le="+Inf"} 1',
+            metrics,
+        )
+        self.assertTrue(metrics.endswith("# EOF\n"))
+
+    def test_get_reservation_id(self):
+        self.assertEqual(
+            get_reservation_id(
+                SimpleNamespace(
+                    remote_reservation=SimpleNamespace(reservation_id="rid")
+                )
+            ),
+            "rid",
+        )
+        self.assertIsNone(get_reservation_id(SimpleNamespace()))
@@ -0,0 +1,67 @@
+import threading
+import unittest
+
+from lock_manager import KeyedLockManager, LockTimeoutError
+
+
+class TestKeyedLockManager(unittest.TestCase):
+    def setUp(self):
+        self.lock_manager = KeyedLockManager(timeout=5)
+
+    def test_exclusive_lock(self):
+        with self.lock_manager.get_lock("nsg"):
+            with self.assertRaises(LockTimeoutError):
+                self.lock_manager.get_lock("nsg", timeout=0.01).acquire()
+
+            with self.lock_manager.get_lock("another-nsg", timeout=0.01):
+                pass
+
+        with self.lock_manager.get_lock("nsg", timeout=0.01):
+            pass
+
+    def test_concurrent_writers(self):
+        counter = []
+
+        def increment():
+            for _ in range(100):
+                with self.lock_manager.get_lock("nsg"):
+                    value = len(counter)
+                    counter.append(value)
+
+        threads = [threading.Thread(target=increment) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(counter, list(range(400)))
+
+    def test_remove_lock_in_use(self):
+        lock = self.lock_manager.get_lock("nsg")
+        lock.acquire()
+        self.lock_manager.remove_lock("nsg")
+        self.assertIn("nsg", self.lock_manager._keys)
+
+        lock.release()
+        self.assertEqual(self.lock_manager._keys, {})
+
+    def test_acquire_cancels_lock_removal(self):
+        lock = self.lock_manager.get_lock("nsg")
+        lock.acquire()
+        self.lock_manager.remove_lock("nsg")
+
+        with self.assertRaises(LockTimeoutError):
+            self.lock_manager.get_lock("nsg", timeout=0.01).acquire()
+
+        lock.release()
+        self.assertIn("nsg", self.lock_manager._keys)
+
+    def test_metrics(self):
+        with self.lock_manager.get_lock("nsg"):
+            with self.assertRaises(LockTimeoutError):
+                self.lock_manager.get_lock("nsg", timeout=0.01).acquire()
+
+        metrics = self.lock_manager.get_metrics()["nsg"]
+        self.assertEqual(metrics["wait"]["count"], 2)
+        self.assertEqual(metrics["hold"]["count"], 1)
+        self.assertEqual(metrics["timeouts"], 1)
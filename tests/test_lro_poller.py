@@ -0,0 +1,59 @@
+import threading
+import unittest
+
+from lro_poller import PollResult, SharedLROPoller
+
+
+class TestSharedLROPoller(unittest.TestCase):
+    def setUp(self):
+        self.poller = SharedLROPoller(interval=0.01)
+
+    def tearDown(self):
+        self.poller.shutdown()
+
+    def test_operation_is_polled_until_done(self):
+        polls = []
+
+        def poll():
+            polls.append(1)
+            return PollResult(done=len(polls) == 3, result="done")
+
+        future = self.poller.submit(key="op", poll=poll, initial_delay=0)
+        self.assertEqual(future.result(timeout=5), "done")
+        self.assertEqual(len(polls), 3)
+        self.assertFalse(self.poller.is_pending("op"))
+
+    def test_same_operation_is_polled_once(self):
+        release = threading.Event()
+        polls = []
+
+        def poll():
+            polls.append(1)
+            return PollResult(done=release.is_set())
+
+        first = self.poller.submit(key="op", poll=poll, initial_delay=0.1)
+        second = self.poller.submit(key="op", poll=poll, initial_delay=0.1)
+        release.set()
+        first.result(timeout=5)
+        self.assertIs(first, second)
+        self.assertEqual(len(polls), 1)
+
+    def test_poll_error_fails_operation(self):
+        def poll():
+            raise ValueError("failed")
+
+        future = self.poller.submit(key="op", poll=poll, initial_delay=0)
+        with self.assertRaises(ValueError):
+            future.result(timeout=5)
+
+    def test_retry_after_delays_next_poll(self):
+        polls = []
+
+        def poll():
+            polls.append(1)
+            return PollResult(done=len(polls) == 2, retry_after=60)
+
+        future = self.poller.submit(key="op", poll=poll, initial_delay=0)
+        with self.assertRaises(Exception):
+            future.result(timeout=0.2)
+        self.assertEqual(len(polls), 1)
@@ -0,0 +1,130 @@
+import unittest
+from unittest import mock
+
+from read_cache import AzureReadCache, CachingAzureClient
+from sdk_operations import SdkAzureClient
+
+
+class TestCachingAzureClient(unittest.TestCase):
+    def setUp(self):
+        self.azure_client = mock.MagicMock()
+        self.read_cache = AzureReadCache(ttl=60)
+        self.client = CachingAzureClient(
+            azure_client=self.azure_client,
+            read_cache=self.read_cache,
+            reservation_id="reservation-1",
+        )
+
+    def test_reads_are_cached(self):
+        self.client.get_vm(vm_name="vm", resource_group_name="rg")
+        self.client.get_vm(vm_name="vm", resource_group_name="rg")
+        self.client.get_vm(vm_name="other-vm", resource_group_name="rg")
+        self.assertEqual(self.azure_client.get_vm.call_count, 2)
+
+    def test_write_invalidates_reservation_reads(self):
+        other_client = CachingAzureClient(
+            azure_client=self.azure_client,
+            read_cache=self.read_cache,
+            reservation_id="reservation-2",
+        )
+        self.client.get_vm(vm_name="vm", resource_group_name="rg")
+        other_client.get_vm(vm_name="vm", resource_group_name="rg")
+        self.client.delete_vm(vm_name="vm", resource_group_name="rg")
+        self.client.get_vm(vm_name="vm", resource_group_name="rg")
+        other_client.get_vm(vm_name="vm", resource_group_name="rg")
+        self.assertEqual(self.azure_client.get_vm.call_count, 3)
+        self.azure_client.delete_vm.assert_called_once()
+
+    def test_reads_are_not_cached_if_disabled(self):
+        client = CachingAzureClient(
+            azure_client=self.azure_client,
+            read_cache=self.read_cache,
+            reservation_id="reservation-1",
+            cache_reads=False,
+        )
+        client.get_vm(vm_name="vm", resource_group_name="rg")
+        client.get_vm(vm_name="vm", resource_group_name="rg")
+        self.assertEqual(self.azure_client.get_vm.call_count, 2)
+
+    def test_reads_are_cached_per_subscription(self):
+        other_client = CachingAzureClient(
+            azure_client=self.azure_client,
+            read_cache=self.read_cache,
+            reservation_id="reservation-1",
+            subscription_id="subscription-2",
+        )
+        self.client.get_vm(vm_name="vm", resource_group_name="rg")
+        other_client.get_vm(vm_name="vm", resource_group_name="rg")
+        self.assertEqual(self.azure_client.get_vm.call_count, 2)
+
+    def test_write_invalidates_reads_of_written_resource_group(self):
+        self.client.get_vm(vm_name="vm", resource_group_name="rg")
+        self.client.get_vm(vm_name="other-vm", resource_group_name="rg")
+        self.client.get_vm("vm", "other-rg")
+        self.client.list_network_security_group_rules(resource_group_name="rg")
+        self.client.create_or_update_virtual_machine(
+            vm_name="VM", virtual_machine=mock.Mock(), resource_group_name="RG"
+        )
+        self.client.get_vm(vm_name="vm", resource_group_name="rg")
+        self.client.get_vm(vm_name="other-vm", resource_group_name="rg")
+        self.client.get_vm("vm", "other-rg")
+        self.client.list_network_security_group_rules(resource_group_name="rg")
+
+        self.assertEqual(self.azure_client.get_vm.call_count, 4)
+        self.assertEqual(
+            self.azure_client.list_network_security_group_rules.call_count, 2
+        )
+
+    def test_write_without_resource_group_invalidates_reservation_reads(self):
+        self.client.get_vm(vm_name="vm", resource_group_name="rg")
+        self.client.start_vm("vm", mock.Mock(), "rg")
+        self.client.get_vm(vm_name="vm", resource_group_name="rg")
+        self.assertEqual(self.azure_client.get_vm.call_count, 2)
+
+    def test_exists_checks_are_reads(self):
+        self.client.get_vm(vm_name="vm", resource_group_name="rg")
+        self.client.network_security_group_exists(
+            nsg_name="nsg", resource_group_name="rg"
+        )
+        self.client.network_security_group_exists(
+            nsg_name="nsg", resource_group_name="rg"
+        )
+        self.client.get_vm(vm_name="vm", resource_group_name="rg")
+        self.assertEqual(self.azure_client.get_vm.call_count, 1)
+        self.azure_client.network_security_group_exists.assert_called_once()
+
+    def test_cached_reads_are_copies(self):
+        self.azure_client.get_vm.return_value = {"tags": {}}
+        vm = self.client.get_vm(vm_name="vm", resource_group_name="rg")
+        vm["tags"]["changed"] = "true"
+
+        self.assertEqual(
+            self.client.get_vm(vm_name="vm", resource_group_name="rg"), {"tags": {}}
+        )
+        self.azure_client.get_vm.assert_called_once()
+
+    def test_reads_with_callbacks_are_not_cached(self):
+        hook = mock.Mock()
+        self.client.get_vm_instance_view(
+            vm_name="vm", resource_group_name="rg", raw_response_hook=hook
+        )
+        self.client.get_vm_instance_view(
+            vm_name="vm", resource_group_name="rg", raw_response_hook=hook
+        )
+        self.assertEqual(self.azure_client.get_vm_instance_view.call_count, 2)
+
+    def test_sdk_write_invalidates_reads_of_written_vm(self):
+        client = CachingAzureClient(
+            azure_client=SdkAzureClient(self.azure_client),
+            read_cache=self.read_cache,
+            reservation_id="reservation-1",
+        )
+        client.get_vm(vm_name="vm", resource_group_name="rg")
+        client.get_vm(vm_name="other-vm", resource_group_name="rg")
+        client.begin_start_vm(vm_name="vm", resource_group_name="rg")
+        client.get_vm(vm_name="vm", resource_group_name="rg")
+        client.get_vm(vm_name="other-vm", resource_group_name="rg")
+
+        self.assertEqual(self.azure_client.get_vm.call_count, 3)
+        virtual_machines = self.azure_client._compute_client.virtual_machines
+        virtual_machines.begin_start.assert_called_once()
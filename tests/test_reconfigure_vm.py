@@ -0,0 +1,149 @@
+import logging
+import threading
+import unittest
+from types import SimpleNamespace
+from unittest import mock
+
+from msrestazure.azure_exceptions import CloudError
+
+from lro_poller import SharedLROPoller
+from reconfigure_vm import ParallelReconfigureVMFlow
+
+from cloudshell.cp.azure.exceptions import ReconfigureVMException
+
+logger = logging.getLogger(__name__)
+
+
+def prepare_disk(name, disk_size=32, disk_type="Standard_LRS", tags=None):
+    return SimpleNamespace(
+        name=name,
+        id=f"/disks/{name}",
+        disk_size_gb=disk_size,
+        sku=SimpleNamespace(name=disk_type),
+        tags=tags if tags is not None else {"owner": "sandbox"},
+    )
+
+
+class TestParallelReconfigureVMFlow(unittest.TestCase):
+    def setUp(self):
+        self.vm = SimpleNamespace(
+            name="vm",
+            zones=["1"],
+            additional_capabilities=None,
+            hardware_profile=SimpleNamespace(vm_size="Standard_B2s"),
+            storage_profile=SimpleNamespace(
+                os_disk=SimpleNamespace(name="vm_os"),
+                data_disks=[SimpleNamespace(lun=0, name="vm_data0")],
+            ),
+        )
+        self.disks = {
+            "vm_os": prepare_disk("vm_os", disk_size=30),
+            "vm_data0": prepare_disk("vm_data0"),
+        }
+        self.azure_client = mock.MagicMock()
+        self.azure_client.get_vm.return_value = self.vm
+        self.azure_client.get_disk.side_effect = self._get_disk
+        self.azure_client.create_disk.side_effect = self._create_disk
+        self.azure_client.get_vm_instance_view.return_value = SimpleNamespace(
+            statuses=[SimpleNamespace(code="ProvisioningState/succeeded")]
+        )
+        self.created = threading.Barrier(2, timeout=5)
+        self.poller = SharedLROPoller(interval=0.01)
+
+        self.flow = ParallelReconfigureVMFlow(
+            resource_config=SimpleNamespace(region="westeurope", custom_tags={}),
+            azure_client=self.azure_client,
+            cs_api=mock.MagicMock(),
+            reservation_info=mock.MagicMock(),
+            cancellation_manager=mock.MagicMock(
+                cancellation_context=SimpleNamespace(is_cancelled=False)
+            ),
+            logger=logger,
+            max_workers=4,
+            poller=self.poller,
+        )
+        self.flow._tags_manager = mock.MagicMock()
+        self.flow._tags_manager.get_vm_tags.return_value = {"owner": "sandbox"}
+        self.deployed_app = SimpleNamespace(
+            name="vm", resource_group_name="rg", extended_custom_tags={}
+        )
+
+    def tearDown(self):
+        self.poller.shutdown()
+
+    def _get_disk(self, disk_name, resource_group_name):
+        if disk_name not in self.disks:
+            raise CloudError(SimpleNamespace(status_code=404), error="Not found")
+        return self.disks[disk_name]
+
+    def _create_disk(self, disk_name, disk_size, disk_type, zones, **kwargs):
+        # both disks are created at the same time
+        self.created.wait()
+        return prepare_disk(disk_name, disk_size=disk_size, disk_type=disk_type)
+
+    def _reconfigure(self, vm_size="", os_disk_size="", data_disks=""):
+        self.flow.reconfigure(
+            deployed_app=self.deployed_app,
+            vm_size=vm_size,
+            os_disk_size=os_disk_size,
+            os_disk_type="",
+            data_disks=data_disks,
+        )
+
+    def test_disks_are_created_concurrently_and_attached_by_one_update(self):
+        self._reconfigure(
+            vm_size="Standard_B4ms",
+            os_disk_size="64",
+            data_disks="data0:32;data1:64;data2:128,Premium SSD",
+        )
+
+        self.azure_client.update_disk.assert_called_once_with(
+            disk=self.disks["vm_os"],
+            resource_group_name="rg",
+            disk_size="64",
+            disk_type=None,
+            tags=None,
+        )
+        self.assertEqual(
+            sorted(
+                (call.kwargs["disk_name"], call.kwargs["zones"])
+                for call in self.azure_client.create_disk.call_args_list
+            ),
+            [("vm_data1", ["1"]), ("vm_data2", ["1"])],
+        )
+        self.azure_client.begin_update_vm.assert_called_once()
+        self.azure_client.get_vm_instance_view.assert_called_once()
+        self.assertEqual(self.vm.hardware_profile.vm_size, "Standard_B4ms")
+        self.assertEqual(
+            [(disk.lun, disk.name) for disk in self.vm.storage_profile.data_disks],
+            [(0, "vm_data0"), (1, "vm_data1"), (2, "vm_data2")],
+        )
+
+    def test_unchanged_vm_is_not_updated(self):
+        self._reconfigure(os_disk_size="30", data_disks="data0:32")
+
+        self.azure_client.update_disk.assert_not_called()
+        self.azure_client.begin_update_vm.assert_not_called()
+
+    def test_created_disks_are_deleted_if_disk_operation_fails(self):
+        self.azure_client.update_disk.side_effect = ValueError("error")
+
+        with self.assertRaises(ValueError):
+            self._reconfigure(data_disks="data0:64;data1:32;data2:32")
+
+        self.assertEqual(
+            sorted(
+                call.kwargs["disk_name"]
+                for call in self.azure_client.delete_disk.call_args_list
+            ),
+            ["vm_data1", "vm_data2"],
+        )
+        self.azure_client.begin_update_vm.assert_not_called()
+
+    def test_failed_vm_update(self):
+        self.azure_client.get_vm_instance_view.return_value = SimpleNamespace(
+            statuses=[SimpleNamespace(code="ProvisioningState/failed/InternalError")]
+        )
+
+        with self.assertRaises(ReconfigureVMException):
+            self._reconfigure(vm_size="Standard_B4ms")
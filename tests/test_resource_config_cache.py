@@ -0,0 +1,100 @@
+import unittest
+from types import SimpleNamespace
+from unittest import mock
+
+from resource_config_cache import ResourceConfigCache
+
+SHELL_NAME = "Microsoft Azure 2G"
+
+
+class FakeTimer:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def prepare_context(name="Azure", **attributes):
+    return SimpleNamespace(
+        resource=SimpleNamespace(
+            name=name,
+            fullname=name,
+            address="",
+            family="Cloud Provider",
+            attributes={
+                f"{SHELL_NAME}.Azure Subscription ID": "subscription",
+                f"{SHELL_NAME}.Azure Application Key": "encrypted",
+                **{f"{SHELL_NAME}.{key}": value for key, value in attributes.items()},
+            },
+        )
+    )
+
+
+class TestResourceConfigCache(unittest.TestCase):
+    def setUp(self):
+        self.timer = FakeTimer()
+        self.cache = ResourceConfigCache(ttl=10, max_size=2, timer=self.timer)
+        self.api = mock.MagicMock()
+        self.api.DecryptPassword.side_effect = lambda value: SimpleNamespace(
+            Value=f"decrypted {value}"
+        )
+
+    def _get_config(self, context):
+        return self.cache.get_config(
+            shell_name=SHELL_NAME, context=context, api=self.api
+        )
+
+    def test_config_is_reused_for_unchanged_attributes(self):
+        config = self._get_config(prepare_context())
+
+        self.assertIs(self._get_config(prepare_context()), config)
+        self.assertEqual(config.azure_subscription_id, "subscription")
+
+    def test_changed_attributes_replace_config_of_resource(self):
+        config = self._get_config(prepare_context(Region="westeurope"))
+        other_config = self._get_config(prepare_context(name="Other"))
+
+        new_config = self._get_config(prepare_context(Region="eastus"))
+
+        self.assertIsNot(new_config, config)
+        self.assertEqual(new_config.region, "eastus")
+        self.assertIs(self._get_config(prepare_context(name="Other")), other_config)
+        self.assertIsNot(self._get_config(prepare_context(Region="westeurope")), config)
+
+    def test_config_keeps_decrypted_passwords_without_api_session(self):
+        config = self._get_config(prepare_context())
+        self.api.DecryptPassword.reset_mock()
+
+        self.assertIsNone(config.api)
+        self.assertEqual(config.azure_application_key, "decrypted encrypted")
+        self.assertEqual(
+            self._get_config(prepare_context()).azure_application_key,
+            "decrypted encrypted",
+        )
+        self.api.DecryptPassword.assert_not_called()
+
+    def test_config_expires(self):
+        config = self._get_config(prepare_context())
+
+        self.timer.now = 10
+
+        self.assertIsNot(self._get_config(prepare_context()), config)
+
+    def test_least_recently_used_resource_is_evicted(self):
+        config = self._get_config(prepare_context(name="First"))
+        self._get_config(prepare_context(name="Second"))
+        self._get_config(prepare_context(name="First"))
+        self._get_config(prepare_context(name="Third"))
+
+        self.assertIs(self._get_config(prepare_context(name="First")), config)
+        self.assertEqual(len(self.cache._configs), 2)
+
+    def test_invalidate(self):
+        config = self._get_config(prepare_context())
+        other_config = self._get_config(prepare_context(name="Other"))
+
+        self.cache.invalidate(resource_name="Azure")
+
+        self.assertIsNot(self._get_config(prepare_context()), config)
+        self.assertIs(self._get_config(prepare_context(name="Other")), other_config)
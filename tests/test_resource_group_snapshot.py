@@ -0,0 +1,75 @@
+import logging
+import unittest
+from types import SimpleNamespace
+from unittest import mock
+
+from resource_group_snapshot import ResourceGroupSnapshot, SnapshotAzureClient
+from sdk_operations import SdkAzureClient
+from throttling import ThrottledAzureClient
+
+
+def resource(name):
+    return SimpleNamespace(name=name)
+
+
+class TestSnapshotAzureClient(unittest.TestCase):
+    def setUp(self):
+        self.azure_client = mock.MagicMock()
+        self.azure_client._compute_client.virtual_machines.list.return_value = [
+            resource("VM1")
+        ]
+        self.azure_client._network_client.network_interfaces.list.return_value = [
+            resource("nic1")
+        ]
+        self.azure_client._network_client.public_ip_addresses.list.return_value = []
+        snapshot = ResourceGroupSnapshot(
+            azure_client=SdkAzureClient(self.azure_client),
+            resource_group_name="rg",
+            logger=logging.getLogger(__name__),
+        )
+        self.client = SnapshotAzureClient(
+            azure_client=self.azure_client, snapshot=snapshot
+        )
+
+    def test_resources_are_read_from_snapshot(self):
+        vm = self.client.get_vm(vm_name="vm1", resource_group_name="RG")
+        nic = self.client.get_network_interface("nic1", "rg")
+        self.client.get_vm(vm_name="vm1", resource_group_name="rg")
+        self.assertEqual(vm.name, "VM1")
+        self.assertEqual(nic.name, "nic1")
+        self.azure_client.get_vm.assert_not_called()
+        self.azure_client._compute_client.virtual_machines.list.assert_called_once()
+
+    def test_missing_resource_is_read_by_client(self):
+        self.client.get_public_ip(public_ip_name="ip1", resource_group_name="rg")
+        self.azure_client.get_public_ip.assert_called_once_with(
+            public_ip_name="ip1", resource_group_name="rg"
+        )
+
+    def test_other_resource_group_is_read_by_client(self):
+        self.client.get_vm("vm1", "other-rg")
+        self.azure_client.get_vm.assert_called_once_with("vm1", "other-rg")
+        self.azure_client._compute_client.virtual_machines.list.assert_not_called()
+
+    def test_other_attributes_are_taken_from_client(self):
+        self.assertIs(self.client.start_vm, self.azure_client.start_vm)
+
+    def test_lists_are_sent_via_arm_scheduler(self):
+        scheduler = mock.MagicMock()
+        scheduler.execute.side_effect = lambda func, **kwargs: func()
+        snapshot = ResourceGroupSnapshot(
+            azure_client=ThrottledAzureClient(
+                azure_client=SdkAzureClient(self.azure_client),
+                scheduler=scheduler,
+                subscription_id="subscription",
+                priority=0,
+            ),
+            resource_group_name="rg",
+            logger=logging.getLogger(__name__),
+        )
+
+        self.assertEqual(snapshot.get("vm", "vm1").name, "VM1")
+        self.assertEqual(
+            [call.kwargs["kind"] for call in scheduler.execute.call_args_list],
+            ["reads", "reads", "reads"],
+        )
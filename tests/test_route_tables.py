@@ -0,0 +1,95 @@
+import json
+import logging
+import threading
+import unittest
+from types import SimpleNamespace
+from unittest import mock
+
+from route_tables import ParallelCreateRouteTablesFlow
+
+from cloudshell.cp.azure.request_actions import CreateRouteTablesRequestActions
+
+logger = logging.getLogger(__name__)
+
+REQUEST = json.dumps(
+    {
+        "route_tables": [
+            {
+                "name": f"table{index}",
+                "subnets": [f"subnet{index}"],
+                "routes": [
+                    {
+                        "name": "route",
+                        "address_prefix": "10.0.0.0/16",
+                        "next_hop_type": "VirtualAppliance",
+                        "next_hop_address": "10.0.1.4",
+                    }
+                ],
+            }
+            for index in range(2)
+        ]
+    }
+)
+
+
+class TestParallelCreateRouteTablesFlow(unittest.TestCase):
+    def setUp(self):
+        self.azure_client = mock.MagicMock()
+        self.subnets = [
+            SimpleNamespace(name=f"subnet{index}", route_table=None)
+            for index in range(2)
+        ]
+        self.azure_client.get_virtual_network.return_value = SimpleNamespace(
+            name="sandbox-vnet", subnets=self.subnets
+        )
+        barrier = threading.Barrier(2, timeout=5)
+
+        def create_route_table(resource_group_name, route_table_name, route_table):
+            barrier.wait()
+            return SimpleNamespace(id=f"/route_tables/{route_table_name}")
+
+        self.azure_client.create_route_table.side_effect = create_route_table
+        self.flow = ParallelCreateRouteTablesFlow(
+            resource_config=mock.MagicMock(),
+            reservation_info=mock.MagicMock(),
+            azure_client=self.azure_client,
+            cs_api=mock.MagicMock(),
+            max_workers=2,
+            logger=logger,
+        )
+        self.request_actions = CreateRouteTablesRequestActions.from_request(REQUEST)
+
+    def test_create_route_tables(self):
+        self.subnets[1].route_table = SimpleNamespace(id="/Route_Tables/table1")
+
+        self.flow.create_route_tables(self.request_actions)
+
+        self.assertEqual(self.azure_client.create_route_table.call_count, 2)
+        route_table = self.azure_client.create_route_table.call_args.kwargs[
+            "route_table"
+        ]
+        self.assertEqual(len(route_table.routes), 1)
+        self.azure_client.update_subnet.assert_called_once()
+        self.assertEqual(
+            self.azure_client.update_subnet.call_args.kwargs["subnet_name"], "subnet0"
+        )
+        self.assertEqual(self.subnets[0].route_table.id, "/route_tables/table0")
+
+    def test_dry_run(self):
+        plan = json.loads(
+            self.flow.create_route_tables(self.request_actions, dry_run=True)
+        )
+
+        self.assertEqual(
+            [(table["route_table"], table["subnets"]) for table in plan],
+            [("table0", ["subnet0"]), ("table1", ["subnet1"])],
+        )
+        self.azure_client.create_route_table.assert_not_called()
+
+    def test_unknown_subnet(self):
+        self.request_actions.route_tables[1].subnets.append("unknown")
+
+        with self.assertRaisesRegex(Exception, "unknown"):
+            self.flow.create_route_tables(self.request_actions)
+
+        self.azure_client.create_route_table.assert_not_called()
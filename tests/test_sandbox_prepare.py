@@ -0,0 +1,132 @@
+import json
+import logging
+import unittest
+from types import SimpleNamespace
+from unittest import mock
+
+from sandbox_prepare import PreparedSandboxCache
+
+logger = logging.getLogger(__name__)
+
+SUBNET_NAME = "rid_10.0.1.0-24"
+
+
+def prepare_request(action_id, cidr="10.0.1.0/24", create_keys=False):
+    actions = [
+        {
+            "actionId": action_id,
+            "type": "createSubnet",
+            "actionParams": {"cidr": cidr},
+        }
+    ]
+    if create_keys:
+        actions.append({"actionId": f"{action_id}-keys", "type": "createKeys"})
+    return json.dumps({"driverRequest": {"actions": actions}})
+
+
+class TestPreparedSandboxCache(unittest.TestCase):
+    def setUp(self):
+        self.cache = PreparedSandboxCache()
+        self.azure_client = mock.MagicMock()
+        self.resources = self.azure_client._resource_client.resources
+        self.resources.list_by_resource_group.return_value = [
+            SimpleNamespace(id="/subscriptions/sub/resourceGroups/rid/nsg")
+        ]
+        self.resource_config = mock.MagicMock(
+            management_group_name="mgmt",
+            sandbox_vnet_name="sandbox-vnet",
+            key_vault="key-vault",
+        )
+        self.azure_client.get_key_vault_secret.return_value = "private-key"
+        self.azure_client.get_virtual_network.return_value = SimpleNamespace(
+            subnets=[SimpleNamespace(name=SUBNET_NAME)]
+        )
+        response = json.dumps(
+            {
+                "driverResponse": {
+                    "actionResults": [
+                        {"actionId": "1", "success": True, "subnetId": SUBNET_NAME}
+                    ]
+                }
+            }
+        )
+        self.cache.save(
+            reservation_id="rid",
+            request=prepare_request("1"),
+            response=response,
+            azure_client=self.azure_client,
+            resource_config=self.resource_config,
+            logger=logger,
+        )
+
+    def get_response(self, action_id="2", **kwargs):
+        return self.cache.get_response(
+            reservation_id="rid",
+            request=prepare_request(action_id, **kwargs),
+            azure_client=self.azure_client,
+            resource_config=self.resource_config,
+            logger=logger,
+        )
+
+    def test_prepared_sandbox_response_is_reused(self):
+        response = json.loads(self.get_response())
+
+        self.assertEqual(
+            response["driverResponse"]["actionResults"],
+            [{"actionId": "2", "success": True, "subnetId": SUBNET_NAME}],
+        )
+        self.azure_client.get_virtual_network.assert_called_with(
+            virtual_network_name="sandbox-vnet", resource_group_name="mgmt"
+        )
+
+    def test_missing_resources_are_prepared(self):
+        self.resources.list_by_resource_group.return_value = []
+
+        self.assertIsNone(self.get_response())
+
+    def test_missing_subnet_is_prepared(self):
+        self.azure_client.get_virtual_network.return_value = SimpleNamespace(subnets=[])
+
+        self.assertIsNone(self.get_response())
+
+    def test_invalidated_sandbox_is_prepared(self):
+        self.cache.invalidate(reservation_id="rid")
+
+        self.assertIsNone(self.get_response())
+
+    def test_sandbox_with_other_actions_is_prepared(self):
+        self.assertIsNone(self.get_response(cidr="10.0.2.0/24"))
+        self.assertIsNone(self.get_response(create_keys=True))
+
+    def test_access_key_is_read_from_key_vault(self):
+        response = json.dumps(
+            {
+                "driverResponse": {
+                    "actionResults": [
+                        {"actionId": "1", "success": True, "subnetId": SUBNET_NAME},
+                        {"actionId": "1-keys", "success": True, "accessKey": "secret"},
+                    ]
+                }
+            }
+        )
+        self.cache.save(
+            reservation_id="rid",
+            request=prepare_request("1", create_keys=True),
+            response=response,
+            azure_client=self.azure_client,
+            resource_config=self.resource_config,
+            logger=logger,
+        )
+
+        self.assertNotIn("secret", repr(list(self.cache._sandboxes.items())))
+        response = json.loads(self.get_response(create_keys=True))
+        self.assertEqual(
+            response["driverResponse"]["actionResults"][1],
+            {"actionId": "2-keys", "success": True, "accessKey": "private-key"},
+        )
+        self.azure_client.get_key_vault_secret.assert_called_once_with(
+            key_vault_name="key-vault", secret_name="rid"
+        )
+
+        self.resource_config.key_vault = ""
+        self.assertIsNone(self.get_response(create_keys=True))
@@ -0,0 +1,159 @@
+import threading
+import unittest
+from types import SimpleNamespace
+from unittest import mock
+
+from concurrency import run_concurrently
+from single_flight import SingleFlight, SingleFlightAzureClient
+
+
+class BlockingRead:
+    """Read that is in flight until it is released."""
+
+    def __init__(self, result):
+        self.result = result
+        self.started = threading.Event()
+        self.release = threading.Event()
+        self.calls = 0
+
+    def __call__(self, *args, **kwargs):
+        self.calls += 1
+        self.started.set()
+        self.release.wait(5)
+        if isinstance(self.result, Exception):
+            raise self.result
+        return self.result
+
+
+class TestSingleFlight(unittest.TestCase):
+    def setUp(self):
+        self.single_flight = SingleFlight()
+
+    def _start_leader(self, func, key="key"):
+        def lead():
+            try:
+                self.single_flight.do(key, func)
+            except Exception:
+                pass
+
+        thread = threading.Thread(target=lead, daemon=True)
+        thread.start()
+        func.started.wait(5)
+        return thread
+
+    def _join_waiters(self, func, count, key="key"):
+        def join(_):
+            return self.single_flight.do(key, func)
+
+        # waiters join the in-flight call before it is released
+        timer = threading.Timer(0.1, func.release.set)
+        timer.start()
+        results = run_concurrently(func=join, items=range(count), max_workers=count)
+        timer.join()
+        return results
+
+    def test_concurrent_calls_are_coalesced(self):
+        read = BlockingRead(result="result")
+        thread = self._start_leader(read)
+
+        results = self._join_waiters(read, count=3)
+        thread.join(5)
+
+        self.assertEqual([result.result for result in results], ["result"] * 3)
+        self.assertEqual(read.calls, 1)
+        self.assertEqual(len(self.single_flight), 0)
+
+    def test_error_is_raised_for_waiters(self):
+        read = BlockingRead(result=ValueError("error"))
+        thread = self._start_leader(read)
+
+        results = self._join_waiters(read, count=2)
+        thread.join(5)
+
+        self.assertTrue(all(isinstance(r.error, ValueError) for r in results))
+        self.assertEqual(read.calls, 1)
+
+    def test_forgotten_call_is_not_joined(self):
+        read = BlockingRead(result="result")
+        thread = self._start_leader(read)
+
+        self.single_flight.forget(lambda key: key == "key")
+        self.assertEqual(
+            self.single_flight.do("key", lambda: "new result"), "new result"
+        )
+        read.release.set()
+        thread.join(5)
+        self.assertEqual(len(self.single_flight), 0)
+
+
+class TestSingleFlightAzureClient(unittest.TestCase):
+    def setUp(self):
+        self.azure_client = mock.MagicMock()
+        self.single_flight = SingleFlight()
+        self.client = SingleFlightAzureClient(
+            azure_client=self.azure_client,
+            single_flight=self.single_flight,
+            subscription_id="subscription",
+        )
+
+    def test_waiters_get_copies_of_result(self):
+        read = BlockingRead(result=SimpleNamespace(name="nsg", security_rules=[]))
+        self.azure_client.get_network_security_group.side_effect = read
+        thread = threading.Thread(
+            target=self.client.get_network_security_group,
+            args=("nsg", "rg"),
+            daemon=True,
+        )
+        thread.start()
+        read.started.wait(5)
+        threading.Timer(0.1, read.release.set).start()
+
+        results = run_concurrently(
+            func=lambda _: self.client.get_network_security_group("nsg", "rg"),
+            items=range(2),
+            max_workers=2,
+        )
+        thread.join(5)
+
+        nsgs = [result.result for result in results]
+        self.assertEqual(read.calls, 1)
+        self.assertEqual(nsgs[0], read.result)
+        self.assertIsNot(nsgs[0], read.result)
+        self.assertIsNot(nsgs[0].security_rules, nsgs[1].security_rules)
+
+    def test_paged_results_are_read_to_list(self):
+        self.azure_client.get_virtual_machine_sizes_by_region.return_value = iter(
+            ["Standard_B1s", "Standard_B2s"]
+        )
+
+        self.assertEqual(
+            self.client.get_virtual_machine_sizes_by_region(region="westeurope"),
+            ["Standard_B1s", "Standard_B2s"],
+        )
+
+    def test_reads_with_callbacks_are_not_shared(self):
+        self.azure_client.get_vm_instance_view.return_value = iter(["status"])
+
+        result = self.client.get_vm_instance_view(
+            vm_name="vm", resource_group_name="rg", raw_response_hook=mock.Mock()
+        )
+
+        self.assertIs(result, self.azure_client.get_vm_instance_view.return_value)
+        self.assertEqual(len(self.single_flight), 0)
+
+    def test_write_forgets_in_flight_reads(self):
+        read = BlockingRead(result="old vm")
+        self.azure_client.get_vm.side_effect = read
+        thread = threading.Thread(
+            target=self.client.get_vm, args=("vm", "rg"), daemon=True
+        )
+        thread.start()
+        read.started.wait(5)
+
+        self.client.create_or_update_virtual_machine("vm", mock.MagicMock(), "rg")
+        self.azure_client.get_vm.side_effect = None
+        self.azure_client.get_vm.return_value = "new vm"
+
+        self.assertEqual(self.client.get_vm("vm", "rg"), "new vm")
+        read.release.set()
+        thread.join(5)
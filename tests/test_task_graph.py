@@ -0,0 +1,98 @@
+import logging
+import threading
+import unittest
+from types import SimpleNamespace
+from unittest import mock
+
+from sandbox_cleanup import ParallelCleanupSandboxInfraFlow
+from task_graph import DependencyFailedError, TaskGraph
+
+logger = logging.getLogger(__name__)
+
+
+class TestTaskGraph(unittest.TestCase):
+    def setUp(self):
+        self.graph = TaskGraph(max_workers=4, logger=logger)
+
+    def test_tasks_run_after_dependencies(self):
+        order = []
+        self.graph.add("subnet", lambda: order.append("subnet"))
+        self.graph.add("nsg", lambda: order.append("nsg"), depends_on=["subnet"])
+        self.graph.add(
+            "resource_group",
+            lambda: order.append("resource_group"),
+            depends_on=["subnet", "nsg"],
+        )
+
+        results = self.graph.run()
+
+        self.assertEqual(order, ["subnet", "nsg", "resource_group"])
+        self.assertTrue(all(result.success for result in results.values()))
+
+    def test_independent_tasks_run_concurrently(self):
+        barrier = threading.Barrier(2, timeout=5)
+        self.graph.add("storage", barrier.wait)
+        self.graph.add("key_vault", barrier.wait)
+
+        results = self.graph.run()
+
+        self.assertTrue(results["storage"].success)
+        self.assertTrue(results["key_vault"].success)
+
+    def test_failed_dependency_skips_task(self):
+        func = mock.MagicMock()
+        self.graph.add("subnet", mock.MagicMock(side_effect=ValueError("error")))
+        self.graph.add("resource_group", func, depends_on=["subnet"])
+
+        results = self.graph.run()
+
+        self.assertIsInstance(results["subnet"].error, ValueError)
+        self.assertIsInstance(results["resource_group"].error, DependencyFailedError)
+        func.assert_not_called()
+
+    def test_invalid_dependencies(self):
+        self.graph.add("subnet", mock.MagicMock(), depends_on=["nsg"])
+        self.graph.add("nsg", mock.MagicMock(), depends_on=["subnet"])
+
+        with self.assertRaises(ValueError):
+            self.graph.run()
+
+
+class TestParallelCleanupSandboxInfraFlow(unittest.TestCase):
+    def setUp(self):
+        self.azure_client = mock.MagicMock()
+        self.azure_client.get_virtual_network.return_value = SimpleNamespace(
+            name="sandbox-vnet",
+            subnets=[SimpleNamespace(name=f"rid_10.0.{i}.0-24") for i in range(3)],
+        )
+        self.reservation_info = mock.MagicMock(reservation_id="rid")
+        self.reservation_info.get_resource_group_name.return_value = "rid"
+        self.flow = ParallelCleanupSandboxInfraFlow(
+            resource_config=mock.MagicMock(management_group_name="mgmt"),
+            azure_client=self.azure_client,
+            reservation_info=self.reservation_info,
+            lock_manager=mock.MagicMock(),
+            max_workers=4,
+            logger=logger,
+        )
+
+    def test_resource_group_is_deleted_after_subnets(self):
+        self.flow.cleanup_sandbox_infra(request_actions=mock.MagicMock())
+
+        calls = [call[0] for call in self.azure_client.method_calls]
+        subnet_calls = [i for i, name in enumerate(calls) if name == "delete_subnet"]
+        self.assertEqual(len(subnet_calls), 3)
+        self.assertGreater(
+            calls.index("delete_network_security_group"), subnet_calls[-1]
+        )
+        self.assertGreater(calls.index("delete_resource_group"), subnet_calls[-1])
+        self.azure_client.delete_key_vault_secret.assert_called_once()
+
+    def test_failed_subnet_deletion_keeps_resource_group(self):
+        self.azure_client.delete_subnet.side_effect = ValueError("in use")
+
+        with self.assertRaises(ValueError):
+            self.flow.cleanup_sandbox_infra(request_actions=mock.MagicMock())
+
+        self.assertEqual(self.azure_client.delete_subnet.call_count, 1)
+        self.azure_client.delete_resource_group.assert_not_called()
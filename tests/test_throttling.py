@@ -0,0 +1,169 @@
+import logging
+import threading
+import unittest
+from types import SimpleNamespace
+
+from throttling import (
+    SDK_CLIENT_NAMES,
+    ArmRequestScheduler,
+    TokenBucket,
+    get_request_kind,
+    hand_over_throttling,
+)
+
+from cloudshell.cp.azure.azure_client import AzureAPIClient
+
+
+class FakeTimer:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class ThrottlingError(Exception):
+    def __init__(self, headers):
+        super().__init__("Too many requests")
+        self.status_code = 429
+        self.response = SimpleNamespace(status_code=429, headers=headers)
+
+
+class TestTokenBucket(unittest.TestCase):
+    def setUp(self):
+        self.timer = FakeTimer()
+        self.bucket = TokenBucket(capacity=2, refill_rate=1, timer=self.timer)
+
+    def test_tokens_are_refilled(self):
+        self.assertEqual(self.bucket.try_acquire(), 0)
+        self.assertEqual(self.bucket.try_acquire(), 0)
+        self.assertEqual(self.bucket.try_acquire(), 1)
+        self.timer.now = 1
+        self.assertEqual(self.bucket.try_acquire(), 0)
+
+    def test_limit(self):
+        self.bucket.limit(remaining=1)
+        self.assertEqual(self.bucket.try_acquire(), 0)
+        self.assertEqual(self.bucket.try_acquire(), 1)
+
+    def test_pause(self):
+        self.bucket.pause(seconds=5)
+        self.assertEqual(self.bucket.try_acquire(), 5)
+        self.timer.now = 6
+        self.assertEqual(self.bucket.try_acquire(), 0)
+
+
+class TestArmRequestScheduler(unittest.TestCase):
+    def setUp(self):
+        self.sleeps = []
+        self.scheduler = ArmRequestScheduler(sleep=self.sleeps.append)
+
+    def test_request_kind(self):
+        self.assertEqual(get_request_kind("get_vm"), "reads")
+        self.assertEqual(get_request_kind("delete_vm"), "deletes")
+        self.assertEqual(get_request_kind("create_vm"), "writes")
+
+    def test_throttled_request_is_retried(self):
+        calls = []
+
+        def func():
+            calls.append(1)
+            if len(calls) == 1:
+                raise ThrottlingError({"Retry-After": "0"})
+            return "result"
+
+        result = self.scheduler.execute(func, subscription_id="sub", kind="reads")
+        self.assertEqual(result, "result")
+        self.assertEqual(len(self.sleeps), 1)
+        self.assertEqual(self.scheduler.get_metrics()["throttled"], 1)
+
+    def test_other_errors_are_raised(self):
+        def func():
+            raise ValueError("error")
+
+        with self.assertRaises(ValueError):
+            self.scheduler.execute(func, subscription_id="sub", kind="writes")
+
+    def test_waiting_requests_are_served_by_priority(self):
+        scheduler = ArmRequestScheduler(bucket_limits={"reads": (1, 20)})
+        scheduler.acquire(subscription_id="sub", kind="reads")
+        order = []
+
+        def request(priority):
+            scheduler.acquire(subscription_id="sub", kind="reads", priority=priority)
+            order.append(priority)
+
+        threads = [
+            threading.Thread(target=request, args=(priority,))
+            for priority in (
+                ArmRequestScheduler.PRIORITY_LOW,
+                ArmRequestScheduler.PRIORITY_HIGH,
+            )
+        ]
+        with scheduler._condition:
+            for thread in threads:
+                thread.start()
+            while sum(map(len, scheduler._queues.values())) < 2:
+                scheduler._condition.wait(0.01)
+        for thread in threads:
+            thread.join(5)
+
+        self.assertEqual(
+            order,
+            [ArmRequestScheduler.PRIORITY_HIGH, ArmRequestScheduler.PRIORITY_LOW],
+        )
+
+    def test_response_hook_limits_buckets_by_remaining_requests(self):
+        timer = FakeTimer()
+        scheduler = ArmRequestScheduler(timer=timer)
+        hook = scheduler.get_response_hook("sub")
+
+        hook(
+            SimpleNamespace(
+                http_response=SimpleNamespace(
+                    headers={"x-ms-ratelimit-remaining-subscription-writes": "0"}
+                )
+            )
+        )
+
+        self.assertEqual(scheduler._get_bucket(("sub", "reads")).try_acquire(), 0)
+        self.assertGreater(scheduler._get_bucket(("sub", "writes")).try_acquire(), 0)
+        self.assertEqual(scheduler._get_bucket(("other", "writes")).try_acquire(), 0)
+
+
+class TestHandOverThrottling(unittest.TestCase):
+    def setUp(self):
+        self.scheduler = ArmRequestScheduler()
+        self.azure_client = AzureAPIClient(
+            azure_subscription_id="sub",
+            azure_tenant_id="tenant",
+            azure_application_id="application",
+            azure_application_key="key",
+            logger=logging.getLogger(__name__),
+        )
+        hand_over_throttling(
+            azure_client=self.azure_client,
+            scheduler=self.scheduler,
+            subscription_id="sub",
+        )
+
+    @staticmethod
+    def _prepare_response(status_code):
+        return SimpleNamespace(
+            http_request=SimpleNamespace(method="GET"),
+            http_response=SimpleNamespace(
+                status_code=status_code, headers={"Retry-After": "1"}
+            ),
+        )
+
+    def test_sdk_clients_report_remaining_requests(self):
+        for name in SDK_CLIENT_NAMES:
+            config = getattr(self.azure_client, f"_{name}_client")._config
+            self.assertIsNotNone(config.custom_hook_policy._response_callback)
+
+    def test_sdk_clients_dont_retry_throttled_requests(self):
+        retry_policy = self.azure_client._compute_client._config.retry_policy
+        settings = retry_policy.configure_retries({})
+
+        self.assertFalse(retry_policy.is_retry(settings, self._prepare_response(429)))
+        self.assertTrue(retry_policy.is_retry(settings, self._prepare_response(503)))
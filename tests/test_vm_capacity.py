@@ -0,0 +1,186 @@
+import unittest
+from types import SimpleNamespace
+from unittest import mock
+
+from catalog_cache import RegionCatalogCache
+from vm_capacity import AdmittedAzureClient, VMCapacityError, VMCapacityIndex
+
+
+def prepare_sku(name, family, cores, max_data_disks=4, zones=(), restrictions=()):
+    return SimpleNamespace(
+        name=name,
+        resource_type="virtualMachines",
+        family=family,
+        capabilities=[
+            SimpleNamespace(name="vCPUs", value=str(cores)),
+            SimpleNamespace(name="MemoryGB", value="3.5"),
+            SimpleNamespace(name="MaxDataDiskCount", value=str(max_data_disks)),
+        ],
+        location_info=[SimpleNamespace(location="westeurope", zones=list(zones))],
+        restrictions=list(restrictions),
+    )
+
+
+def prepare_usage(name, current_value, limit):
+    return SimpleNamespace(
+        name=SimpleNamespace(value=name), current_value=current_value, limit=limit
+    )
+
+
+class TestVMCapacityIndex(unittest.TestCase):
+    def setUp(self):
+        self.compute_client = mock.MagicMock()
+        self.compute_client.resource_skus.list.return_value = [
+            prepare_sku("Standard_B2s", "standardBSFamily", 2, zones=["1", "2"]),
+            prepare_sku("Standard_B4ms", "standardBSFamily", 4),
+            prepare_sku(
+                "Standard_D2s_v3",
+                "standardDSv3Family",
+                2,
+                restrictions=[
+                    SimpleNamespace(
+                        type="Location",
+                        reason_code="NotAvailableForSubscription",
+                        restriction_info=None,
+                    )
+                ],
+            ),
+            SimpleNamespace(name="Premium_LRS", resource_type="disks"),
+        ]
+        self.compute_client.usage.list.return_value = [
+            prepare_usage("cores", 4, 10),
+            prepare_usage("standardBSFamily", 4, 8),
+        ]
+        self.azure_client = SimpleNamespace(_compute_client=self.compute_client)
+        self.index = VMCapacityIndex(catalog_cache=RegionCatalogCache())
+        self.logger = mock.MagicMock()
+
+    def _admit(self, vm_size_name, **kwargs):
+        return self.index.admit(
+            azure_client=self.azure_client,
+            subscription_id="subscription",
+            region="westeurope",
+            vm_size_name=vm_size_name,
+            logger=self.logger,
+            **kwargs,
+        )
+
+    def test_unavailable_vm_size_is_rejected(self):
+        for vm_size_name in ("Standard_A0", "Standard_D2s_v3"):
+            with self.subTest(vm_size_name=vm_size_name):
+                with self.assertRaises(VMCapacityError):
+                    with self._admit(vm_size_name):
+                        pass
+
+    def test_zones_and_data_disks_are_checked(self):
+        with self._admit("standard_b2s", zones=["2"], data_disks=4):
+            pass
+
+        with self.assertRaisesRegex(VMCapacityError, "zones 3"):
+            with self._admit("Standard_B2s", zones=["3"]):
+                pass
+        with self.assertRaisesRegex(VMCapacityError, "data disks"):
+            with self._admit("Standard_B2s", data_disks=5):
+                pass
+
+        self.compute_client.resource_skus.list.assert_called_once()
+
+    def test_concurrent_deploys_are_admitted_within_quota(self):
+        with self._admit("Standard_B2s"):
+            with self._admit("Standard_B2s"):
+                with self.assertRaisesRegex(VMCapacityError, "standardBSFamily"):
+                    with self._admit("Standard_B2s"):
+                        pass
+
+        self.compute_client.usage.list.return_value = [
+            prepare_usage("cores", 8, 10),
+            prepare_usage("standardBSFamily", 8, 8),
+        ]
+        # usage is read again after the created VMs are counted by Azure
+        with self.assertRaises(VMCapacityError):
+            with self._admit("Standard_B2s"):
+                pass
+
+    def test_reserved_vm_counted_in_new_usage_is_not_reserved_twice(self):
+        self.compute_client.usage.list.return_value = [
+            prepare_usage("cores", 0, 100),
+            prepare_usage("standardBSFamily", 0, 8),
+        ]
+        with self._admit("Standard_B4ms") as admission:
+            # VM is accepted and counted by Azure while it is still deploying
+            admission.accept()
+            self.compute_client.usage.list.return_value = [
+                prepare_usage("cores", 4, 100),
+                prepare_usage("standardBSFamily", 4, 8),
+            ]
+            # another deploy ends, usage is read again by the next deploy
+            with self._admit("Standard_B2s"):
+                pass
+
+            with self._admit("Standard_B4ms"):
+                pass
+
+        self.assertEqual(self.compute_client.usage.list.call_count, 2)
+
+    def test_submitted_vm_is_reserved_against_usage_read_again(self):
+        self.compute_client.usage.list.return_value = [
+            prepare_usage("cores", 0, 100),
+            prepare_usage("standardBSFamily", 0, 8),
+        ]
+        with self._admit("Standard_B4ms") as admission:
+            # another deploy of the batch ends, usage is read again before
+            # Azure accepts the first VM and counts it
+            with self._admit("Standard_B2s"):
+                pass
+
+            with self._admit("Standard_B2s"):
+                with self.assertRaises(VMCapacityError):
+                    with self._admit("Standard_B4ms"):
+                        pass
+
+                # usage read before the VM was accepted still doesn't count it
+                admission.accept()
+                with self.assertRaises(VMCapacityError):
+                    with self._admit("Standard_B4ms"):
+                        pass
+
+        self.assertEqual(self.compute_client.usage.list.call_count, 2)
+
+    def test_admission_is_accepted_when_vm_is_submitted(self):
+        admission = mock.MagicMock()
+        azure_client = AdmittedAzureClient(mock.MagicMock(), admission)
+
+        azure_client.get_vm(vm_name="vm", resource_group_name="rg")
+        admission.accept.assert_not_called()
+
+        azure_client.create_or_update_virtual_machine(
+            vm_name="vm",
+            virtual_machine=mock.sentinel.vm,
+            resource_group_name="rg",
+            wait_for_result=False,
+        )
+        admission.accept.assert_called_once_with()
+
+    def test_resize_requires_only_additional_cores(self):
+        with self._admit("Standard_B4ms", current_vm_size_name="Standard_B2s"):
+            with self._admit("Standard_B2s"):
+                with self.assertRaises(VMCapacityError):
+                    with self._admit("Standard_B2s"):
+                        pass
+
+    def test_data_disks_are_checked_for_unchanged_size(self):
+        with self.assertRaisesRegex(VMCapacityError, "data disks"):
+            with self._admit(
+                "Standard_B4ms", current_vm_size_name="Standard_B4ms", data_disks=5
+            ):
+                pass
+
+        self.compute_client.usage.list.assert_not_called()
+
+    def test_vm_is_not_checked_if_catalog_cant_be_read(self):
+        self.compute_client.resource_skus.list.side_effect = ValueError("error")
+
+        with self._admit("Standard_A0"):
+            pass
+
+        self.logger.warning.assert_called_once()
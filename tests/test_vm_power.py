@@ -0,0 +1,104 @@
+import logging
+import unittest
+from types import SimpleNamespace
+from unittest import mock
+
+from lro_poller import SharedLROPoller
+from sdk_operations import SdkAzureClient
+from vm_power import VMPowerOperations
+
+logger = logging.getLogger(__name__)
+
+
+class FakeVirtualMachines:
+    """Virtual machines operations that change the VM state on the second poll."""
+
+    def __init__(self, retry_after=None):
+        self.retry_after = retry_after
+        self.started = []
+        self.polls = {}
+
+    def _call_hook(self, kwargs):
+        headers = {}
+        if self.retry_after is not None:
+            headers["Retry-After"] = str(self.retry_after)
+        kwargs["raw_response_hook"](
+            SimpleNamespace(http_response=SimpleNamespace(headers=headers))
+        )
+
+    def begin_start(self, resource_group_name, vm_name, **kwargs):
+        self.started.append((resource_group_name, vm_name))
+        self._call_hook(kwargs)
+
+    def instance_view(self, resource_group_name, vm_name, **kwargs):
+        self._call_hook(kwargs)
+        key = (resource_group_name, vm_name)
+        self.polls[key] = self.polls.get(key, 0) + 1
+        code = "PowerState/running" if self.polls[key] > 1 else "PowerState/starting"
+        return SimpleNamespace(statuses=[SimpleNamespace(code=code)])
+
+
+class TestVMPowerOperations(unittest.TestCase):
+    def setUp(self):
+        self.virtual_machines = FakeVirtualMachines()
+        self.poller = SharedLROPoller(interval=0.01)
+
+    def tearDown(self):
+        self.poller.shutdown()
+
+    def _prepare_operations(self, poller):
+        return VMPowerOperations(
+            azure_client=SdkAzureClient(
+                SimpleNamespace(
+                    _compute_client=SimpleNamespace(
+                        virtual_machines=self.virtual_machines
+                    )
+                )
+            ),
+            poller=poller,
+            logger=logger,
+        )
+
+    def test_vms_are_started_in_their_resource_groups(self):
+        vms = [("vm-1", "sandbox-rg"), ("vm-2", "app-rg")]
+
+        task_results = self._prepare_operations(self.poller).change_power_state(
+            vms=vms, power_on=True, max_workers=2, timeout=5
+        )
+
+        self.assertTrue(all(task_result.success for task_result in task_results))
+        self.assertEqual([task_result.item for task_result in task_results], vms)
+        self.assertEqual(
+            sorted(self.virtual_machines.started),
+            [("app-rg", "vm-2"), ("sandbox-rg", "vm-1")],
+        )
+        self.assertEqual(
+            self.virtual_machines.polls,
+            {("sandbox-rg", "vm-1"): 2, ("app-rg", "vm-2"): 2},
+        )
+
+    def test_polls_are_rescheduled_by_retry_after(self):
+        self.virtual_machines.retry_after = 30
+        poller = mock.MagicMock()
+        poller.is_pending.return_value = False
+
+        self._prepare_operations(poller)._start_operation(
+            vm_name="vm", resource_group_name="rg", power_on=True
+        )
+
+        submit_kwargs = poller.submit.call_args.kwargs
+        self.assertEqual(submit_kwargs["initial_delay"], 30)
+        poll_result = submit_kwargs["poll"]()
+        self.assertFalse(poll_result.done)
+        self.assertEqual(poll_result.retry_after, 30)
+
+    def test_pending_operation_is_not_submitted_again(self):
+        poller = mock.MagicMock()
+        poller.is_pending.return_value = True
+
+        self._prepare_operations(poller)._start_operation(
+            vm_name="vm", resource_group_name="rg", power_on=True
+        )
+
+        self.assertEqual(self.virtual_machines.started, [])
+        poller.submit.assert_called_once()
@@ -0,0 +1,162 @@
+import time
+import unittest
+from types import SimpleNamespace
+from unittest import mock
+
+from warm_context import WarmAzureClient, WarmContextManager, WarmResourceContext
+
+
+def prepare_resource_config(**attributes):
+    return SimpleNamespace(
+        **{
+            "name": "Azure",
+            "azure_subscription_id": "subscription",
+            "azure_tenant_id": "tenant",
+            "azure_application_id": "application",
+            "azure_application_key": "key",
+            "management_group_name": "MgmtRG",
+            "sandbox_vnet_name": "sandbox-vnet",
+            "management_vnet_name": "",
+            **attributes,
+        }
+    )
+
+
+class TestWarmResourceContext(unittest.TestCase):
+    def setUp(self):
+        self.azure_client = mock.MagicMock()
+        self.azure_client.get_virtual_networks_by_resource_group.return_value = iter(
+            [SimpleNamespace(name="mgmt-vnet", tags={"network_type": "mgmt"})]
+        )
+        self.resource_config = prepare_resource_config()
+        self.warm_context = WarmResourceContext.read(
+            resource_config=self.resource_config,
+            azure_client=self.azure_client,
+            logger=mock.MagicMock(),
+        )
+        self.client = WarmAzureClient(
+            azure_client=self.azure_client, warm_context=self.warm_context
+        )
+
+    def test_credentials_are_validated(self):
+        self.azure_client._credentials.get_token.assert_called_once()
+
+    def test_management_resources_are_taken_from_context(self):
+        self.azure_client.reset_mock()
+
+        self.client.get_resource_group("mgmtrg")
+        vnets = self.client.get_virtual_networks_by_resource_group(
+            resource_group_name="MgmtRG"
+        )
+
+        self.assertEqual([vnet.name for vnet in vnets], ["mgmt-vnet"])
+        self.azure_client.get_resource_group.assert_not_called()
+        self.azure_client.get_virtual_networks_by_resource_group.assert_not_called()
+
+    def test_other_resources_are_read(self):
+        self.client.get_resource_group("sandbox-rg")
+        self.client.get_virtual_network("sandbox-vnet", "MgmtRG")
+
+        self.azure_client.get_resource_group.assert_called_with("sandbox-rg")
+        self.azure_client.get_virtual_network.assert_called_once_with(
+            "sandbox-vnet", "MgmtRG"
+        )
+
+    def test_vnets_list_is_not_kept_without_sandbox_vnet_name(self):
+        warm_context = WarmResourceContext.read(
+            resource_config=prepare_resource_config(
+                sandbox_vnet_name="", management_vnet_name="mgmt-vnet"
+            ),
+            azure_client=self.azure_client,
+            logger=mock.MagicMock(),
+        )
+        sentinel = object()
+
+        self.assertIsNot(
+            warm_context.get_read(
+                "get_virtual_network",
+                (),
+                {"virtual_network_name": "mgmt-vnet", "resource_group_name": "MgmtRG"},
+                default=sentinel,
+            ),
+            sentinel,
+        )
+        self.assertIs(
+            warm_context.get_read(
+                "get_virtual_networks_by_resource_group",
+                ("MgmtRG",),
+                {},
+                default=sentinel,
+            ),
+            sentinel,
+        )
+
+
+class TestWarmContextManager(unittest.TestCase):
+    def setUp(self):
+        self.manager = WarmContextManager(refresh_interval=0.05)
+        self.resource_config = prepare_resource_config()
+        self.warm = mock.Mock(side_effect=self._read_context)
+        self.addCleanup(self.manager.clear)
+
+    def _read_context(self):
+        return WarmResourceContext.read(
+            resource_config=self.resource_config,
+            azure_client=mock.MagicMock(),
+            logger=mock.MagicMock(),
+        )
+
+    def _wait_for(self, condition, timeout=5):
+        deadline = time.monotonic() + timeout
+        while not condition():
+            self.assertLess(time.monotonic(), deadline)
+            time.sleep(0.01)
+
+    def test_context_is_refreshed(self):
+        self.manager.start(resource_name="Azure", warm=self.warm)
+
+        self._wait_for(lambda: self.manager.get(self.resource_config))
+        context = self.manager.get(self.resource_config)
+        self._wait_for(
+            lambda: self.manager.get(self.resource_config) not in (None, context)
+        )
+
+    def test_changed_resource_doesnt_use_context(self):
+        self.manager.start(resource_name="Azure", warm=self.warm)
+
+        self._wait_for(lambda: self.manager.get(self.resource_config))
+        self.assertIsNone(
+            self.manager.get(prepare_resource_config(azure_application_key="new"))
+        )
+
+    def test_failed_refresh_drops_context(self):
+        self.manager.start(resource_name="Azure", warm=self.warm)
+
+        self._wait_for(lambda: self.manager.get(self.resource_config))
+        self.warm.side_effect = ValueError("error")
+        self._wait_for(lambda: self.manager.get(self.resource_config) is None)
+
+    def test_stopped_context_is_released(self):
+        self.manager.start(resource_name="Azure", warm=self.warm)
+
+        self._wait_for(lambda: self.manager.get(self.resource_config))
+        self.manager.stop("Azure")
+        call_count = self.warm.call_count
+        time.sleep(0.2)
+
+        self.assertIsNone(self.manager.get(self.resource_config))
+        # refresh that was in flight when the context was stopped
+        self.assertLessEqual(self.warm.call_count, call_count + 1)
+
+    def test_context_is_released_by_last_driver_instance(self):
+        self.manager.start(resource_name="Azure", warm=self.warm)
+        self.manager.start(resource_name="Azure", warm=self.warm)
+        self._wait_for(lambda: self.manager.get(self.resource_config))
+        call_count = self.warm.call_count
+
+        self.assertFalse(self.manager.stop("Azure"))
+        self._wait_for(lambda: self.warm.call_count > call_count)
+        self.assertIsNotNone(self.manager.get(self.resource_config))
+
+        self.assertTrue(self.manager.stop("Azure"))
+        self.assertIsNone(self.manager.get(self.resource_config))